@@ -0,0 +1,89 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import bisect
+from typing import Any, Iterable, List, Mapping
+
+import numpy as np
+
+from cesarp.common.AgeClass import AgeClass
+
+
+class AgeClassIndex:
+    """
+    Lookup of the age class containing a year, same as cesarp.common.AgeClass.AgeClass.get_age_class_for(), but with a
+    binary search instead of checking each age class.
+    The years are split at the bounds of the age classes into segments, each segment holding the age class matching all of its
+    years. Years are expected to be whole numbers, as the construction years are. Years matching no or several age classes
+    are not found, as with get_age_class_for().
+
+    get_positions_for() and map_years() look up many years at once, e.g. the construction years of all buildings of a site.
+    """
+
+    def __init__(self, age_classes: Iterable[AgeClass]):
+        self.age_classes: List[AgeClass] = list(age_classes)
+        bounds = {ac.min_age for ac in self.age_classes if ac.min_age is not None}
+        bounds.update(ac.max_age + 1 for ac in self.age_classes if ac.max_age is not None)
+        # segment i holds the years from self._segment_starts[i - 1] up to self._segment_starts[i] - 1
+        self._segment_starts = np.array(sorted(bounds), dtype=float)
+        segment_first_years = [self._segment_starts[0] - 1 if len(self._segment_starts) else 0] + list(self._segment_starts)
+        self._segment_positions = np.array([self._get_position_by_scan(year) for year in segment_first_years], dtype=int)
+
+    def _get_position_by_scan(self, year) -> int:
+        positions = [pos for (pos, age_class) in enumerate(self.age_classes) if age_class.isInClass(year)]
+        return positions[0] if len(positions) == 1 else -1
+
+    def get_position_for(self, year) -> int:
+        """
+        :return: position of the age class containing year in self.age_classes
+        :raises: Exception if there is no or several age classes containing year
+        """
+        pos = self._segment_positions[bisect.bisect_right(self._segment_starts, year)]
+        if pos < 0:
+            raise Exception(f"no or several age classes found for {year}")
+        return int(pos)
+
+    def get_age_class_for(self, year) -> AgeClass:
+        """
+        :return: age class containing year
+        :raises: Exception if there is no or several age classes containing year
+        """
+        return self.age_classes[self.get_position_for(year)]
+
+    def get_positions_for(self, years: Iterable) -> np.ndarray:
+        """
+        :param years: years to look up, e.g. a column of a DataFrame
+        :return: per year the position of the age class in self.age_classes, -1 if there is no or several age classes containing the year or the year is missing (NaN)
+        """
+        years = np.asarray(years, dtype=float)
+        positions = self._segment_positions[np.searchsorted(self._segment_starts, years, side="right")]
+        return np.where(np.isnan(years), -1, positions)
+
+    def map_years(self, years: Iterable, values_per_age_class: Mapping[AgeClass, Any], not_found_value=None) -> np.ndarray:
+        """
+        :param years: years to look up, e.g. a column of a DataFrame
+        :param values_per_age_class: value to return per age class, e.g. the archetype URI
+        :param not_found_value: value returned for years not found by get_positions_for(), or an age class missing in values_per_age_class
+        :return: per year the value of its age class
+        """
+        values = np.array([values_per_age_class.get(age_class, not_found_value) for age_class in self.age_classes] + [not_found_value], dtype=object)
+        # -1 for not found years picks the not_found_value appended to the values
+        return values[self.get_positions_for(years)]
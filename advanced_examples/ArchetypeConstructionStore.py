@@ -0,0 +1,218 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Store for the construction archetype data read from the graph database, shared by all worker processes.
+
+The custom construction archetype factories (see custom_constr_archetype_mapping and
+previous_retrofits_with_constr_archetype_mapping) are created in each worker process and query the constructions of
+each archetype from the graph again. With :py:func:`create_shared_archetype_store` the archetypes are read once in the
+main process and saved, one pickle file per archetype, into a folder specific to the graph data source (hash of the
+TTL file or the SPARQL endpoint). The folder is passed to the workers by the environment variable
+ARCHETYPE_STORE_DIR_ENV_VAR, thus it has to be called before the worker pool is created.
+Workers only read from the store, each worker process unpickles an archetype once and keeps its own copy. Archetypes
+missing in the store are read from the graph.
+
+The graph reader passed to the factories by cesar-p-core parses the TTL file in each worker, also if all archetypes
+are in the store. Use :py:class:`ArchetypeStoreBldgModelFactory.ArchetypeStoreBldgModelFactory` to pass a
+:py:class:`LazyGraphReader` instead, which only parses the TTL file (or connects to the GraphDB) on a store miss.
+
+Usage in a factory::
+
+    self._shared_store = ArchetypeConstructionStore.from_environment()
+    ...
+    graph_data = self._shared_store.get(archetype_uri) if self._shared_store else None
+    if graph_data is None:
+        graph_data = read_archetype_graph_data(self._constr_reader, archetype_uri)
+"""
+import os
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+import pint
+
+import cesarp.common
+from cesarp.common.AgeClass import AgeClass
+from cesarp.construction.MinMaxValue import MinMaxValue
+from cesarp.model.WindowConstruction import WindowShadingMaterial
+from cesarp.graphdb_access import _default_config_file
+from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader, BuildingElementConstrcutionsArchetype, GraphReaderProtocol
+from cesarp.graphdb_access.GraphDBReader import GraphDBReader
+from cesarp.graphdb_access.LocalFileReader import LocalFileReader
+
+ARCHETYPE_STORE_DIR_ENV_VAR = "CESARP_ARCHETYPE_STORE_DIR"
+_STORE_FILE_EXT = ".pickle"
+# per process, thus each worker unpickles an archetype only once, also when several factory instances are created
+_loaded_archetypes: Dict[Tuple[str, str], "ArchetypeGraphData"] = dict()
+
+
+class ArchetypeGraphData(NamedTuple):
+    """
+    All data of an archetype the construction archetype factories read from the graph
+    """
+
+    constructions: BuildingElementConstrcutionsArchetype
+    window_shade_constr: WindowShadingMaterial
+    glazing_ratio: MinMaxValue
+    infiltration_rate: pint.Quantity
+    age_class: AgeClass
+
+
+def read_archetype_graph_data(constr_reader: BldgElementConstructionReader, archetype_uri: str) -> ArchetypeGraphData:
+    return ArchetypeGraphData(
+        constructions=constr_reader.get_bldg_elem_construction_archetype(archetype_uri),
+        window_shade_constr=constr_reader.get_window_shading_constr(archetype_uri),
+        glazing_ratio=constr_reader.get_glazing_ratio(archetype_uri),
+        infiltration_rate=constr_reader.get_infiltration_rate(archetype_uri),
+        age_class=constr_reader.get_age_class_of_archetype(archetype_uri),
+    )
+
+
+def create_graph_reader(custom_config: Optional[Dict[str, Any]] = None) -> GraphReaderProtocol:
+    """
+    :return: LocalFileReader or GraphDBReader, depending on GRAPHDB_ACCESS - LOCAL/REMOTE, as created by cesarp.graphdb_access.GraphDBFacade
+    """
+    cfg = cesarp.common.config_loader.load_config_for_package(_default_config_file, "cesarp.graphdb_access", custom_config)
+    return LocalFileReader(custom_config=custom_config) if cfg["LOCAL"]["ACTIVE"] else GraphDBReader(custom_config=custom_config)
+
+
+class LazyGraphReader:
+    """
+    Graph reader creating the LocalFileReader or GraphDBReader on first use, thus the TTL file is only parsed if a
+    query is run, e.g. for an archetype missing in the store.
+    All attributes are forwarded to the wrapped reader, thus it can be passed wherever a GraphReaderProtocol is expected.
+    """
+
+    def __init__(self, custom_config: Optional[Dict[str, Any]] = None):
+        self._custom_config = custom_config
+        self._graph_reader: Optional[GraphReaderProtocol] = None
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes not found on this instance, thus not for the ones set in __init__
+        if name.startswith("_"):
+            raise AttributeError(name)  # e.g. while unpickling, before __init__ has set _graph_reader
+        if self._graph_reader is None:
+            logging.getLogger(__name__).info(f"creating graph reader, {name} is not answered from the archetype store")
+            self._graph_reader = create_graph_reader(self._custom_config)
+        return getattr(self._graph_reader, name)
+
+
+class ArchetypeConstructionStore:
+    def __init__(self, store_dir: Union[str, Path]):
+        """
+        :param store_dir: folder containing the archetype files, use a folder per graph data source, see get_store_dir()
+        """
+        self.store_dir = Path(store_dir)
+
+    @classmethod
+    def from_environment(cls) -> Optional["ArchetypeConstructionStore"]:
+        """
+        :return: store set by activate() in the main process, None if there is none
+        """
+        store_dir = os.environ.get(ARCHETYPE_STORE_DIR_ENV_VAR)
+        if not store_dir or not os.path.isdir(store_dir):
+            return None
+        return cls(store_dir)
+
+    @staticmethod
+    def get_store_dir(store_base_dir: Union[str, Path], custom_config: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        :param store_base_dir: folder containing the stores of all graph data sources
+        :param custom_config: configuration, graph data source is taken from GRAPHDB_ACCESS - LOCAL/REMOTE
+        :return: store folder for the configured graph data source, changes when the TTL file is changed
+        """
+        cfg = cesarp.common.config_loader.load_config_for_package(_default_config_file, "cesarp.graphdb_access", custom_config)
+        if cfg["LOCAL"]["ACTIVE"]:
+            source_hash = hashlib.sha256(Path(cfg["LOCAL"]["PATH"]).read_bytes()).hexdigest()
+        else:
+            source_hash = hashlib.sha256(cfg["REMOTE"]["SPARQL_ENDPOINT"].encode("utf-8")).hexdigest()
+        return Path(store_base_dir) / source_hash[:16]
+
+    def activate(self) -> None:
+        """
+        Make the store available to worker processes created afterwards, see from_environment()
+        """
+        os.environ[ARCHETYPE_STORE_DIR_ENV_VAR] = str(self.store_dir.resolve())
+
+    def get(self, archetype_uri: str) -> Optional[ArchetypeGraphData]:
+        key = (str(self.store_dir), archetype_uri)
+        if key not in _loaded_archetypes:
+            file_path = self._get_file_path(archetype_uri)
+            if not file_path.is_file():
+                return None
+            with open(file_path, "rb") as f:
+                _loaded_archetypes[key] = pickle.load(f)
+        return _loaded_archetypes[key]
+
+    def put(self, archetype_uri: str, graph_data: ArchetypeGraphData) -> None:
+        os.makedirs(self.store_dir, exist_ok=True)
+        file_path = self._get_file_path(archetype_uri)
+        # write to temporary file and rename, thus a reader never sees a partially written file
+        tmp_file_path = file_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file_path, "wb") as f:
+            pickle.dump(graph_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file_path, file_path)
+
+    def contains(self, archetype_uri: str) -> bool:
+        return self._get_file_path(archetype_uri).is_file()
+
+    def populate(self, archetype_uris: Iterable[str], constr_reader: BldgElementConstructionReader) -> None:
+        """
+        Read archetypes not yet in the store from the graph and save them
+        """
+        for archetype_uri in set(archetype_uris):
+            if not self.contains(archetype_uri):
+                logging.getLogger(__name__).info(f"reading {archetype_uri} into archetype store {self.store_dir}")
+                self.put(archetype_uri, read_archetype_graph_data(constr_reader, archetype_uri))
+
+    def _get_file_path(self, archetype_uri: str) -> Path:
+        return self.store_dir / (hashlib.sha1(archetype_uri.encode("utf-8")).hexdigest() + _STORE_FILE_EXT)
+
+
+def get_configured_archetype_uris(custom_config: Optional[Dict[str, Any]] = None):
+    """
+    :return: URI's of the archetypes configured in GRAPHDB_ACCESS - ARCHETYPES
+    """
+    cfg = cesarp.common.config_loader.load_config_for_package(_default_config_file, "cesarp.graphdb_access", custom_config)
+    return [archetype_cfg["URI"] for archetype_cfg in cfg["ARCHETYPES"].values()]
+
+
+def create_shared_archetype_store(
+    store_base_dir: Union[str, Path], archetype_uris: Iterable[str], ureg: pint.UnitRegistry, custom_config: Optional[Dict[str, Any]] = None
+) -> ArchetypeConstructionStore:
+    """
+    Call in the main process before creating the worker pool, e.g. before SimulationManager.run_all_steps().
+
+    :param store_base_dir: folder containing the stores of all graph data sources
+    :param archetype_uris: archetypes to read into the store, if they are not yet stored
+    :param ureg: the application unit registry instance
+    :param custom_config: configuration, as dict
+    :return: the populated and activated store
+    """
+    store = ArchetypeConstructionStore(ArchetypeConstructionStore.get_store_dir(store_base_dir, custom_config))
+    archetype_uris = list(archetype_uris)
+    if not all(store.contains(archetype_uri) for archetype_uri in archetype_uris):
+        store.populate(archetype_uris, BldgElementConstructionReader(create_graph_reader(custom_config), ureg, custom_config))
+    store.activate()
+    return store
@@ -0,0 +1,58 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+BldgModelFactory for the custom construction archetype factories using the ArchetypeConstructionStore.
+
+cesar-p-core passes a LocalFileReader to the construction archetype factory, which parses the whole TTL file in each
+worker process, also if the factory takes all archetypes from the store. The ArchetypeStoreBldgModelFactory passes a
+:py:class:`ArchetypeConstructionStore.LazyGraphReader` instead, thus the TTL file is only parsed in a worker if a query
+is run, e.g. for an archetype missing in the store or for the constructions of past retrofits.
+"""
+from typing import Any, Dict
+
+import cesarp.common
+import cesarp.graphdb_access
+
+from ArchetypeConstructionStore import LazyGraphReader
+from CustomFactorySimulationManager import CustomBldgModelFactory
+
+
+class ArchetypeStoreBldgModelFactory(CustomBldgModelFactory):
+    """
+    BldgModelFactory passing a LazyGraphReader to the construction archetype factory configured in
+    GRAPHDB_ACCESS - ARCHETYPE_CONSTRUCTION_FACTORY_CLASS.
+    Pass it as bldg_model_factory_class to the CustomFactorySimulationManager.
+    """
+
+    def create_archetype_constr_factory(self, year_of_constr_as_dict: Dict[int, int], dhw_e_carrier_as_dict: Dict[int, Any], heating_e_carrier_as_dict: Dict[int, Any]):
+        # same as cesarp.graphdb_access.GraphDBFacade.get_graph_construction_archetype_factory(), but with the LazyGraphReader
+        custom_config = self._custom_config if self._custom_config is not None else {}
+        graphdb_cfg = cesarp.common.config_loader.load_config_for_package(cesarp.graphdb_access._default_config_file, "cesarp.graphdb_access", custom_config)
+        constr_fact_class: type = cesarp.common.get_class_from_str(graphdb_cfg["ARCHETYPE_CONSTRUCTION_FACTORY_CLASS"])
+        return constr_fact_class(
+            year_of_constr_as_dict,
+            dhw_e_carrier_as_dict,
+            heating_e_carrier_as_dict,
+            LazyGraphReader(custom_config),
+            self._unit_reg,
+            custom_config,
+        )
@@ -0,0 +1,199 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Graph reader wrapping the LocalFileReader or GraphDBReader of cesarp.graphdb_access, which memoises all query results
+and can resolve the queries for many URI's at once.
+
+The BldgElementConstructionReader queries the graph once per construction, layer and material. Against a remote
+GraphDB each query is a round trip. If you know the URI's you will need, e.g. the retrofitted constructions of all
+buildings of a site, pass them to :py:meth:`BatchedGraphReader.prefetch_layers` and
+:py:meth:`BatchedGraphReader.prefetch_archetypes`. They are then resolved with a few queries, using a SPARQL VALUES
+clause, and the results memoised. All later queries for those URI's are answered from memory.
+
+Wrapped readers other than LocalFileReader and GraphDBReader (e.g. GraphSnapshotReader) are queried per URI,
+but the results are memoised as well.
+"""
+import re
+import logging
+from typing import Dict, Iterable, Tuple
+
+import pandas
+
+import cesarp.graphdb_access.sparql_queries as sparql_queries
+from cesarp.graphdb_access.BldgElementConstructionReader import GraphReaderProtocol
+
+_URI_VAR = "batchUri"
+# per query, the number of URI's put into one VALUES clause, to keep the size of the request to a remote GraphDB reasonable
+BATCH_SIZE = 200
+
+# queries having the URI as only parameter, the key is the method name of the reader
+_URI_QUERIES = {
+    "get_constructions_from_graph": sparql_queries.get_constructions,
+    "get_layers_from_graph": sparql_queries.get_layers,
+    "get_opaque_material_from_graph": sparql_queries.get_opaque_material_properties,
+    "get_transparent_material_from_graph": sparql_queries.get_transparent_material_properties,
+    "get_material_type_from_graph": sparql_queries.get_material_type,
+    "get_gas_from_graph": sparql_queries.get_gas_properties,
+    "get_glazing_ratio_from_graph": sparql_queries.get_glazing_ratio,
+    "get_infiltration_rate_from_graph": sparql_queries.get_infiltration_rate,
+    "get_u_value_from_graph": sparql_queries.get_construction_u_value,
+    "get_construction_emission_from_graph": sparql_queries.get_construction_emission,
+    "get_archetype_year_range_from_graph_for_uri": sparql_queries.get_archetype_year_range_by_uri,
+    "get_window_shading_constr_from_graph_for_uri": sparql_queries.get_window_shading_constr_by_uri,
+}
+
+
+def to_batch_query(query: str) -> str:
+    """
+    :param query: one of the queries of cesarp.graphdb_access.sparql_queries with the URI as only parameter ($$$)
+    :return: the query for many URI's, the URI's to be filled in for $$$ (e.g. "<uri1> <uri2>"), the URI is returned in column _URI_VAR
+    """
+    batch_query = query.replace("<$$$>", f"?{_URI_VAR}")
+    batch_query = re.sub(r"\bselect( distinct)?", lambda match: f"{match.group(0)} ?{_URI_VAR}", batch_query, count=1)
+    batch_query = re.sub(r"\bwhere\s*{", lambda match: f"{match.group(0)}\n        VALUES ?{_URI_VAR} {{ $$$ }}", batch_query, count=1)
+    return batch_query
+
+
+class BatchedGraphReader:
+    def __init__(self, graph_reader: GraphReaderProtocol):
+        """
+        :param graph_reader: reader to forward the queries to
+        """
+        self._graph_reader = graph_reader
+        self._results: Dict[Tuple, pandas.DataFrame] = dict()
+        self._logger = logging.getLogger(__name__)
+
+    def prefetch(self, query_name: str, uris: Iterable[str]) -> None:
+        """
+        Resolve the query for all uris not yet memoised.
+
+        :param query_name: name of the reader method, e.g. "get_layers_from_graph"
+        :param uris: URI's to pass to the query
+        """
+        uris_to_query = sorted({uri for uri in uris if (query_name, uri) not in self._results})
+        if not uris_to_query:
+            return
+        if not self._can_run_queries():
+            for uri in uris_to_query:
+                getattr(self, query_name)(uri)
+            return
+        batch_query = to_batch_query(_URI_QUERIES[query_name])
+        for batch_start in range(0, len(uris_to_query), BATCH_SIZE):
+            batch_uris = uris_to_query[batch_start : batch_start + BATCH_SIZE]
+            df = self._run_query(batch_query.replace("$$$", " ".join(f"<{uri}>" for uri in batch_uris)))
+            rows_per_uri = {uri: uri_df for (uri, uri_df) in df.groupby(_URI_VAR, sort=False)}
+            for uri in batch_uris:
+                uri_df = rows_per_uri.get(uri, df.iloc[0:0]).drop(columns=[_URI_VAR]).reset_index(drop=True)
+                self._results[(query_name, uri)] = uri_df.dropna(how="all")
+        self._logger.debug(f"{query_name} resolved for {len(uris_to_query)} URI's in {(len(uris_to_query) - 1) // BATCH_SIZE + 1} queries")
+
+    def prefetch_layers(self, construction_uris: Iterable[str]) -> None:
+        """
+        Resolve layers and their materials of the given constructions (opaque or window glass)
+        """
+        construction_uris = set(construction_uris)
+        self.prefetch("get_layers_from_graph", construction_uris)
+        material_uris = {material for uri in construction_uris for material in self._results[("get_layers_from_graph", uri)]["material"]}
+        self.prefetch_materials(material_uris)
+
+    def prefetch_materials(self, material_uris: Iterable[str]) -> None:
+        material_uris = set(material_uris)
+        self.prefetch("get_material_type_from_graph", material_uris)
+        material_types = {uri: self._results[("get_material_type_from_graph", uri)] for uri in material_uris}
+        for (type_name, query_name) in [("Opaque", "get_opaque_material_from_graph"), ("Transparent", "get_transparent_material_from_graph"), ("Gas", "get_gas_from_graph")]:
+            # same type check as in BldgElementConstructionReader.get_material()
+            self.prefetch(query_name, [uri for (uri, df) in material_types.items() if not df.empty and type_name in df.at[0, "type"]])
+
+    def prefetch_archetypes(self, archetype_uris: Iterable[str]) -> None:
+        """
+        Resolve the archetype properties infiltration rate, glazing ratio, window shading and year range
+        """
+        archetype_uris = set(archetype_uris)
+        for query_name in [
+            "get_infiltration_rate_from_graph",
+            "get_glazing_ratio_from_graph",
+            "get_window_shading_constr_from_graph_for_uri",
+            "get_archetype_year_range_from_graph_for_uri",
+        ]:
+            self.prefetch(query_name, archetype_uris)
+
+    def _can_run_queries(self) -> bool:
+        return hasattr(self._graph_reader, "g") or hasattr(self._graph_reader, "sparql")
+
+    def _run_query(self, query: str) -> pandas.DataFrame:
+        if hasattr(self._graph_reader, "g"):  # LocalFileReader
+            return self._graph_reader.create_df(self._graph_reader.g.query(query))
+        else:  # GraphDBReader
+            self._graph_reader.sparql.setQuery(query)
+            return self._graph_reader.create_df(self._graph_reader.sparql.query().convert())
+
+    def _get(self, query_name: str, *args) -> pandas.DataFrame:
+        key = (query_name, *args)
+        if key not in self._results:
+            self._results[key] = getattr(self._graph_reader, query_name)(*args)
+        # callers must not change the returned DataFrame, thus return a copy as it is memoised
+        return self._results[key].copy()
+
+    def get_constructions_from_graph(self, name):
+        return self._get("get_constructions_from_graph", name)
+
+    def get_layers_from_graph(self, name):
+        return self._get("get_layers_from_graph", name)
+
+    def get_opaque_material_from_graph(self, name):
+        return self._get("get_opaque_material_from_graph", name)
+
+    def get_transparent_material_from_graph(self, name):
+        return self._get("get_transparent_material_from_graph", name)
+
+    def get_material_type_from_graph(self, name):
+        return self._get("get_material_type_from_graph", name)
+
+    def get_gas_from_graph(self, name):
+        return self._get("get_gas_from_graph", name)
+
+    def get_retrofit_name(self, name, regulation, target_requirement=False):
+        return self._get("get_retrofit_name", name, regulation, target_requirement)
+
+    def get_glazing_ratio_from_graph(self, archetype_uri):
+        return self._get("get_glazing_ratio_from_graph", archetype_uri)
+
+    def get_infiltration_rate_from_graph(self, archetype_uri):
+        return self._get("get_infiltration_rate_from_graph", archetype_uri)
+
+    def get_archetype_by_year_from_graph(self, year):
+        return self._get("get_archetype_by_year_from_graph", year)
+
+    def get_u_value_from_graph(self, construction_uri):
+        return self._get("get_u_value_from_graph", construction_uri)
+
+    def get_construction_emission_from_graph(self, construction_uri):
+        return self._get("get_construction_emission_from_graph", construction_uri)
+
+    def get_archetype_year_range_from_graph_for_uri(self, archetype_uri):
+        return self._get("get_archetype_year_range_from_graph_for_uri", archetype_uri)
+
+    def get_window_shading_constr_from_graph_for_uri(self, archetype_uri):
+        return self._get("get_window_shading_constr_from_graph_for_uri", archetype_uri)
+
+    def __str__(self) -> str:
+        return str(self._graph_reader)
@@ -0,0 +1,98 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Per building information table (e.g. BuildingInformation.csv), loaded once per process and shared by all factories.
+
+The custom factories used to read their columns from the building information file each on their own and convert them
+to dicts, which for a large site takes much more memory than the table itself. :py:meth:`BuildingInformationTable.for_file`
+returns the same table for the same file within a process. The factories take the columns they need as pandas Series
+indexed by the building fid with get_column(), which are views on the table and not copies. get_columns() returns a copy
+of the selected columns.
+Text columns (e.g. the archetype URI) are stored as categorical, as there are only few distinct values.
+
+Besides CSV/CSVY files as read by cesar-p, Parquet (.parquet) and Feather (.feather) files can be used. For those,
+pyarrow has to be installed.
+"""
+import os
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import pandas as pd
+
+import cesarp.common
+
+DEFAULT_FID_LABEL = "ORIG_FID"
+_ARROW_FILE_READERS = {".parquet": pd.read_parquet, ".feather": pd.read_feather}
+# per process, key is resolved path, modification time and size of the file, thus a changed file is read again, plus
+# the reading parameters separator and fid label
+_loaded_tables: Dict[Tuple[str, int, int, str, str], "BuildingInformationTable"] = dict()
+
+
+class BuildingInformationTable:
+    def __init__(self, file_path: Union[str, Path], separator: str = ",", fid_label: str = DEFAULT_FID_LABEL):
+        """
+        Use for_file() instead to share the table with the other factories.
+
+        :param file_path: building information file, CSV/CSVY, Parquet or Feather
+        :param separator: value separator, only used for CSV/CSVY files
+        :param fid_label: name of the column with the building fid
+        """
+        self.file_path = Path(file_path)
+        arrow_file_reader = _ARROW_FILE_READERS.get(self.file_path.suffix.lower())
+        if arrow_file_reader is not None:
+            table = arrow_file_reader(self.file_path)
+        else:
+            (_, table) = cesarp.common.csv_reader.read_csvy_raw(self.file_path, separator)
+        table = table.loc[:, [col for col in table.columns if not str(col).startswith("Unnamed:")]]  # empty columns, e.g. from a trailing separator
+        table = table.set_index(fid_label, drop=False)
+        for col in table.columns:
+            if col != fid_label and (pd.api.types.is_object_dtype(table[col]) or pd.api.types.is_string_dtype(table[col])):
+                table[col] = table[col].astype("category")
+        self.table = table
+
+    @classmethod
+    def for_file(cls, file_path: Union[str, Path], separator: str = ",", fid_label: str = DEFAULT_FID_LABEL) -> "BuildingInformationTable":
+        """
+        :return: table of the given file, read only on the first call per process with the same separator and fid_label
+        """
+        stat = os.stat(file_path)
+        key = (str(Path(file_path).resolve()), stat.st_mtime_ns, stat.st_size, separator, fid_label)
+        if key not in _loaded_tables:
+            _loaded_tables[key] = cls(file_path, separator, fid_label)
+        return _loaded_tables[key]
+
+    def get_column(self, label: str) -> pd.Series:
+        """
+        :param label: column name as in the file
+        :return: the column indexed by building fid, do not change it as it is shared
+        """
+        if label not in self.table.columns:
+            raise KeyError(f"column {label} not found in {self.file_path}, available columns are {list(self.table.columns)}")
+        return self.table[label]
+
+    def get_columns(self, data_labels_mapping: Dict[str, str]) -> pd.DataFrame:
+        """
+        :param data_labels_mapping: mapping between the names to use and the column names as in the file, as for cesarp.common.csv_reader.read_csvy()
+        :return: the columns indexed by building fid, renamed to the keys of data_labels_mapping. This is a copy of the
+                 columns, for large tables prefer get_column() per column, which does not copy
+        """
+        return self.table[list(data_labels_mapping.values())].rename(columns={label: name for (name, label) in data_labels_mapping.items()})
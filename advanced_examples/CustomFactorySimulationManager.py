@@ -0,0 +1,179 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+SimulationManager creating the building models with a custom BldgModelFactory subclass, e.g. the IndexedBldgModelFactory
+of large_site_geometry or the ArchetypeStoreBldgModelFactory, or a class combining several of them::
+
+    class IndexedArchetypeStoreBldgModelFactory(IndexedBldgModelFactory, ArchetypeStoreBldgModelFactory):
+        pass
+
+    sim_manager = CustomFactorySimulationManager(output_dir, main_config_path, ureg, bldg_model_factory_class=IndexedArchetypeStoreBldgModelFactory)
+
+cesar-p-core creates the BldgModelFactory in the worker processes (cesarp.manager.processing_steps.create_bldg_models_batch_no_exception)
+and parts of it can only be replaced by overriding its private, name mangled, methods. This module is the only place doing so:
+:py:class:`CustomBldgModelFactory` forwards those methods to public ones, which the custom factories override.
+
+NOTE: the overrides mirror cesarp.manager.BldgModelFactory and SimulationManager.create_bldg_models() of cesar-p-core 2.4.0,
+check them when updating cesar-p-core.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple, Union
+
+import pandas as pd
+import pint
+
+from cesarp.construction.ConstructionFacade import ConstructionFacade
+from cesarp.manager import processing_steps
+from cesarp.manager.BldgModelFactory import BldgModelFactory, _COL_DHW_E_CARRIER, _COL_HEATING_E_CARRIER
+from cesarp.manager.SimulationManager import SimulationManager, define_fid_batches
+from cesarp.model.BuildingModel import BuildingModel
+
+
+class CustomBldgModelFactory(BldgModelFactory):
+    """
+    BldgModelFactory with public methods to override instead of the private methods of cesarp.manager.BldgModelFactory.
+    """
+
+    def _BldgModelFactory__create_geometry_builder_factory(self):
+        # overrides the private BldgModelFactory.__create_geometry_builder_factory(), called from BldgModelFactory.__init__()
+        return self.create_geometry_builder_factory()
+
+    def create_geometry_builder_factory(self):
+        """
+        :return: factory for the geometry builder per building, by default the one of cesar-p
+        """
+        return super()._BldgModelFactory__create_geometry_builder_factory()
+
+    def _BldgModelFactory__create_archetype_constr_factory(self, year_of_constr_per_bldg: pd.DataFrame):
+        # overrides the private BldgModelFactory.__create_archetype_constr_factory(), called from BldgModelFactory.__init__()
+        # energy carrier handling is the same as in the overridden method
+        year_of_constr_as_dict = year_of_constr_per_bldg["year_of_construction"].to_dict()
+        try:
+            e_carriers_per_bldg = self._BldgModelFactory__read_ecarriers_per_bldg()
+            self.per_bldg_infos_used = pd.concat([self.per_bldg_infos_used, e_carriers_per_bldg], axis="columns")
+            dhw_e_carrier_as_dict = e_carriers_per_bldg[_COL_DHW_E_CARRIER].to_dict()
+            heating_e_carrier_as_dict = e_carriers_per_bldg[_COL_HEATING_E_CARRIER].to_dict()
+        except (Exception, FileNotFoundError) as exc:
+            if self._mgr_config["DO_CALC_OP_EMISSIONS_AND_COSTS"]:
+                self._logger.error(
+                    "Could not read energy carrier pre building info. Setting Energy Carrier info to " "None in building models. Operational emission&costs cannot be calculated.",
+                    exc_info=exc,
+                )
+            dhw_e_carrier_as_dict = {fid: None for fid in year_of_constr_as_dict.keys()}
+            heating_e_carrier_as_dict = {fid: None for fid in year_of_constr_as_dict.keys()}
+        return self.create_archetype_constr_factory(year_of_constr_as_dict, dhw_e_carrier_as_dict, heating_e_carrier_as_dict)
+
+    def create_archetype_constr_factory(self, year_of_constr_as_dict: Dict[int, int], dhw_e_carrier_as_dict: Dict[int, Any], heating_e_carrier_as_dict: Dict[int, Any]):
+        """
+        :param year_of_constr_as_dict: year of construction per building fid
+        :param dhw_e_carrier_as_dict: energy carrier for domestic hot water per building fid, None if not available
+        :param heating_e_carrier_as_dict: energy carrier for heating per building fid, None if not available
+        :return: factory for the construction archetype per building, by default the one configured in cesar-p
+        """
+        return ConstructionFacade.get_constructional_archetype_factory(
+            year_of_constr_as_dict, dhw_e_carrier_as_dict, heating_e_carrier_as_dict, self._unit_reg, self._custom_config
+        )
+
+
+def create_bldg_models_batch_no_exception(
+    bldg_model_factory_class: type, bldg_fids_to_create_model_for, config, sia_params_gen_lock
+) -> Tuple[Dict[int, BuildingModel], pd.DataFrame, List[int]]:
+    """
+    Module level method to be able to run it in the worker pool.
+    Same as cesarp.manager.processing_steps.create_bldg_models_batch_no_exception, but using bldg_model_factory_class.
+
+    :return: tuple with three entries (sucessfully created building models,
+                                       infos per building used during model creation,
+                                       fids for which building model could not be created)
+    """
+    bldg_models_factory = bldg_model_factory_class(pint.get_application_registry(), config, sia_params_gen_lock)
+
+    bldg_models = {bldg_fid: processing_steps._create_bldg_model_no_exception(bldg_fid, bldg_models_factory) for bldg_fid in bldg_fids_to_create_model_for}
+    failed_fids = [fid for fid, model in bldg_models.items() if not model]
+    bldg_models_successful = {fid: model for fid, model in bldg_models.items() if model}
+    per_bldg_infos = bldg_models_factory.per_bldg_infos_used.loc[bldg_fids_to_create_model_for]
+    return (bldg_models_successful, per_bldg_infos, failed_fids)
+
+
+class CustomFactorySimulationManager(SimulationManager):
+    """
+    SimulationManager creating the building models with the given BldgModelFactory subclass.
+
+    Use it exactly as the SimulationManager, e.g. call run_all_steps().
+    """
+
+    def __init__(
+        self,
+        base_output_path: Union[str, Path],
+        main_config: Union[str, Path, Dict[str, Any]],
+        unit_reg: pint.UnitRegistry,
+        load_from_disk: bool = False,
+        fids_to_use: List[int] = None,
+        delete_old_logs=True,
+        bldg_model_factory_class: type = CustomBldgModelFactory,
+    ):
+        """
+        :param bldg_model_factory_class: subclass of cesarp.manager.BldgModelFactory, usually of CustomBldgModelFactory, created in each worker process
+                                         with the same arguments as the BldgModelFactory; must be defined at module level
+        :type bldg_model_factory_class: type
+
+        for all other parameters see :py:class:`cesarp.manager.SimulationManager.SimulationManager`
+        """
+        super().__init__(base_output_path, main_config, unit_reg, load_from_disk=load_from_disk, fids_to_use=fids_to_use, delete_old_logs=delete_old_logs)
+        self.bldg_model_factory_class = bldg_model_factory_class
+
+    def create_bldg_models(self) -> Set[int]:
+        """
+        Initializes the building model for given fid's.
+
+        :return: fid's for which BuildingModel creation failed
+        """
+        worker_pool = self._get_worker_pool()
+        fid_batches = define_fid_batches(list(self.bldg_containers.keys()), worker_pool._processes)
+        sia_params_gen_lock = self._get_lock()
+        job_res_list = [
+            self._get_worker_pool().apply_async(
+                create_bldg_models_batch_no_exception,
+                (self.bldg_model_factory_class, fid_batch, self._custom_config, sia_params_gen_lock),
+            )
+            for fid_batch in fid_batches
+        ]
+        result_per_worker = [res.get() for res in job_res_list]
+
+        all_per_bldg_info_used = pd.DataFrame()
+        bldg_model_creation_failed: Set[int] = set()
+        all_bldg_models: Dict[int, BuildingModel] = {}
+        for (bldg_models_successful, per_bldg_infos, failed_fids) in result_per_worker:
+            all_bldg_models.update(bldg_models_successful)
+            all_per_bldg_info_used = pd.concat([all_per_bldg_info_used, per_bldg_infos], sort=False)
+            bldg_model_creation_failed.update(failed_fids)
+
+        for fid, bldg_model in all_bldg_models.items():
+            self.bldg_containers[fid].set_bldg_model(bldg_model)
+
+        if bldg_model_creation_failed:
+            self.logger.error(f"bldg model creation failed for fids {bldg_model_creation_failed}")
+            self.failed_fids.update(bldg_model_creation_failed)
+            for fid in bldg_model_creation_failed:
+                self.bldg_containers[fid].set_error()
+        self._storage.save_bldg_infos_used(all_per_bldg_info_used)
+        return bldg_model_creation_failed
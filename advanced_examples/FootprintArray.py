@@ -0,0 +1,297 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Footprints of all buildings of a site as ragged NumPy arrays, to calculate footprint properties for all buildings at once.
+
+The vertices of all footprints are stored in one coordinates array, the vertices of a building following each other in footprint
+order; the offsets array holds the position of the first vertex of each building, thus the vertices of the building at position i are
+coords[offsets[i]:offsets[i + 1]]. All calculations work on these arrays as a whole instead of looping over the buildings.
+
+:py:meth:`FootprintArray.to_per_bldg_footprint` gives the per building table as expected by cesar-p's geometry classes.
+"""
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_DEVIATION = 0.01  # in meter, for remove_collinear_vertices()
+DEFAULT_MAX_NR_OF_VERTICES = 250  # cesar-p supports up to 250 vertices per footprint, limiting is the IDD
+
+
+class FootprintArray:
+    def __init__(self, fids: Iterable, heights: Iterable[float], offsets: Iterable[int], coords: np.ndarray):
+        """
+        Use from_flat_site_vertices() to create it from the site vertices.
+
+        :param fids: fid per building
+        :param heights: height per building
+        :param offsets: position of the first vertex per building in coords, plus the total number of vertices as last entry
+        :param coords: x, y per vertex, shape (nr of vertices, 2), the footprint vertices of each building in order without repeating the first vertex
+        """
+        self.fids = np.asarray(fids)
+        self.heights = np.asarray(heights, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.coords = np.asarray(coords, dtype=float)
+        # position of the building per vertex
+        self._bldg_positions = np.repeat(np.arange(len(self.fids)), self.get_nr_of_vertices())
+
+    @classmethod
+    def from_flat_site_vertices(cls, flat_site_vertices: pd.DataFrame) -> "FootprintArray":
+        """
+        Duplicated vertices of a building (e.g. the first vertex repeated at the end) are removed and the buildings are in the order of their
+        first vertex, as with cesarp.geometry.vertices_basics.convert_flat_site_vertices_to_per_bldg_footprint().
+
+        :param flat_site_vertices: pd.DataFrame with columns "gis_fid", "height", "x", "y", one row per vertex,
+                                   as returned by cesarp.geometry.csv_input_parser.read_sitevertices_from_csv()
+        """
+        (fid_codes, fids) = pd.factorize(flat_site_vertices["gis_fid"])
+        vertex_heights = flat_site_vertices["height"].to_numpy(dtype=float)
+        (_, first_vertex_positions) = np.unique(fid_codes, return_index=True)
+        heights = vertex_heights[first_vertex_positions]
+        differing_heights = heights[fid_codes] != vertex_heights
+        assert not differing_heights.any(), f"buildings {list(np.unique(fids[fid_codes[differing_heights]]))} have vertices with different heights"
+        is_unique = ~flat_site_vertices.duplicated(["gis_fid", "x", "y"]).to_numpy()
+        fid_codes = fid_codes[is_unique]
+        order = np.argsort(fid_codes, kind="stable")
+        coords = flat_site_vertices[["x", "y"]].to_numpy(dtype=float)[is_unique][order]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(fid_codes, minlength=len(fids)))])
+        return cls(fids.to_numpy(), heights, offsets, coords)
+
+    def get_nr_of_vertices(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def _get_next_vertex_positions(self) -> np.ndarray:
+        next_positions = np.arange(1, len(self.coords) + 1)
+        next_positions[self.offsets[1:] - 1] = self.offsets[:-1]  # last vertex of a footprint is followed by its first one
+        return next_positions
+
+    def _get_previous_vertex_positions(self) -> np.ndarray:
+        previous_positions = np.arange(-1, len(self.coords) - 1)
+        previous_positions[self.offsets[:-1]] = self.offsets[1:] - 1
+        return previous_positions
+
+    def _sum_per_bldg(self, values_per_vertex: np.ndarray) -> np.ndarray:
+        return np.bincount(self._bldg_positions, weights=values_per_vertex, minlength=len(self.fids))
+
+    def get_signed_areas(self) -> np.ndarray:
+        """
+        :return: area per building, positive for footprints in counter-clockwise order and negative for clockwise ones
+        """
+        next_coords = self.coords[self._get_next_vertex_positions()]
+        return self._sum_per_bldg(self.coords[:, 0] * next_coords[:, 1] - next_coords[:, 0] * self.coords[:, 1]) / 2
+
+    def get_areas(self) -> np.ndarray:
+        return np.abs(self.get_signed_areas())
+
+    def is_counter_clockwise(self) -> np.ndarray:
+        """
+        :return: per building True if the footprint vertices are in counter-clockwise order
+        """
+        return self.get_signed_areas() > 0
+
+    def _get_edge_vectors(self) -> np.ndarray:
+        # edge from each vertex to the next one
+        return self.coords[self._get_next_vertex_positions()] - self.coords
+
+    def get_perimeters(self) -> np.ndarray:
+        return self._sum_per_bldg(np.hypot(*self._get_edge_vectors().T))
+
+    def get_orientations(self) -> np.ndarray:
+        """
+        :return: per building the direction of its longest footprint edge in degree, clockwise from north (y axis), between 0 and 180
+        """
+        edges = self._get_edge_vectors()
+        # sorted by building and descending edge length, the first edge of each building is its longest one
+        longest_edges = edges[np.lexsort((-np.hypot(*edges.T), self._bldg_positions))[self.offsets[:-1]]]
+        return np.degrees(np.arctan2(longest_edges[:, 0], longest_edges[:, 1])) % 180
+
+    def make_counter_clockwise(self) -> "FootprintArray":
+        """
+        :return: footprints with the vertices of the clockwise footprints reversed, keeping their first vertex
+        """
+        first_vertex_positions = self.offsets[self._bldg_positions]
+        pos_in_footprint = np.arange(len(self.coords)) - first_vertex_positions
+        reversed_pos_in_footprint = (self.get_nr_of_vertices()[self._bldg_positions] - pos_in_footprint) % self.get_nr_of_vertices()[self._bldg_positions]
+        is_clockwise = ~self.is_counter_clockwise()[self._bldg_positions]
+        new_order = first_vertex_positions + np.where(is_clockwise, reversed_pos_in_footprint, pos_in_footprint)
+        return FootprintArray(self.fids, self.heights, self.offsets, self.coords[new_order])
+
+    def remove_collinear_vertices(self, max_deviation: float = DEFAULT_MAX_DEVIATION) -> "FootprintArray":
+        """
+        Remove the vertices lying on the line between their previous and next vertex. Each vertex is checked against its neighbours in
+        the original footprint, thus do not use a large max_deviation, as a series of vertices on a slight curve would all be removed.
+        Footprints which would have less than three vertices left are kept as they are.
+
+        :param max_deviation: distance of the vertex to the line up to which the vertex is removed, in meter
+        :return: footprints without the collinear vertices, note that the first vertex of a footprint can be removed as well
+        """
+        previous_coords = self.coords[self._get_previous_vertex_positions()]
+        next_coords = self.coords[self._get_next_vertex_positions()]
+        base = next_coords - previous_coords
+        to_vertex = self.coords - previous_coords
+        base_length = np.hypot(*base.T)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviations = np.where(base_length > 0, np.abs(base[:, 0] * to_vertex[:, 1] - base[:, 1] * to_vertex[:, 0]) / base_length, np.hypot(*to_vertex.T))
+        is_kept = deviations > max_deviation
+        nr_of_kept_vertices = np.bincount(self._bldg_positions[is_kept], minlength=len(self.fids))
+        is_kept |= (nr_of_kept_vertices < 3)[self._bldg_positions]
+        return self._select_vertices(is_kept)
+
+    def _get_triangle_areas(self) -> np.ndarray:
+        # per vertex the area of the triangle with its previous and next vertex, which is the area lost or gained when removing the vertex
+        to_previous = self.coords[self._get_previous_vertex_positions()] - self.coords
+        to_next = self.coords[self._get_next_vertex_positions()] - self.coords
+        return np.abs(to_previous[:, 0] * to_next[:, 1] - to_previous[:, 1] * to_next[:, 0]) / 2
+
+    def simplify(self, max_nr_of_vertices: int = DEFAULT_MAX_NR_OF_VERTICES, min_triangle_area: float = 0) -> "FootprintArray":
+        """
+        Simplify the footprints with the Visvalingam-Whyatt algorithm: the vertex whose triangle with its previous and next vertex has
+        the smallest area is removed, until the footprint has no more than max_nr_of_vertices vertices and all triangles have at least
+        min_triangle_area. Each round removes one vertex of each footprint to simplify, the triangles are then calculated again.
+        Footprints with three vertices are not simplified further. Note that a simplified footprint can intersect itself or its neighbours.
+
+        :param max_nr_of_vertices: vertex budget per footprint
+        :param min_triangle_area: remove vertices adding less than this area to the footprint, also for footprints within the vertex budget, in m2
+        :return: simplified footprints, compare with get_simplification_report()
+        """
+        assert max_nr_of_vertices >= 3, "footprints need at least three vertices"
+        if min_triangle_area > 0:
+            bldgs_to_simplify = np.flatnonzero(self.get_nr_of_vertices() > 3)
+        else:
+            bldgs_to_simplify = np.flatnonzero(self.get_nr_of_vertices() > max_nr_of_vertices)
+        simplified = self._select_bldgs(bldgs_to_simplify)
+        # positions in bldgs_to_simplify of the buildings in simplified, finished buildings are moved to finished_parts
+        positions = np.arange(len(bldgs_to_simplify))
+        (finished_positions, finished_parts) = ([], [])
+        while len(simplified.fids) > 0:
+            triangle_areas = simplified._get_triangle_areas()
+            # sorted by building and ascending triangle area, the first vertex of each building has the smallest triangle
+            smallest_triangle_positions = np.lexsort((triangle_areas, simplified._bldg_positions))[simplified.offsets[:-1]]
+            nr_of_vertices = simplified.get_nr_of_vertices()
+            is_simplified = (nr_of_vertices > 3) & ((nr_of_vertices > max_nr_of_vertices) | (triangle_areas[smallest_triangle_positions] < min_triangle_area))
+            # a building not simplified in this round is finished, as its triangles do not change anymore
+            finished_positions.append(positions[~is_simplified])
+            finished_parts.append(simplified._select_bldgs(np.flatnonzero(~is_simplified)))
+            is_kept = np.ones(len(simplified.coords), dtype=bool)
+            is_kept[smallest_triangle_positions[is_simplified]] = False
+            simplified = simplified._select_vertices(is_kept)._select_bldgs(np.flatnonzero(is_simplified))
+            positions = positions[is_simplified]
+        return self._replace_bldgs(bldgs_to_simplify[np.concatenate([positions] + finished_positions)], FootprintArray._concatenate([simplified] + finished_parts))
+
+    def get_simplification_report(self, simplified: "FootprintArray") -> pd.DataFrame:
+        """
+        :param simplified: footprints returned by simplify() or remove_collinear_vertices() of this footprints
+        :return: pd.DataFrame indexed by gis_fid with columns "nr_of_vertices", "nr_of_vertices_simplified", "area", "area_simplified", "perimeter", "perimeter_simplified",
+                 "area_deviation", "perimeter_deviation", the deviations relative to the original footprint
+        """
+        assert np.array_equal(self.fids, simplified.fids), "simplified footprints must be of the same buildings"
+        report = pd.DataFrame(
+            {
+                "nr_of_vertices": self.get_nr_of_vertices(),
+                "nr_of_vertices_simplified": simplified.get_nr_of_vertices(),
+                "area": self.get_areas(),
+                "area_simplified": simplified.get_areas(),
+                "perimeter": self.get_perimeters(),
+                "perimeter_simplified": simplified.get_perimeters(),
+            },
+            index=pd.Index(self.fids, name="gis_fid"),
+        )
+        report["area_deviation"] = report["area_simplified"] / report["area"] - 1
+        report["perimeter_deviation"] = report["perimeter_simplified"] / report["perimeter"] - 1
+        return report
+
+    def _select_bldgs(self, bldg_positions: np.ndarray) -> "FootprintArray":
+        is_selected = np.zeros(len(self.fids), dtype=bool)
+        is_selected[bldg_positions] = True
+        footprints = self._select_vertices(is_selected[self._bldg_positions])
+        return FootprintArray(self.fids[bldg_positions], self.heights[bldg_positions], footprints.offsets[np.concatenate([bldg_positions, [len(self.fids)]])], footprints.coords)
+
+    def _replace_bldgs(self, bldg_positions: np.ndarray, footprints: "FootprintArray") -> "FootprintArray":
+        # footprints of the buildings at bldg_positions replaced by the ones passed, which must be in the same order, bldg_positions need not be sorted
+        is_replaced = np.zeros(len(self.fids), dtype=bool)
+        is_replaced[bldg_positions] = True
+        is_kept = ~is_replaced[self._bldg_positions]
+        vertex_bldg_positions = np.concatenate([self._bldg_positions[is_kept], bldg_positions[footprints._bldg_positions]])
+        order = np.argsort(vertex_bldg_positions, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(vertex_bldg_positions, minlength=len(self.fids)))])
+        return FootprintArray(self.fids, self.heights, offsets, np.concatenate([self.coords[is_kept], footprints.coords])[order])
+
+    @staticmethod
+    def _concatenate(footprints_parts: List["FootprintArray"]) -> "FootprintArray":
+        nr_of_vertices = np.concatenate([footprints.get_nr_of_vertices() for footprints in footprints_parts])
+        return FootprintArray(
+            np.concatenate([footprints.fids for footprints in footprints_parts]),
+            np.concatenate([footprints.heights for footprints in footprints_parts]),
+            np.concatenate([[0], np.cumsum(nr_of_vertices)]),
+            np.concatenate([footprints.coords for footprints in footprints_parts]),
+        )
+
+    def _select_vertices(self, is_selected: np.ndarray) -> "FootprintArray":
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(self._bldg_positions[is_selected], minlength=len(self.fids)))])
+        return FootprintArray(self.fids, self.heights, offsets, self.coords[is_selected])
+
+    def get_footprint_table(self) -> pd.DataFrame:
+        """
+        :return: pd.DataFrame indexed by gis_fid with columns "nr_of_vertices", "area", "perimeter", "orientation", "counter_clockwise", for details see the get methods
+        """
+        signed_areas = self.get_signed_areas()
+        return pd.DataFrame(
+            {
+                "nr_of_vertices": self.get_nr_of_vertices(),
+                "area": np.abs(signed_areas),
+                "perimeter": self.get_perimeters(),
+                "orientation": self.get_orientations(),
+                "counter_clockwise": signed_areas > 0,
+            },
+            index=pd.Index(self.fids, name="gis_fid"),
+        )
+
+    def to_flat_site_vertices(self) -> pd.DataFrame:
+        """
+        :return: pd.DataFrame with columns "gis_fid", "height", "x", "y", one row per vertex, as returned by cesarp.geometry.csv_input_parser.read_sitevertices_from_csv()
+        """
+        return pd.DataFrame(
+            {
+                "gis_fid": self.fids[self._bldg_positions],
+                "height": self.heights[self._bldg_positions],
+                "x": self.coords[:, 0],
+                "y": self.coords[:, 1],
+            }
+        )
+
+    def to_per_bldg_footprint(self) -> pd.DataFrame:
+        """
+        :return: pd.DataFrame with columns "gis_fid", "height", "footprint_shape", "main_vertex_x", "main_vertex_y" where footprint_shape is a nested DataFrame, indexed by gis_fid,
+                 as returned by cesarp.geometry.vertices_basics.convert_flat_site_vertices_to_per_bldg_footprint()
+        """
+        footprints = [pd.DataFrame(bldg_coords, columns=["x", "y"]) for bldg_coords in np.split(self.coords, self.offsets[1:-1])]
+        first_vertices = self.coords[self.offsets[:-1]]
+        site_bldgs = pd.DataFrame(
+            {
+                "gis_fid": self.fids.astype(int),
+                "height": self.heights,
+                "footprint_shape": footprints,
+                "main_vertex_x": first_vertices[:, 0],
+                "main_vertex_y": first_vertices[:, 1],
+            }
+        )
+        return site_bldgs.set_index("gis_fid", drop=False)
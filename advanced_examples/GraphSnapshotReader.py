@@ -0,0 +1,247 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Graph reader answering the queries of cesarp.graphdb_access from a precompiled snapshot instead of parsing the TTL file.
+
+The LocalFileReader parses the whole TTL file with rdflib on every start, which takes most of the time for small runs.
+:py:func:`compile_snapshot` parses the TTL file once and runs the queries of the LocalFileReader for all archetypes,
+constructions, layers and materials in the graph. The results are saved in one binary file, together with an index
+and the hash of the TTL file. The :py:class:`GraphSnapshotReader` memory maps that file, reads the index and unpickles
+a query result only when it is requested. If the TTL file changed, the snapshot is compiled again.
+
+Queries which were not precompiled (e.g. get_archetype_by_year_from_graph, or names not in the graph) are answered by
+a LocalFileReader, which parses the TTL file on the first such query.
+
+To compile the snapshot as a build step, run this script with the TTL file as argument.
+"""
+import os
+import sys
+import mmap
+import pickle
+import struct
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import pandas
+from rdflib.namespace import RDF, Namespace
+
+import cesarp.common
+import cesarp.graphdb_access.sparql_queries as sparql_queries
+from cesarp.graphdb_access import _default_config_file
+from cesarp.graphdb_access.LocalFileReader import LocalFileReader
+
+_SNAPSHOT_MAGIC = b"CESARP-GRAPH-SNAPSHOT-1\n"
+_REGULATIONS_PREFIX = "http://uesl_data/sources/regulations/"
+# magic, sha256 hexdigest of the TTL file, length of the index
+_HEADER = struct.Struct(f"<{len(_SNAPSHOT_MAGIC)}s64sQ")
+
+_ARCHETYPE_QUERIES = [
+    "get_constructions_from_graph",
+    "get_glazing_ratio_from_graph",
+    "get_infiltration_rate_from_graph",
+    "get_archetype_year_range_from_graph_for_uri",
+    "get_window_shading_constr_from_graph_for_uri",
+]
+_CONSTRUCTION_QUERIES = ["get_layers_from_graph", "get_u_value_from_graph", "get_construction_emission_from_graph"]
+_MATERIAL_QUERIES = [
+    "get_opaque_material_from_graph",
+    "get_transparent_material_from_graph",
+    "get_material_type_from_graph",
+    "get_gas_from_graph",
+    "get_construction_emission_from_graph",
+]
+
+
+def get_source_hash(ttl_path: Union[str, Path]) -> str:
+    return hashlib.sha256(Path(ttl_path).read_bytes()).hexdigest()
+
+
+def get_default_snapshot_path(ttl_path: Union[str, Path]) -> Path:
+    """
+    :return: snapshot file in the temp folder, the TTL file might be in a read only location (e.g. installed cesar-p package)
+    """
+    path_hash = hashlib.sha1(str(Path(ttl_path).resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / "cesarp_graph_snapshots" / f"{Path(ttl_path).stem}-{path_hash}.snapshot"
+
+
+def compile_snapshot(ttl_path: Union[str, Path], snapshot_path: Union[str, Path], custom_config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Parse the TTL file, run the queries of the LocalFileReader for all archetypes, constructions and materials and save the results.
+
+    :param ttl_path: TTL file with the construction and material data
+    :param snapshot_path: file to write the snapshot to, overwritten if it exists
+    :param custom_config: configuration, used for the file format (GRAPHDB_ACCESS - LOCAL - FORMAT)
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"compiling snapshot of {ttl_path} to {snapshot_path}")
+    source_hash = get_source_hash(ttl_path)
+    reader = LocalFileReader(filename=str(ttl_path), custom_config=custom_config)
+    ues = Namespace(sparql_queries.ues_prefix)
+    g = reader.g
+
+    archetypes = {str(s) for p in [ues.hasSurface, ues.hasInternalCeiling, ues.constructionYearRange, ues.hasGlazingRatioRange, ues.hasInfiltrationRate] for s in g.subjects(p, None)}
+    archetypes.update(str(s) for s in g.subjects(RDF.type, ues.ConstructionArchetype))
+    constructions = {str(o) for p in [ues.hasSurface, ues.hasInternalCeiling, ues.retrofitOf] for o in g.objects(None, p)}
+    constructions.update(str(s) for p in [ues.hasLayer, ues.retrofitOf] for s in g.subjects(p, None))
+    materials = {str(o) for o in g.objects(None, ues.hasMaterial)}
+    regulations = {str(o)[len(_REGULATIONS_PREFIX) :] for p in [ues.minRequirement, ues.targetRequirement] for o in g.objects(None, p) if str(o).startswith(_REGULATIONS_PREFIX)}
+
+    results: Dict[Tuple, pandas.DataFrame] = dict()
+    for query_names, uris in [(_ARCHETYPE_QUERIES, archetypes), (_CONSTRUCTION_QUERIES, constructions), (_MATERIAL_QUERIES, materials)]:
+        for query_name in query_names:
+            for uri in uris:
+                results[(query_name, uri)] = getattr(reader, query_name)(uri)
+    for construction in constructions:
+        for regulation in regulations:
+            for target_requirement in [False, True]:
+                results[("get_retrofit_name", construction, regulation, target_requirement)] = reader.get_retrofit_name(construction, regulation, target_requirement)
+
+    index: Dict[Tuple, Tuple[int, int]] = dict()
+    data = bytearray()
+    for key, df in results.items():
+        record = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+        index[key] = (len(data), len(record))
+        data += record
+    index_data = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.makedirs(Path(snapshot_path).parent, exist_ok=True)
+    # write to temporary file and rename, thus a reader never sees a partially written file
+    tmp_snapshot_path = Path(f"{snapshot_path}.{os.getpid()}.tmp")
+    with open(tmp_snapshot_path, "wb") as f:
+        f.write(_HEADER.pack(_SNAPSHOT_MAGIC, source_hash.encode("ascii"), len(index_data)))
+        f.write(index_data)
+        f.write(data)
+    os.replace(tmp_snapshot_path, snapshot_path)
+    logger.info(f"snapshot of {ttl_path} with {len(index)} query results written to {snapshot_path}")
+
+
+class GraphSnapshotReader:
+    """
+    Drop-in replacement for cesarp.graphdb_access.LocalFileReader.LocalFileReader, see module description.
+    """
+
+    def __init__(self, filename=None, snapshot_path=None, custom_config=None):
+        """
+        :param filename: TTL file, if None the one configured in GRAPHDB_ACCESS - LOCAL - PATH is used
+        :param snapshot_path: snapshot file, if None a file in the temp folder is used, see get_default_snapshot_path()
+        :param custom_config: configuration
+        """
+        self.cfg = cesarp.common.load_config_for_package(_default_config_file, "cesarp.graphdb_access", custom_config)
+        if filename is None:
+            filename = self.cfg["LOCAL"]["PATH"]
+        self.filename = filename  # used as member attribute for debugging output only
+        self._custom_config = custom_config
+        self._logger = logging.getLogger(__name__)
+        if snapshot_path is None:
+            snapshot_path = get_default_snapshot_path(filename)
+        self.snapshot_path = snapshot_path
+        source_hash = get_source_hash(filename)
+        if not self._is_snapshot_valid(source_hash):
+            compile_snapshot(filename, snapshot_path, custom_config)
+        with open(snapshot_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (_, _, index_len) = _HEADER.unpack_from(self._mm, 0)
+        self._index: Dict[Tuple, Tuple[int, int]] = pickle.loads(self._mm[_HEADER.size : _HEADER.size + index_len])
+        self._data_start = _HEADER.size + index_len
+        self._fallback_reader: Optional[LocalFileReader] = None
+
+    def _is_snapshot_valid(self, source_hash: str) -> bool:
+        if not os.path.isfile(self.snapshot_path):
+            return False
+        with open(self.snapshot_path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return False
+        (magic, snapshot_source_hash, _) = _HEADER.unpack(header)
+        is_valid = magic == _SNAPSHOT_MAGIC and snapshot_source_hash.decode("ascii") == source_hash
+        if not is_valid:
+            self._logger.info(f"snapshot {self.snapshot_path} is outdated, {self.filename} changed")
+        return is_valid
+
+    def _get(self, *key) -> pandas.DataFrame:
+        try:
+            (offset, length) = self._index[key]
+        except KeyError:
+            return self._query_fallback_reader(*key)
+        start = self._data_start + offset
+        # return a new DataFrame for each call, as the LocalFileReader does
+        return pickle.loads(self._mm[start : start + length])
+
+    def _query_fallback_reader(self, query_name, *args) -> pandas.DataFrame:
+        if self._fallback_reader is None:
+            self._logger.info(f"{query_name}{args} not in snapshot {self.snapshot_path}, parsing {self.filename}")
+            self._fallback_reader = LocalFileReader(filename=self.filename, custom_config=self._custom_config)
+        return getattr(self._fallback_reader, query_name)(*args)
+
+    def get_constructions_from_graph(self, name):
+        return self._get("get_constructions_from_graph", name)
+
+    def get_layers_from_graph(self, name):
+        return self._get("get_layers_from_graph", name)
+
+    def get_opaque_material_from_graph(self, name):
+        return self._get("get_opaque_material_from_graph", name)
+
+    def get_transparent_material_from_graph(self, name):
+        return self._get("get_transparent_material_from_graph", name)
+
+    def get_material_type_from_graph(self, name):
+        return self._get("get_material_type_from_graph", name)
+
+    def get_gas_from_graph(self, name):
+        return self._get("get_gas_from_graph", name)
+
+    def get_retrofit_name(self, name, regulation, target_requirement=False):
+        return self._get("get_retrofit_name", name, regulation, target_requirement)
+
+    def get_glazing_ratio_from_graph(self, archetype_uri):
+        return self._get("get_glazing_ratio_from_graph", archetype_uri)
+
+    def get_infiltration_rate_from_graph(self, archetype_uri):
+        return self._get("get_infiltration_rate_from_graph", archetype_uri)
+
+    def get_archetype_by_year_from_graph(self, year):
+        return self._get("get_archetype_by_year_from_graph", year)
+
+    def get_u_value_from_graph(self, construction_uri):
+        return self._get("get_u_value_from_graph", construction_uri)
+
+    def get_construction_emission_from_graph(self, construction_uri):
+        return self._get("get_construction_emission_from_graph", construction_uri)
+
+    def get_archetype_year_range_from_graph_for_uri(self, archetype_uri):
+        return self._get("get_archetype_year_range_from_graph_for_uri", archetype_uri)
+
+    def get_window_shading_constr_from_graph_for_uri(self, archetype_uri):
+        return self._get("get_window_shading_constr_from_graph_for_uri", archetype_uri)
+
+    def __str__(self) -> str:
+        return f"{self.filename} (snapshot {self.snapshot_path})"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ttl_file = sys.argv[1] if len(sys.argv) > 1 else cesarp.common.load_config_for_package(_default_config_file, "cesarp.graphdb_access")["LOCAL"]["PATH"]
+    compile_snapshot(ttl_file, sys.argv[2] if len(sys.argv) > 2 else get_default_snapshot_path(ttl_file))
@@ -0,0 +1,245 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Read access to the building containers of an existing project without loading all of them.
+
+SimulationManager(..., load_from_disk=True) reads every building container with its full building model into memory, even if
+only a few values per building are needed. :py:class:`LazyBldgContainerStore` instead keeps an index of the container files
+(fid, file name, size, modification time) and loads a container on the first attribute access of the entry returned for a fid.
+
+Commonly queried scalar values (glazing ratio, number of neighbours, roof construction, floor area and annual demands) are
+kept in a columnar sidecar file, see :py:meth:`LazyBldgContainerStore.get_sidecar`. The sidecar is created by loading each
+container once and is then read memory mapped; only containers changed since are loaded again.
+
+The store is meant for reading, changes to the loaded containers are not saved.
+
+NOTE: You need to have pyarrow installed to use this module (pip install pyarrow)
+"""
+import logging
+import os
+import re
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pint
+import pyarrow as pa
+import pyarrow.feather
+
+import cesarp.manager.json_pickling
+from cesarp.common import config_loader
+from cesarp.manager import _default_config_file
+from cesarp.manager.BuildingContainer import BuildingContainer
+from cesarp.manager.FileStorageHandler import FileStorageHandler
+
+INDEX_FILE_NAME = "bldg_containers_index.csv"
+SIDECAR_FILE_NAME = "bldg_containers_sidecar.feather"
+# sidecar columns with the unit of their values, None for values without unit
+SIDECAR_COLUMNS = {
+    "has_bldg_model": None,
+    "has_demand_result": None,
+    "glazing_ratio": "dimensionless",
+    "nr_of_neighbours": None,
+    "roof_constr": None,
+    "total_floor_area": "m**2",
+    "tot_heating_demand": "kWh/year",
+    "tot_dhw_demand": "kWh/year",
+    "tot_electricity_demand": "kWh/year",
+    "tot_cooling_demand": "kWh/year",
+}
+_DEMAND_COLUMNS = ["total_floor_area", "tot_heating_demand", "tot_dhw_demand", "tot_electricity_demand", "tot_cooling_demand"]
+_FILE_STAT_COLUMNS = ["size", "mtime_ns"]
+
+
+def _to_magnitude(value, unit: str) -> float:
+    if isinstance(value, pint.Quantity):
+        return float(value.to(unit).m)
+    return float(value)
+
+
+def get_sidecar_values(container: BuildingContainer) -> Dict[str, Any]:
+    """
+    :param container: building container
+    :return: values of the SIDECAR_COLUMNS, in the units given there, NaN respectively None if the container has no building model or demand result
+    """
+    values: Dict[str, Any] = {col: np.nan for col in SIDECAR_COLUMNS.keys()}
+    values["has_bldg_model"] = container.has_bldg_model()
+    values["has_demand_result"] = container.has_demand_result()
+    values["roof_constr"] = None
+    if container.has_bldg_model():
+        bldg_model = container.get_bldg_model()
+        values["glazing_ratio"] = _to_magnitude(bldg_model.bldg_construction.glazing_ratio, SIDECAR_COLUMNS["glazing_ratio"])
+        values["nr_of_neighbours"] = len(bldg_model.neighbours)
+        values["roof_constr"] = bldg_model.bldg_construction.roof_constr.short_name
+    if container.has_demand_result():
+        demand_res = container.get_energy_demand_sim_res()
+        for col in _DEMAND_COLUMNS:
+            values[col] = _to_magnitude(getattr(demand_res, col), SIDECAR_COLUMNS[col])
+    return values
+
+
+class LazyBldgContainer:
+    """
+    Stands in for the BuildingContainer of one building, the container is loaded on the first access to one of its attributes, e.g.
+    has_bldg_model(). The loaded container is kept as long as this object is referenced, the store returns the same object for a
+    fid while it is referenced.
+    """
+
+    def __init__(self, store: "LazyBldgContainerStore", fid: int):
+        self._store = store
+        self._fid = fid
+        self._container: Optional[BuildingContainer] = None
+
+    def __getattr__(self, name: str):
+        # only called for attributes not found on this object itself, thus everything of the BuildingContainer
+        # own attributes can be missing if __init__ did not run, e.g. for copy.copy(), do not look them up in the container
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._container is None:
+            self._container = self._store.load(self._fid)
+        return getattr(self._container, name)
+
+    def __repr__(self):
+        return f"LazyBldgContainer(fid={self._fid}, loaded={self._container is not None})"
+
+
+class LazyBldgContainerStore(Mapping[int, LazyBldgContainer]):
+    def __init__(self, base_output_path: Union[str, Path], main_config: Union[str, Path, Dict[str, Any], None] = None):
+        """
+        The index file is read if it is newer than the last change of the building containers folder (a container added or
+        removed), otherwise the folder is scanned and the index file written.
+
+        :param base_output_path: base output folder of the project, as passed to the SimulationManager
+        :param main_config: either dict with configuration entries or path to custom config yml file, as passed to the SimulationManager
+        """
+        if main_config is not None and not isinstance(main_config, dict):
+            main_config = config_loader.load_config_full(main_config)
+        mgr_config = config_loader.load_config_for_package(_default_config_file, "cesarp.manager", main_config)
+        self.base_output_path = Path(base_output_path)
+        self.container_folder = self.base_output_path / Path(mgr_config["BLDG_CONTAINERS_FOLDER_REL"])
+        self._container_file_regexp = re.compile(re.escape(mgr_config["BLDG_CONTAINER_FILENAME_REL"]).replace(re.escape("{}"), r"(\d+)"))
+        self.index_file_path = self.base_output_path / INDEX_FILE_NAME
+        self.sidecar_file_path = self.base_output_path / SIDECAR_FILE_NAME
+        self._logger = logging.getLogger(__name__)
+        self._lazy_containers: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        if self.index_file_path.exists() and os.stat(self.index_file_path).st_mtime_ns > os.stat(self.container_folder).st_mtime_ns:
+            self.index = pd.read_csv(self.index_file_path, index_col="fid")
+        else:
+            self.refresh_index()
+
+    def refresh_index(self) -> None:
+        """
+        Scan the building containers folder and write the index file.
+        Call it after containers were saved again to the existing files, as this is not detected when opening the store.
+        """
+        entries = []
+        with os.scandir(self.container_folder) as dir_entries:
+            for dir_entry in dir_entries:
+                match = self._container_file_regexp.fullmatch(dir_entry.name)
+                if match and dir_entry.is_file():
+                    stat = dir_entry.stat()
+                    entries.append((int(match.group(1)), dir_entry.name, stat.st_size, stat.st_mtime_ns))
+        self.index = pd.DataFrame(entries, columns=["fid", "file_name"] + _FILE_STAT_COLUMNS).set_index("fid").sort_index()
+        # containers saved again are read on the next access
+        self._lazy_containers.clear()
+        self._write_atomic(self.index_file_path, lambda tmp_file_path: self.index.to_csv(tmp_file_path))
+        self._logger.info(f"indexed {len(self.index)} building containers in {self.container_folder}")
+
+    def __getitem__(self, fid: int) -> LazyBldgContainer:
+        if fid not in self.index.index:
+            raise KeyError(f"no building container for fid {fid} in {self.container_folder}")
+        lazy_container = self._lazy_containers.get(fid)
+        if lazy_container is None:
+            lazy_container = LazyBldgContainer(self, fid)
+            self._lazy_containers[fid] = lazy_container
+        return lazy_container
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.index.index.to_list())
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def load(self, fid: int) -> BuildingContainer:
+        """
+        :return: building container of fid, read from disk on each call, with the pathes in the building model converted to absolute ones as when loaded by cesar-p
+        """
+        container_file_path = self.container_folder / self.index.at[fid, "file_name"]
+        container = cesarp.manager.json_pickling.read_bldg_container_from_disk(str(container_file_path))
+        if container.has_bldg_model():
+            FileStorageHandler.convert_rel_to_abs_pathes_in_model(container.get_bldg_model(), self.container_folder)
+        return container
+
+    def get_sidecar(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        The index is refreshed, containers added or changed since the sidecar file was written are loaded and the file is updated.
+        If nothing changed, only the requested columns are read from the memory mapped file.
+
+        :param columns: columns to return, see SIDECAR_COLUMNS, all if not given
+        :return: pd.DataFrame indexed by fid with the requested columns, values in the units of SIDECAR_COLUMNS; containers which could not be loaded have neither building model nor demand result
+        """
+        self.refresh_index()
+        columns = list(SIDECAR_COLUMNS.keys()) if columns is None else list(columns)
+        sidecar = pd.DataFrame(columns=_FILE_STAT_COLUMNS + columns, index=pd.Index([], name="fid"))
+        if self.sidecar_file_path.exists():
+            sidecar = pyarrow.feather.read_table(self.sidecar_file_path, columns=["fid"] + _FILE_STAT_COLUMNS + columns, memory_map=True).to_pandas().set_index("fid")
+        saved_stats = sidecar[_FILE_STAT_COLUMNS].reindex(self.index.index)
+        is_outdated = (saved_stats != self.index[_FILE_STAT_COLUMNS]).any(axis="columns")
+        if is_outdated.any() or len(sidecar) != len(self.index):
+            self._update_sidecar_file(self.index.index[is_outdated].to_list())
+            sidecar = pyarrow.feather.read_table(self.sidecar_file_path, columns=["fid"] + columns, memory_map=True).to_pandas().set_index("fid")
+        return sidecar[columns]
+
+    def _update_sidecar_file(self, fids_to_load: List[int]) -> None:
+        all_columns = ["fid"] + _FILE_STAT_COLUMNS + list(SIDECAR_COLUMNS.keys())
+        kept_rows = pd.DataFrame(columns=all_columns)
+        if self.sidecar_file_path.exists():
+            saved = pyarrow.feather.read_table(self.sidecar_file_path, memory_map=True).to_pandas()
+            kept_rows = saved[saved["fid"].isin(self.index.index) & ~saved["fid"].isin(fids_to_load)]
+        new_rows = []
+        failed_fids = []
+        for fid in fids_to_load:
+            try:
+                values = get_sidecar_values(self.load(fid))
+            except Exception as ex:
+                self._logger.error(f"Could not load building container of fid {fid} from {self.container_folder}. It is loaded again only after the file changed.")
+                self._logger.exception(ex)
+                failed_fids.append(fid)
+                # row with the file stats, thus the broken file is not loaded again on each call
+                values = {**{col: np.nan for col in SIDECAR_COLUMNS.keys()}, "has_bldg_model": False, "has_demand_result": False, "roof_constr": None}
+            new_rows.append({"fid": fid, **self.index.loc[fid, _FILE_STAT_COLUMNS].to_dict(), **values})
+        self._logger.info(f"loaded {len(new_rows)} building containers to update {self.sidecar_file_path}, {len(failed_fids)} of them failed")
+        sidecar = pd.concat([kept_rows, pd.DataFrame(new_rows, columns=all_columns)], ignore_index=True).sort_values("fid")
+        sidecar = sidecar.astype({"fid": "int64", "size": "int64", "mtime_ns": "int64", "has_bldg_model": "bool", "has_demand_result": "bool", "nr_of_neighbours": "Int64"})
+        sidecar["roof_constr"] = sidecar["roof_constr"].astype("string")
+        table = pa.Table.from_pandas(sidecar, preserve_index=False)
+        # uncompressed, thus the file can be memory mapped when reading
+        self._write_atomic(self.sidecar_file_path, lambda tmp_file_path: pyarrow.feather.write_feather(table, tmp_file_path, compression="uncompressed"))
+
+    @staticmethod
+    def _write_atomic(file_path: Path, write) -> None:
+        # write to temporary file and rename, thus a reader never sees a partially written file
+        tmp_file_path = file_path.with_suffix(f".{os.getpid()}.tmp")
+        write(tmp_file_path)
+        os.replace(tmp_file_path, file_path)
@@ -0,0 +1,70 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import logging
+from pathlib import Path
+from typing import Any, Dict, Union
+
+import pint
+
+from cesarp.common import config_loader
+from cesarp.manager import _default_config_file
+from cesarp.manager.FileStorageHandler import FileStorageHandler
+from cesarp.manager.SimulationManager import SimulationManager
+
+from LazyBldgContainerStore import LazyBldgContainerStore
+
+
+class LazyReloadSimulationManager(SimulationManager):
+    """
+    SimulationManager reloading an existing project as with load_from_disk=True, but the building containers are not read on
+    creation. bldg_containers is a :py:class:`LazyBldgContainerStore`, loading a container when it is accessed, and offers the
+    sidecar of commonly queried values with bldg_containers.get_sidecar().
+
+    Use it to postprocess a finished project, e.g. to collect results or building properties. Do not run processing steps changing
+    the building containers, as the loaded containers are not kept and thus not saved.
+    """
+
+    def __init__(self, base_output_path: Union[str, Path], main_config: Union[str, Path, Dict[str, Any]], unit_reg: pint.UnitRegistry, delete_old_logs=True):
+        """
+        for the parameters see :py:class:`cesarp.manager.SimulationManager.SimulationManager`
+        """
+        # same as SimulationManager.__init__() with load_from_disk=True, except for the building containers
+        self.logger = logging.getLogger(__name__)
+        self._unit_reg = unit_reg
+        self.delete_old_logs = delete_old_logs
+
+        if not isinstance(main_config, dict):
+            self._custom_config = config_loader.load_config_full(main_config)
+        else:
+            self._custom_config = main_config
+        self._SimulationManager__validate_custom_config(self._custom_config)
+
+        self._mgr_config = config_loader.load_config_for_package(_default_config_file, "cesarp.manager", self._custom_config)
+        self._storage = FileStorageHandler(base_output_path, self._custom_config, reloading=True)
+        self.failed_fids = set()
+        self._worker_pool = None
+
+        self.bldg_containers = LazyBldgContainerStore(base_output_path, self._custom_config)
+        self.idf_pathes = self._storage.load_existing_idfs()
+        self.weather_files = self._storage.load_existing_weather_mapping() if self.idf_pathes else {}
+        self.output_folders = self._storage.load_existing_result_folders()
+        self._fids_to_use = list(set(list(self.bldg_containers.keys()) + list(self.idf_pathes.keys()) + list(self.output_folders.keys())))
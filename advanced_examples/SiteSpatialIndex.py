@@ -0,0 +1,131 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Grid index over the buildings of a site, to search the neighbours of a building without checking all buildings of the site.
+
+cesarp.geometry.neighbourhood.search_neighbouring_buildings_for() calculates the distance from the building to each other building
+of the site, thus searching the neighbours of all buildings takes quadratic time with the number of buildings. The index puts the
+main vertex (first footprint vertex, which cesar-p uses to measure the distance between buildings) of each building into a square
+grid cell, a search then only checks the buildings in the cells within the radius. The neighbours found are the same as with
+search_neighbouring_buildings_for().
+
+:py:meth:`SiteSpatialIndex.for_site_vertices_file` reads the site vertices file and builds the index only once per process, thus
+all scenarios and building batches run in the same worker process share it.
+"""
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import cesarp.geometry.csv_input_parser
+
+from FootprintArray import FootprintArray
+
+DEFAULT_CELL_SIZE = 100  # in meter, choose about the neighbourhood radius
+# per process, key is resolved path, modification time and size of the site vertices file
+_loaded_indexes: Dict[Tuple[str, int, int], "SiteSpatialIndex"] = dict()
+
+
+def convert_flat_site_vertices_to_per_bldg_footprint(flat_site_vertices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Same as cesarp.geometry.vertices_basics.convert_flat_site_vertices_to_per_bldg_footprint(), but the vertices are sorted by building
+    with NumPy, see FootprintArray, instead of filtering the whole table for each building and appending each building to the result
+    table, which takes quadratic time.
+
+    :param flat_site_vertices: pd.DataFrame with columns "gis_fid", "height", "x", "y", one row per vertex
+    :return: pd.DataFrame with columns "gis_fid", "height", "footprint_shape", "main_vertex_x", "main_vertex_y" where footprint_shape is a nested DataFrame, indexed by gis_fid
+    """
+    return FootprintArray.from_flat_site_vertices(flat_site_vertices).to_per_bldg_footprint()
+
+
+class SiteSpatialIndex:
+    def __init__(self, site_bldgs: pd.DataFrame, cell_size: float = DEFAULT_CELL_SIZE):
+        """
+        Use for_site_vertices_file() instead to share the index within the process.
+
+        :param site_bldgs: buildings of the site as returned by convert_flat_site_vertices_to_per_bldg_footprint()
+        :param cell_size: edge length of the grid cells, in meter
+        """
+        self.site_bldgs = site_bldgs
+        self.cell_size = cell_size
+        self._main_vertices = site_bldgs[["main_vertex_x", "main_vertex_y"]].to_numpy(dtype=float)
+        cells = np.floor(self._main_vertices / cell_size).astype(int)
+        self._positions_per_cell: Dict[Tuple[int, int], np.ndarray] = dict()
+        cell_order = np.lexsort((cells[:, 1], cells[:, 0]))
+        (unique_cells, cell_starts) = np.unique(cells[cell_order], axis=0, return_index=True)
+        for (cell, positions) in zip(unique_cells, np.split(cell_order, cell_starts[1:])):
+            self._positions_per_cell[(int(cell[0]), int(cell[1]))] = positions
+
+    @classmethod
+    def for_site_vertices_file(
+        cls, file_path: Union[str, Path], data_labels: Dict[str, str], separator: str = ",", cell_size: float = DEFAULT_CELL_SIZE
+    ) -> "SiteSpatialIndex":
+        """
+        :param file_path: site vertices CSV file, as configured in MANAGER - SITE_VERTICES_FILE
+        :param data_labels: column names in the file, as configured in MANAGER - SITE_VERTICES_FILE - LABELS
+        :param separator: value separator of the file
+        :param cell_size: edge length of the grid cells, in meter, only used when the index is created
+        :return: index of the given file, read only on the first call per process
+        """
+        stat = os.stat(file_path)
+        key = (str(Path(file_path).resolve()), stat.st_mtime_ns, stat.st_size)
+        if key not in _loaded_indexes:
+            flat_site_vertices = cesarp.geometry.csv_input_parser.read_sitevertices_from_csv(file_path, data_labels, separator)
+            _loaded_indexes[key] = cls(convert_flat_site_vertices_to_per_bldg_footprint(flat_site_vertices), cell_size)
+        return _loaded_indexes[key]
+
+    def get_positions_within(self, x: float, y: float, radius: float) -> np.ndarray:
+        """
+        :param x: x coordinate of the center
+        :param y: y coordinate of the center
+        :param radius: search radius, buildings with a main vertex closer than radius are returned
+        :return: positions in site_bldgs of the buildings found, in ascending order
+        """
+        nr_of_cells = math.ceil(radius / self.cell_size)
+        (center_cell_x, center_cell_y) = (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+        candidates = [
+            self._positions_per_cell[(cell_x, cell_y)]
+            for cell_x in range(center_cell_x - nr_of_cells, center_cell_x + nr_of_cells + 1)
+            for cell_y in range(center_cell_y - nr_of_cells, center_cell_y + nr_of_cells + 1)
+            if (cell_x, cell_y) in self._positions_per_cell
+        ]
+        if not candidates:
+            return np.empty(0, dtype=int)
+        candidate_positions = np.sort(np.concatenate(candidates))
+        # same distance calculation as cesarp.geometry.neighbourhood.search_neighbouring_buildings_for()
+        distances = np.linalg.norm(self._main_vertices[candidate_positions] - [x, y], axis=1)
+        return candidate_positions[distances < radius]
+
+    def search_neighbouring_buildings_for(self, main: Dict[str, Any], radius: float) -> List[Dict[str, Any]]:
+        """
+        Same as cesarp.geometry.neighbourhood.search_neighbouring_buildings_for(), for buildings of the indexed site.
+
+        :param main: main building, as a row of site_bldgs converted to a dict
+        :param radius: radius of neighbourhood
+        :return: List with all neighbour buildings, each entry a dict defining the neighbour building with entries "gis_fid", "footprint_shape", "height", "main_vertex_x", "main_vertex_y"
+        """
+        within_radius = self.site_bldgs.iloc[self.get_positions_within(main["main_vertex_x"], main["main_vertex_y"], radius)]
+        neighbours = within_radius.loc[within_radius["gis_fid"] != main["gis_fid"]]
+        return neighbours.to_dict(orient="records")
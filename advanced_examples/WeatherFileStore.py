@@ -0,0 +1,201 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Weather files (EPW) staged by content and parsed at most once per run.
+
+EnergyPlus reads the weather file itself, thus cesar-p only passes the path of the file on. But the same weather is often used
+under different file names, e.g. the weather files for 2030, 2035, 2040 and 2050 of the example project are byte-identical.
+:py:meth:`WeatherFileStore.stage` puts each distinct weather file into the store folder only once, named by the hash of its content,
+thus all buildings and periods with the same weather use the same file (and e.g. the SimulationResultCache sees the same weather).
+
+If you need the weather data in python, e.g. outdoor temperatures to post-process the results, :py:meth:`WeatherFileStore.load`
+parses the file once and saves the values as a NumPy file next to the staged weather file. All further loads, also from other
+worker processes, map that file into memory instead of parsing the EPW again, the operating system shares the pages between the processes.
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from shutil import copyfile
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# columns of the EPW data records, the data source flags and the present weather codes are text and not included in the values
+EPW_DATA_COLUMNS = [
+    "year",
+    "month",
+    "day",
+    "hour",
+    "minute",
+    "dry_bulb_temperature",
+    "dew_point_temperature",
+    "relative_humidity",
+    "atmospheric_station_pressure",
+    "extraterrestrial_horizontal_radiation",
+    "extraterrestrial_direct_normal_radiation",
+    "horizontal_infrared_radiation_intensity",
+    "global_horizontal_radiation",
+    "direct_normal_radiation",
+    "diffuse_horizontal_radiation",
+    "global_horizontal_illuminance",
+    "direct_normal_illuminance",
+    "diffuse_horizontal_illuminance",
+    "zenith_luminance",
+    "wind_direction",
+    "wind_speed",
+    "total_sky_cover",
+    "opaque_sky_cover",
+    "visibility",
+    "ceiling_height",
+    "present_weather_observation",
+    "precipitable_water",
+    "aerosol_optical_depth",
+    "snow_depth",
+    "days_since_last_snowfall",
+    "albedo",
+    "liquid_precipitation_depth",
+    "liquid_precipitation_quantity",
+]
+_NR_OF_EPW_DATA_FIELDS = 35
+_EPW_DATA_COLUMN_POSITIONS = [pos for pos in range(_NR_OF_EPW_DATA_FIELDS) if pos not in (5, 27)]
+_NR_OF_EPW_HEADER_LINES = 8
+# per process, key is the destination folder
+_stores: Dict[Path, "WeatherFileStore"] = dict()
+
+
+class EPWWeatherData:
+    """
+    Weather data of one EPW file, values are read only and memory mapped.
+    """
+
+    def __init__(self, header_lines: List[str], values: np.ndarray):
+        """
+        :param header_lines: the header lines of the EPW file (LOCATION, DESIGN CONDITIONS, ..., DATA PERIODS)
+        :param values: one row per data record, columns as in EPW_DATA_COLUMNS
+        """
+        self.header: Dict[str, List[str]] = {fields[0]: fields[1:] for fields in (line.rstrip("\r\n").split(",") for line in header_lines)}
+        self.values = values
+
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        :param name: column name, see EPW_DATA_COLUMNS
+        :return: values of the column, one per data record
+        """
+        return self.values[:, EPW_DATA_COLUMNS.index(name)]
+
+    def get_monthly_ground_temperatures(self) -> Dict[float, List[float]]:
+        """
+        :return: per depth in meter the ground temperature in degree celsius for each month, as in the GROUND TEMPERATURES header of the EPW file
+        """
+        fields = self.header.get("GROUND TEMPERATURES", ["0"])
+        temps_per_depth = dict()
+        for depth_nr in range(int(fields[0])):
+            depth_fields = fields[1 + depth_nr * 16 : 1 + (depth_nr + 1) * 16]
+            temps_per_depth[float(depth_fields[0])] = [float(temp) for temp in depth_fields[4:]]
+        return temps_per_depth
+
+
+class WeatherFileStore:
+    """
+    Folder holding the weather files of a run, each distinct file only once, see module description.
+    Several worker processes can use the same folder at the same time, files are written to a temporary file and renamed.
+    """
+
+    def __init__(self, folder: Union[str, Path]):
+        """
+        :param folder: folder to stage the weather files to, created if not existing
+        """
+        self.folder = Path(folder)
+        self._content_hashes: Dict[Tuple[str, int, int], str] = dict()  # key is source path, size and modification time
+        self._loaded: Dict[str, EPWWeatherData] = dict()  # key is the content hash
+        os.makedirs(self.folder, exist_ok=True)
+
+    @classmethod
+    def for_folder(cls, folder: Union[str, Path]) -> "WeatherFileStore":
+        """
+        :return: store for the given folder, created on the first call per process
+        """
+        folder_path = Path(folder).resolve()
+        if folder_path not in _stores:
+            _stores[folder_path] = cls(folder)
+        return _stores[folder_path]
+
+    def get_content_hash(self, epw_file_path: Union[str, Path]) -> str:
+        """
+        :return: sha256 of the file content, the file is hashed once per process as long as its size and modification time do not change
+        """
+        stat = os.stat(epw_file_path)
+        key = (os.path.abspath(epw_file_path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._content_hashes:
+            with open(epw_file_path, "rb") as f:
+                self._content_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+        return self._content_hashes[key]
+
+    def stage(self, epw_file_path: Union[str, Path]) -> Path:
+        """
+        :param epw_file_path: weather file
+        :return: path of the weather file in the store folder, the same for all weather files with the same content
+        """
+        staged_path = self.folder / f"{self.get_content_hash(epw_file_path)}.epw"
+        if not staged_path.exists():
+            tmp_path = staged_path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                os.link(epw_file_path, tmp_path)
+            except OSError:  # e.g. source and store folder on different file systems, copy instead
+                copyfile(epw_file_path, tmp_path)
+            os.replace(tmp_path, staged_path)
+            logging.getLogger(__name__).info(f"staged weather file {epw_file_path} as {staged_path}")
+        return staged_path
+
+    def stage_mapping(self, epw_file_per_key: Dict) -> Dict:
+        """
+        :param epw_file_per_key: weather file per key, e.g. per retrofit period or per building fid
+        :return: staged weather file per key, as string
+        """
+        return {key: str(self.stage(epw_file_path)) for (key, epw_file_path) in epw_file_per_key.items()}
+
+    def load(self, epw_file_path: Union[str, Path]) -> EPWWeatherData:
+        """
+        :param epw_file_path: weather file, staged or not
+        :return: parsed weather data, parsed only the first time the content is loaded from this store folder
+        """
+        content_hash = self.get_content_hash(epw_file_path)
+        if content_hash not in self._loaded:
+            staged_path = self.stage(epw_file_path)
+            values_path = staged_path.with_suffix(".npy")
+            if not values_path.exists():
+                self._save_values(staged_path, values_path)
+            with open(staged_path, "r", encoding="latin-1") as f:
+                header_lines = [f.readline() for _ in range(_NR_OF_EPW_HEADER_LINES)]
+            self._loaded[content_hash] = EPWWeatherData(header_lines, np.load(values_path, mmap_mode="r"))
+        return self._loaded[content_hash]
+
+    @staticmethod
+    def _save_values(epw_file_path: Path, values_path: Path) -> None:
+        data = pd.read_csv(epw_file_path, skiprows=_NR_OF_EPW_HEADER_LINES, header=None, encoding="latin-1")
+        data = data.reindex(columns=_EPW_DATA_COLUMN_POSITIONS)  # some EPW files omit the last fields, those are NaN
+        tmp_path = values_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, data.to_numpy(dtype=float))
+        os.replace(tmp_path, values_path)
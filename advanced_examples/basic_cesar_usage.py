@@ -103,6 +103,7 @@ def run_sim_site(base_output_folder: Union[str, Path], main_config_path: Union[s
     # if you need different result parameters, you have to make sure that energy plus reports them. Do so by using the configuration parameters from eplus_adapter package, namely
     # "OUTPUR_METER" and "OUTPUT_VARS", see cesarp.eplus_adapter.default_config.yml. You can overwrite those parameters in your project config, in this example that would be main_config.yml.
     # Also make sure that the reporting frequency in the configuration and in the collect_custom_results() call match.
+    # for sites with many buildings this frame gets too big for memory, see large_site_results/streaming_result_collection.py for streaming the results to a Parquet file
     result_series_frame = sim_manager.collect_custom_results(result_keys=[RES_KEY_HEATING_DEMAND, RES_KEY_DHW_DEMAND], results_frequency=ResultsFrequency.HOURLY)
     # you can postprocess the results as you like, e.g. save to a file
     result_series_frame.to_csv(__abs_path(base_output_folder) / Path("hourly_results.csv"))
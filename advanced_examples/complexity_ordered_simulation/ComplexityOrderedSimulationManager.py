@@ -0,0 +1,116 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+from pathlib import Path
+from typing import Dict, Any, List, Union, Optional
+
+import pint
+
+import cesarp.eplus_adapter.eplus_sim_runner
+from cesarp.manager import processing_steps
+from cesarp.manager.SimulationManager import SimulationManager
+from cesarp.eplus_adapter.eplus_error_file_handling import EPLUS_ERROR_FILE_NAME
+
+from SimulationCostEstimator import SimulationCostEstimator, SIM_TIME_LOG_FILE_NAME
+
+
+class ComplexityOrderedSimulationManager(SimulationManager):
+    """
+    SimulationManager which starts the EnergyPlus simulations of the most expensive buildings first.
+
+    The SimulationManager submits the simulations in fid order. When a few complex buildings (many footprint vertices,
+    many neighbours) happen to be submitted last, most workers are idle while those are still running.
+    The worker pool hands out jobs one by one from a shared queue to whichever worker is free, thus submitting the jobs
+    sorted by decreasing estimated cost (see :py:class:`SimulationCostEstimator`) is enough to get a longest-first schedule:
+    the long jobs are spread over all workers at the beginning and the short ones fill the gaps at the end.
+    """
+
+    def __init__(
+        self,
+        base_output_path: Union[str, Path],
+        main_config: Union[str, Path, Dict[str, Any]],
+        unit_reg: pint.UnitRegistry,
+        sim_time_log_path: Optional[Union[str, Path]] = None,
+        load_from_disk: bool = False,
+        fids_to_use: List[int] = None,
+        delete_old_logs=True,
+    ):
+        """
+        :param sim_time_log_path: eplus_simulation_timelog.csv of a previous run of the same site to use the measured simulation times,
+                                  if None the time log in base_output_path is used if it exists (e.g. when re-running with load_from_disk=True)
+        :type sim_time_log_path: Optional[Union[str, Path]]
+
+        for all other parameters see :py:class:`cesarp.manager.SimulationManager.SimulationManager`
+        """
+        super().__init__(base_output_path, main_config, unit_reg, load_from_disk=load_from_disk, fids_to_use=fids_to_use, delete_old_logs=delete_old_logs)
+        self._sim_time_log_path = sim_time_log_path if sim_time_log_path else Path(self._storage.base_output_path) / Path(SIM_TIME_LOG_FILE_NAME)
+
+    def get_fids_by_decreasing_cost(self) -> List[int]:
+        """
+        :return: fid's having an IDF, ordered by decreasing estimated simulation cost
+        """
+        costs = SimulationCostEstimator(self._sim_time_log_path).estimate_costs(self.bldg_containers, self.idf_pathes)
+        return sorted(costs.keys(), key=lambda fid: costs[fid], reverse=True)
+
+    def run_simulations(self) -> List[int]:
+        """
+        Run EnergyPlus simulation for all buildings having an IDF, most expensive buildings first.
+
+        :return: fid's for which EnergyPlus simulation failed
+        """
+        assert self.is_ready_to_run_sim(), "please run create_IDFs before calling run_simulation"
+
+        for container in self.bldg_containers.values():
+            container.clear_results()
+
+        bldg_gis_ids_to_simulate = self.get_fids_by_decreasing_cost()
+        self.logger.info(f"simulating {len(bldg_gis_ids_to_simulate)} buildings, starting with the most expensive ones {bldg_gis_ids_to_simulate[:5]}")
+        expected_output_folders = self._storage.get_eplus_output_pathes(bldg_gis_ids_to_simulate)
+
+        config_eplus = cesarp.eplus_adapter.eplus_sim_runner.get_config(self._custom_config)
+        job_res_dict = {
+            fid: self._get_worker_pool().apply_async(
+                processing_steps.run_simulation_no_exception,
+                (self.idf_pathes[fid], self.weather_files[fid], expected_output_folders[fid], config_eplus),
+            )
+            for fid in bldg_gis_ids_to_simulate
+        }
+        res_tuples_dict = {fid: res.get() for fid, res in job_res_dict.items()}
+        eplus_run_timelog = {}
+        fids_sim_failed = []
+        fids_sim_successful = []
+        for fid in sorted(res_tuples_dict.keys()):
+            (successful, sim_time) = res_tuples_dict[fid]
+            eplus_run_timelog[fid] = sim_time
+            if successful:
+                fids_sim_successful.append(fid)
+                self.output_folders[fid] = expected_output_folders[fid]
+            else:
+                fids_sim_failed.append(fid)
+                self.bldg_containers[fid].set_error()
+
+        if fids_sim_failed:
+            self.logger.error(f"simulation failed for fids {fids_sim_failed}")
+            self.failed_fids.update(fids_sim_failed)
+
+        self._storage.save_eplus_sim_time_log(eplus_run_timelog)
+        self._storage.combine_eplus_error_files(fids_sim_failed, fids_sim_successful, EPLUS_ERROR_FILE_NAME)
+        return fids_sim_failed
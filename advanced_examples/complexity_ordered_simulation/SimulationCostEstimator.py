@@ -0,0 +1,94 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import logging
+import statistics
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Union
+
+import pandas as pd
+
+from cesarp.manager.BuildingContainer import BuildingContainer
+from cesarp.model.BuildingModel import BuildingModel
+
+# name and columns of the file written by cesarp.manager.FileStorageHandler.save_eplus_sim_time_log()
+SIM_TIME_LOG_FILE_NAME = "eplus_simulation_timelog.csv"
+_SIM_TIME_LOG_FID_COL = "idf path"
+_SIM_TIME_LOG_TIME_COL = "simulation time in sec"
+
+# weight of one shading surface of the neighbours relative to one surface of the building itself
+NEIGHBOUR_SURFACE_WEIGHT = 0.05
+
+
+class SimulationCostEstimator:
+    """
+    Estimates the relative EnergyPlus runtime of buildings, used to start the most expensive simulations first.
+
+    If the simulation time of a building is known from a previous run (eplus_simulation_timelog.csv), that time is used.
+    Otherwise the cost is estimated from the building model: the number of surfaces of the building (floors times footprint
+    vertices) weighted with the number of shading surfaces of the neighbours. If a previous run is available, the estimates
+    are scaled to seconds with the median ratio of measured time to estimated cost, so measured and estimated costs can be
+    compared. Buildings without a building model are estimated by the size of their IDF file.
+    """
+
+    def __init__(self, sim_time_log_path: Optional[Union[str, Path]] = None):
+        """
+        :param sim_time_log_path: eplus_simulation_timelog.csv of a previous run of the same site, if None or not existing only the building models are used
+        """
+        self._measured_times: Dict[int, float] = self._read_sim_time_log(sim_time_log_path) if sim_time_log_path else {}
+
+    def estimate_costs(self, bldg_containers: Mapping[int, BuildingContainer], idf_pathes: Mapping[int, Union[str, Path]]) -> Dict[int, float]:
+        """
+        :param bldg_containers: building containers per fid, building model is used if available
+        :param idf_pathes: IDF file per fid, defines for which buildings the cost is estimated
+        :return: estimated cost per fid, the higher the longer the simulation is expected to run
+        """
+        model_costs = {fid: self._get_model_cost(bldg_containers.get(fid), idf_path) for fid, idf_path in idf_pathes.items()}
+        known_ratios = [self._measured_times[fid] / cost for fid, cost in model_costs.items() if fid in self._measured_times and cost > 0]
+        scale = statistics.median(known_ratios) if known_ratios else 1.0
+        return {fid: self._measured_times.get(fid, cost * scale) for fid, cost in model_costs.items()}
+
+    @staticmethod
+    def get_model_cost(bldg_model: BuildingModel) -> float:
+        """
+        :param bldg_model: building model to estimate the simulation cost for
+        :return: relative cost, not scaled to seconds
+        """
+        bldg_shape = bldg_model.bldg_shape
+        nr_of_vertices = len(bldg_shape.groundfloor.index)
+        nr_of_surfaces = bldg_shape.get_nr_of_floors() * (nr_of_vertices + 2)
+        nr_of_shading_surfaces = sum(sum(len(walls_of_floor) for walls_of_floor in neighbour.walls) + 1 for neighbour in bldg_model.neighbours.values()) if bldg_model.neighbours else 0
+        return nr_of_surfaces * (1 + NEIGHBOUR_SURFACE_WEIGHT * nr_of_shading_surfaces)
+
+    def _get_model_cost(self, bldg_container: Optional[BuildingContainer], idf_path: Union[str, Path]) -> float:
+        if bldg_container is not None and bldg_container.has_bldg_model():
+            return self.get_model_cost(bldg_container.get_bldg_model())
+        # roughly one kB of IDF per building surface
+        return os.path.getsize(idf_path) / 1000 if os.path.exists(idf_path) else 0
+
+    @staticmethod
+    def _read_sim_time_log(sim_time_log_path: Union[str, Path]) -> Dict[int, float]:
+        if not os.path.exists(sim_time_log_path):
+            logging.getLogger(__name__).info(f"no simulation time log found at {sim_time_log_path}, estimating costs from building models only")
+            return {}
+        time_log = pd.read_csv(sim_time_log_path, index_col=0)
+        return {int(fid): float(sim_time) for fid, sim_time in zip(time_log[_SIM_TIME_LOG_FID_COL], time_log[_SIM_TIME_LOG_TIME_COL])}
@@ -0,0 +1,64 @@
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to shorten the total runtime for sites with buildings of very different complexity, by simulating the
+most expensive buildings first. Most useful with many parallel workers (see NR_OF_PARALLEL_WORKERS in main_config.yml).
+
+If you ran basic_cesar_usage.py before, the simulation times measured in that run are used to order the buildings,
+otherwise the order is estimated from the building models only.
+For details see :py:class:`ComplexityOrderedSimulationManager` and :py:class:`SimulationCostEstimator`.
+"""
+
+import logging.config
+import logging
+import os
+import shutil
+import sys
+
+import cesarp.common
+import cesarp.common.config_loader
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    # make sure the ComplexityOrderedSimulationManager can be found
+    sys.path.append(os.path.dirname(__file__))
+    from ComplexityOrderedSimulationManager import ComplexityOrderedSimulationManager
+
+    main_config_path = __abs_path("../main_config.yml")
+    output_dir = __abs_path("../results/complexity_ordered_simulation")
+    # simulation times of a previous run of the same site
+    sim_time_log_path = __abs_path("../results/basic_cesar_usage/eplus_simulation_timelog.csv")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    sim_manager = ComplexityOrderedSimulationManager(output_dir, main_config_path, cesarp.common.init_unit_registry(), sim_time_log_path=sim_time_log_path)
+    sim_manager.run_all_steps()
+
+    print("====================")
+    print(f"check out results in {output_dir}")
+    if sim_manager.failed_fids:
+        logging.warning(f"Something went wrong for following FID's {sim_manager.failed_fids}")
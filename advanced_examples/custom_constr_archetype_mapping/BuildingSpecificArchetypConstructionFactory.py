@@ -20,6 +20,7 @@
 # Contact: https://www.empa.ch/web/s313
 #
 from typing import Dict, Any
+import pandas as pd
 import pint
 import logging
 import cesarp.common
@@ -27,10 +28,21 @@ from cesarp.construction.construction_protocols import ArchetypicalBuildingConst
 from cesarp.construction.ConstructionBasics import ConstructionBasics
 from cesarp.model.EnergySource import EnergySource
 
-from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader, GraphReaderProtocol, BuildingElementConstrcutionsArchetype
+from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader, GraphReaderProtocol
 from cesarp.graphdb_access.ArchetypicalConstructionGraphDBBased import ArchetypicalConstructionGraphDBBased
 from cesarp.graphdb_access import _default_config_file
 
+from ArchetypeConstructionStore import ArchetypeConstructionStore, ArchetypeGraphData, read_archetype_graph_data
+from BuildingInformationTable import BuildingInformationTable
+
+
+def read_bldg_fid_to_archetype_lookup(custom_config: Dict[str, Any]) -> pd.Series:
+    """
+    :return: archetype URI indexed by building fid, shared with other factories reading the same building information file
+    """
+    bldg_type_cfg = custom_config["MANAGER"]["BLDG_TYPE_PER_BLDG_FILE"]
+    return BuildingInformationTable.for_file(bldg_type_cfg["PATH"], bldg_type_cfg["SEPARATOR"]).get_column("ConstructionArchetype")
+
 
 class BuildingSpecificArchetypConstructionFactory:
     """
@@ -43,6 +55,9 @@ class BuildingSpecificArchetypConstructionFactory:
     The class must implement the protocol/interface specified in cesarp.construction.construction_protocols.ArchetypicalConstructionFactoryProtocol
     The __init__ must take same arguments as cesarp.graphdb_access.GraphDBArchetypicalConstructionFactory.GraphDBArchetypicalConstructionFactory.__init__ due to the fact that the
     factory is created from cesar-p-core code depending on config (namely in cesarp.graphdb_access.GraphDBFacade).
+
+    If an archetype store was created in the main process (see ArchetypeConstructionStore.create_shared_archetype_store),
+    the archetypes are taken from there instead of querying them from the graph.
     """
 
     def __init__(
@@ -77,35 +92,30 @@ class BuildingSpecificArchetypConstructionFactory:
         self._constr_reader = BldgElementConstructionReader(graph_data_reader, ureg, custom_config)
         self._construction_basics = ConstructionBasics(self._ureg, custom_config)
         self._archetypes_cache: Dict[str, ArchetypicalConstructionGraphDBBased] = dict()
-        self._bldg_fid_to_archetype_lookup: Dict[int, str] = self._read_bldg_fid_to_archetype_lookup()
-        self._construction_cache: Dict[str, BuildingElementConstrcutionsArchetype] = dict()  # key is archetype URI
+        self._bldg_fid_to_archetype_lookup: pd.Series = read_bldg_fid_to_archetype_lookup(custom_config)
+        self._shared_store = ArchetypeConstructionStore.from_environment()
+        self._construction_cache: Dict[str, ArchetypeGraphData] = dict()  # key is archetype URI
 
-    def _read_bldg_fid_to_archetype_lookup(self) -> Dict[int, str]:
-        bldg_type_cfg = self._custom_config["MANAGER"]["BLDG_TYPE_PER_BLDG_FILE"]
-        bldg_fid_to_archetype = cesarp.common.csv_reader.read_csvy(
-            bldg_type_cfg["PATH"],
-            ["gis_fid", "ConstructionArchetype"],
-            {"gis_fid": "ORIG_FID", "ConstructionArchetype": "ConstructionArchetype"},
-            bldg_type_cfg["SEPARATOR"],
-            "gis_fid",
-        )
-        return bldg_fid_to_archetype["ConstructionArchetype"].to_dict()
+    def _get_archetype_graph_data(self, archetype_uri: str) -> ArchetypeGraphData:
+        if archetype_uri not in self._construction_cache.keys():
+            graph_data = self._shared_store.get(archetype_uri) if self._shared_store else None
+            if graph_data is None:
+                graph_data = read_archetype_graph_data(self._constr_reader, archetype_uri)
+            self._construction_cache[archetype_uri] = graph_data
+        return self._construction_cache[archetype_uri]
 
     def get_archetype_for(self, bldg_fid: int) -> ArchetypicalBuildingConstruction:
 
         archetype_uri = self._bldg_fid_to_archetype_lookup[bldg_fid]
 
-        if archetype_uri in self._construction_cache.keys():
-            constr_from_graph_db = self._construction_cache[archetype_uri]
-        else:
-            constr_from_graph_db = self._constr_reader.get_bldg_elem_construction_archetype(archetype_uri)
-            self._construction_cache[archetype_uri] = constr_from_graph_db
+        graph_data = self._get_archetype_graph_data(archetype_uri)
+        constr_from_graph_db = graph_data.constructions
 
         archetype = ArchetypicalConstructionGraphDBBased(
             window_glass_constr_options=constr_from_graph_db.windows,
             window_glass_constr_default=self._constr_reader.get_default_construction(constr_from_graph_db.windows, constr_from_graph_db.short_name),
             window_frame_construction=self._construction_basics.get_fixed_window_frame_construction(),
-            window_shade_constr=self._constr_reader.get_window_shading_constr(archetype_uri),
+            window_shade_constr=graph_data.window_shade_constr,
             roof_constr_options=constr_from_graph_db.roofs,
             roof_constr_default=self._constr_reader.get_default_construction(constr_from_graph_db.roofs, constr_from_graph_db.short_name),
             groundfloor_constr_options=constr_from_graph_db.grounds,
@@ -114,8 +124,8 @@ class BuildingSpecificArchetypConstructionFactory:
             wall_constr_default=self._constr_reader.get_default_construction(constr_from_graph_db.walls, constr_from_graph_db.short_name),
             internal_ceiling_options=constr_from_graph_db.internal_ceilings,
             internal_ceiling_default=self._constr_reader.get_default_construction(constr_from_graph_db.internal_ceilings, constr_from_graph_db.short_name),
-            glazing_ratio=self._constr_reader.get_glazing_ratio(constr_from_graph_db.name),
-            infiltration_rate=self._constr_reader.get_infiltration_rate(constr_from_graph_db.name),
+            glazing_ratio=graph_data.glazing_ratio,
+            infiltration_rate=graph_data.infiltration_rate,
             infiltration_fraction_profile_value=self._cfg["FIXED_INFILTRATION_PROFILE_VALUE"] * self._ureg.dimensionless,
             installations_characteristics=self._construction_basics.get_inst_characteristics(
                 self._bldg_fid_to_dhw_ecarrier_lookup[bldg_fid],
@@ -37,7 +37,6 @@ import sys
 
 import cesarp.common
 import cesarp.common.config_loader
-from cesarp.manager.SimulationManager import SimulationManager
 
 
 def __abs_path(path):
@@ -48,8 +47,13 @@ if __name__ == "__main__":
     # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
     logging.config.fileConfig(__abs_path("../logging.conf"))
 
-    # make sure the BuildingSpecificArechtypConstrctionFactory can be found
+    # make sure the BuildingSpecificArechtypConstrctionFactory, the ArchetypeConstructionStore and the shared CustomFactorySimulationManager can be found
     sys.path.append(os.path.dirname(__file__))
+    sys.path.append(__abs_path(".."))
+    from ArchetypeStoreBldgModelFactory import ArchetypeStoreBldgModelFactory
+    from CustomFactorySimulationManager import CustomFactorySimulationManager
+    from ArchetypeConstructionStore import create_shared_archetype_store
+    from BuildingSpecificArchetypConstructionFactory import read_bldg_fid_to_archetype_lookup
 
     # the configuration points to the custom constructional archetype factory
     main_config_path = __abs_path("custom_constr_archetype_config.yml")
@@ -57,7 +61,12 @@ if __name__ == "__main__":
     shutil.rmtree(output_dir, ignore_errors=True)
 
     fids_to_use = [1, 2, 8]  # set to None to simulate all buildings
-    sim_manager = SimulationManager(output_dir, main_config_path, cesarp.common.init_unit_registry(), fids_to_use=fids_to_use)
+    ureg = cesarp.common.init_unit_registry()
+    # read the archetypes once in this process, the worker processes then load them from the store instead of parsing and querying the graph
+    main_config = cesarp.common.config_loader.load_config_full(main_config_path)
+    create_shared_archetype_store(__abs_path("../results/archetype_store"), read_bldg_fid_to_archetype_lookup(main_config).unique(), ureg, main_config)
+
+    sim_manager = CustomFactorySimulationManager(output_dir, main_config_path, ureg, fids_to_use=fids_to_use, bldg_model_factory_class=ArchetypeStoreBldgModelFactory)
     sim_manager.run_all_steps()
 
     print("====================")
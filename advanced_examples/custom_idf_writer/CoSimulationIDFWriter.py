@@ -24,6 +24,7 @@ import pint
 import os
 import shutil
 import copy
+from pathlib import Path
 import cesarp.common.ScheduleTypeLimits
 from typing import TypeVar, Mapping, Optional, Union, Tuple, Dict, List, Any
 from eppy.modeleditor import IDF
@@ -49,9 +50,22 @@ from cesarp.eplus_adapter.ConstructionIDFWritingHandler import ConstructionIDFWr
 from cesarp.eplus_adapter.CesarIDFWriter import CesarIDFWriter
 from cesarp.model.BuildingOperation import BuildingOperation, HVACOperation
 from cesarp.eplus_adapter.ConstructionIDFWritingHandler import FLORR_CONSTR_SUFFIX
+from cesarp.manager import _default_config_file as _manager_default_config_file
+
+from ContentAddressedProfileStore import ContentAddressedProfileStore
 
 ConstrType = TypeVar("ConstrType")
 
+# attributes of BuildingOperation holding profiles, with the names of the profile attributes
+_BLDG_OP_PROFILE_ATTRIBUTES = [
+    ("electric_appliances", ["fraction_schedule"]),
+    ("lighting", ["fraction_schedule"]),
+    ("occupancy", ["occupancy_fraction_schedule", "activity_schedule"]),
+    ("dhw", ["fraction_schedule"]),
+    ("hvac", ["ventilation_fraction_schedule", "cooling_setpoint_schedule", "heating_setpoint_schedule"]),
+    ("night_vent", ["maximum_indoor_temp_profile"]),
+]
+
 
 def no_constr_writer(constr, idf: IDF):
     return idf
@@ -67,8 +81,13 @@ class CoSimulationIDFWriter:
 
     For each building, you create a new instance of CesarIDFWriter and call write_bldg_model() to create a full IDF file.
 
+    If profiles are copied to the IDF folder (MANAGER - COPY_PROFILES), they are stored by content with ContentAddressedProfileStore
+    instead of the passed profiles_files_handler, thus profiles with the same content are stored only once for the whole site.
     """
 
+    # writer for the parts of the IDF which are the same as for cesar-p standard IDF files
+    _basewriter_class = CesarIDFWriter
+
     def __init__(self, idf_file_path, unit_registry, profiles_files_handler=None, custom_config={}, package_config: Dict[str, Any] = None):
         """
         You can only use one construction type at a time. All three constr_xxx callables take a construction object as the first argument.
@@ -84,7 +103,12 @@ class CoSimulationIDFWriter:
         :param custom_config: dictionary containing configuration entries overwriting package default config
         :param package_config: allow that the package configuration is passed as dict, to avoid that we need to load the config from file in the IDFWriterFactory and here..., Optional, if not provided config is loaded as normal from default config file and custom_config dict.
         """
-        self.basewriter = CesarIDFWriter(idf_file_path, unit_registry, profiles_files_handler, custom_config, package_config)
+        self.basewriter = self._basewriter_class(idf_file_path, unit_registry, profiles_files_handler, custom_config, package_config)
+        self._profile_store = None
+        if profiles_files_handler is not None:
+            # same folder as used by the profiles_files_handler of cesar-p, profile pathes are relative to the IDF folder
+            mgr_cfg = config_loader.load_config_for_package(_manager_default_config_file, "cesarp.manager", custom_config)
+            self._profile_store = ContentAddressedProfileStore.for_folder(Path(idf_file_path).parent, mgr_cfg["COPY_PROFILES"]["PROFILES_FOLDER_NAME_REL"])
 
     def write_bldg_model(self, bldg_model: BuildingModel) -> None:
         """
@@ -106,7 +130,7 @@ class CoSimulationIDFWriter:
             bldg_model.bldg_operation_mapping,
             bldg_model.bldg_construction.installation_characteristics,
             bldg_model.bldg_construction.infiltration_rate,
-            self.basewriter._handle_profile_file(bldg_model.bldg_construction.infiltration_profile),
+            self._handle_profile_file(bldg_model.bldg_construction.infiltration_profile),
             bldg_model.bldg_construction.window_constr.shade,
         )
         idf = self.add_floor_heating(idf, bldg_model.bldg_construction)
@@ -183,18 +207,7 @@ class CoSimulationIDFWriter:
         ), f"zones/floors {list(self.basewriter.zone_data.keys())} in geometry do not match with the floors in the building operation mapping ({building_operation_mapping.all_assigned_floor_nrs})"  # type: ignore  # checked self.basewriter.zone_data for none in assert on line 288
 
         for (floor_nrs, bldg_op) in building_operation_mapping.get_operation_assignments():
-            bldg_op_local_profiles = copy.deepcopy(bldg_op)
-            bldg_op_local_profiles.electric_appliances.fraction_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.electric_appliances.fraction_schedule)
-            bldg_op_local_profiles.lighting.fraction_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.lighting.fraction_schedule)
-            bldg_op_local_profiles.occupancy.occupancy_fraction_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.occupancy.occupancy_fraction_schedule)
-            bldg_op_local_profiles.dhw.fraction_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.dhw.fraction_schedule)
-            bldg_op_local_profiles.hvac.ventilation_fraction_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.hvac.ventilation_fraction_schedule)
-            bldg_op_local_profiles.hvac.cooling_setpoint_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.hvac.cooling_setpoint_schedule)
-            bldg_op_local_profiles.hvac.heating_setpoint_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.hvac.heating_setpoint_schedule)
-            bldg_op_local_profiles.occupancy.activity_schedule = self.basewriter._handle_profile_file(bldg_op_local_profiles.occupancy.activity_schedule)
-
-            if bldg_op_local_profiles.night_vent.is_active:
-                bldg_op_local_profiles.night_vent.maximum_indoor_temp_profile = self.basewriter._handle_profile_file(bldg_op_local_profiles.night_vent.maximum_indoor_temp_profile)
+            bldg_op_local_profiles = self._get_bldg_op_with_local_profiles(bldg_op)
             for floor_nr, (zone_name, windows_in_zone) in self.basewriter.zone_data.items():  # type: ignore  # checked self.basewriter.zone_data for none in assert on line 288
                 if floor_nr in floor_nrs:
                     self.add_building_operation(idf, zone_name, bldg_op_local_profiles, installation_characteristics, self.basewriter.unit_registry)
@@ -203,6 +216,35 @@ class CoSimulationIDFWriter:
 
         return idf
 
+    def _handle_profile_file(self, the_profile):
+        """
+        :return: the_profile, or if it is a profile file and profiles are copied, a copy pointing to the file in the profile store
+        """
+        if self._profile_store is None or not isinstance(the_profile, ScheduleFile):
+            return the_profile
+        the_profile_updated_path = copy.copy(the_profile)
+        the_profile_updated_path.schedule_file = self._profile_store.add_file(the_profile.schedule_file)
+        return the_profile_updated_path
+
+    def _get_bldg_op_with_local_profiles(self, bldg_op: BuildingOperation) -> BuildingOperation:
+        """
+        :return: bldg_op if none of its profiles changed by _handle_profile_file(), otherwise a copy with the changed profiles.
+                 Only the parts holding a changed profile are copied, bldg_op itself is not changed.
+        """
+        bldg_op_local_profiles = bldg_op
+        for (part_name, profile_attr_names) in _BLDG_OP_PROFILE_ATTRIBUTES:
+            part = getattr(bldg_op, part_name)
+            local_profiles = {attr_name: self._handle_profile_file(getattr(part, attr_name)) for attr_name in profile_attr_names}
+            changed_profiles = {attr_name: profile for (attr_name, profile) in local_profiles.items() if profile is not getattr(part, attr_name)}
+            if changed_profiles:
+                if bldg_op_local_profiles is bldg_op:
+                    bldg_op_local_profiles = copy.copy(bldg_op)
+                local_part = copy.copy(part)
+                for (attr_name, profile) in changed_profiles.items():
+                    setattr(local_part, attr_name, profile)
+                setattr(bldg_op_local_profiles, part_name, local_part)
+        return bldg_op_local_profiles
+
     def add_floor_heating(self, idf, building_construction: BuildingConstruction):  # only works with graph DB , does not work with snippet idf
         bldg_ground_floor = building_construction.groundfloor_constr.name
         bldg_intenal_floor = f"{building_construction.internal_ceiling_constr.name}{FLORR_CONSTR_SUFFIX}"
@@ -0,0 +1,99 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import hashlib
+import logging
+from shutil import copyfile
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+# per process, key is the destination folder
+_stores: Dict[Path, "ContentAddressedProfileStore"] = dict()
+
+
+class ContentAddressedProfileStore:
+    """
+    Replacement for cesarp.eplus_adapter.RelativeAuxiliaryFilesHandler, storing each profile file under the hash of its
+    content instead of its file name. Profiles with the same content, even from different source files, are stored only once.
+
+    The files are hard linked to the source file if possible, otherwise copied. Thus do not change the source profile files
+    in place while IDF files are written.
+    There is no shared state between the processes, the destination file name depends only on the content and is
+    written by renaming a temporary file, thus several worker processes can add the same file at the same time.
+    Each source file is hashed once per process, as long as its size and modification time do not change.
+    """
+
+    def __init__(self, parent_folder: Union[str, Path], subfolder_name: str, use_hard_links: bool = True):
+        """
+        :param parent_folder: parent folder, profile pathes returned by add_file() will be relative to this parent folder
+        :param subfolder_name: name of folder where files should be stored to, created as a child of parent_folder
+        :param use_hard_links: if False, files are always copied
+        """
+        self.subfolder_name = subfolder_name
+        self.dest_folder_path = Path(parent_folder) / Path(subfolder_name)
+        self.use_hard_links = use_hard_links
+        self._added_files: Dict[Tuple[str, int, int], Path] = dict()  # key is source path, size and modification time
+        os.makedirs(self.dest_folder_path, exist_ok=True)
+
+    @classmethod
+    def for_folder(cls, parent_folder: Union[str, Path], subfolder_name: str) -> "ContentAddressedProfileStore":
+        """
+        :return: store for the given folder, created on the first call per process
+        """
+        dest_folder_path = (Path(parent_folder) / Path(subfolder_name)).resolve()
+        if dest_folder_path not in _stores:
+            _stores[dest_folder_path] = cls(parent_folder, subfolder_name)
+        return _stores[dest_folder_path]
+
+    def add_file(self, src_file_path: Union[str, Path]) -> Path:
+        """
+        :param src_file_path: profile file
+        :return: path of the file in the destination folder, relative to the parent folder
+        """
+        stat = os.stat(src_file_path)
+        key = (str(src_file_path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._added_files:
+            with open(src_file_path, "rb") as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+            file_name = content_hash + Path(src_file_path).suffix
+            dst_file_path = self.dest_folder_path / file_name
+            if not dst_file_path.exists():
+                self._store_file(src_file_path, dst_file_path)
+            self._added_files[key] = Path(self.subfolder_name) / file_name
+        return self._added_files[key]
+
+    def _store_file(self, src_file_path: Union[str, Path], dst_file_path: Path) -> None:
+        # write to temporary file and rename, thus a reader never sees a partially written file
+        tmp_file_path = dst_file_path.with_suffix(f".{os.getpid()}.tmp")
+        if tmp_file_path.exists():
+            os.remove(tmp_file_path)
+        is_linked = False
+        if self.use_hard_links:
+            try:
+                os.link(src_file_path, tmp_file_path)
+                is_linked = True
+            except OSError:
+                pass  # e.g. source and destination on different file systems, copy instead
+        if not is_linked:
+            copyfile(src_file_path, tmp_file_path)
+        os.replace(tmp_file_path, dst_file_path)
+        logging.getLogger(__name__).debug(f"stored profile {src_file_path} as {dst_file_path}")
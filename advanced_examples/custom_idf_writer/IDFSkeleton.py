@@ -0,0 +1,109 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from eppy.modeleditor import IDF
+from six import StringIO
+
+from cesarp.common import config_loader
+from cesarp.eplus_adapter import _default_config_file
+from cesarp.eplus_adapter import idf_strings
+from cesarp.eplus_adapter.eplus_sim_runner import get_eplus_version, get_idd_path
+from cesarp.eplus_adapter.CesarIDFWriter import CesarIDFWriter
+
+# per process, key is the energyplus version and the IDD path
+_skeletons: Dict[Tuple[str, str], "IDFSkeleton"] = dict()
+
+
+class IDFSkeleton:
+    """
+    Setup for writing IDF files, done once per worker process instead of once per building.
+
+    eppy parses the IDD (extended to 250 vertices, see development_scripts/extend_idd.py) when the first IDF is read and keeps
+    it for the process, thus the IDD is parsed when the skeleton is created. The IDF of each building is then started from the
+    in-memory empty IDF, instead of writing an empty IDF file and reading it again.
+    Blocks which are the same for all buildings, e.g. simulation settings, design days and output settings, are kept as text
+    by TemplateCoSimulationIDFWriter.
+    """
+
+    def __init__(self, eplus_version: str, idd_path: str):
+        """
+        :param eplus_version: energyplus version to write into the IDF files
+        :param idd_path: IDD matching eplus_version
+        """
+        self.eplus_version = eplus_version
+        self.idd_path = idd_path
+        IDF.setiddname(idd_path)
+        self._empty_idf_text = idf_strings.version.format(eplus_version)
+        self.new_idf()
+        logging.getLogger(__name__).info(f"using IDD {idd_path} for energyplus version {eplus_version}")
+
+    @classmethod
+    def for_config(cls, ep_config: Dict[str, Any]) -> "IDFSkeleton":
+        """
+        :param ep_config: eplus adapter configuration (full, including custom configuration)
+        :return: skeleton for the configured energyplus version, created on the first call per process
+        """
+        eplus_version = get_eplus_version(ep_config=ep_config)
+        key = (eplus_version, str(get_idd_path(ep_config=ep_config)))
+        if key not in _skeletons:
+            _skeletons[key] = cls(*key)
+        return _skeletons[key]
+
+    def new_idf(self) -> IDF:
+        """
+        :return: new IDF containing only the version object
+        """
+        return IDF(StringIO(self._empty_idf_text))
+
+
+class SkeletonCesarIDFWriter(CesarIDFWriter):
+    """
+    CesarIDFWriter taking the IDD from the IDFSkeleton of the process. No empty IDF file is created, use skeleton.new_idf() to start
+    the IDF of the building.
+    """
+
+    def __init__(self, idf_file_path, unit_registry, profiles_files_handler=None, custom_config: Optional[Dict[str, Any]] = None, package_config: Optional[Dict[str, Any]] = None):
+        """
+        Same parameters as CesarIDFWriter. The attributes are set as in CesarIDFWriter.__init__(), which is not called as it writes the empty IDF file.
+
+        :param idf_file_path: file name including full path to write IDF to. file should not exist.
+        :param unit_registry: application unit registry instance
+        :param profiles_files_handler: handler for the profile files, optional
+        :param custom_config: dictionary containing configuration entries overwriting package default config
+        :param package_config: eplus adapter configuration, if not provided the config is loaded from default config file and custom_config
+        """
+        assert not os.path.exists(idf_file_path), f"Cannot create IDF File {idf_file_path}. Already existing."
+        self.logger = logging.getLogger(CesarIDFWriter.__module__)
+        if package_config is None:
+            package_config = config_loader.load_config_for_package(_default_config_file, "cesarp.eplus_adapter", custom_config)
+        self._cfg = package_config
+        self.unit_registry = unit_registry
+        self.skeleton = IDFSkeleton.for_config(self._cfg)
+        self.idf_file_path = idf_file_path
+        self.zone_data = None
+        if profiles_files_handler:
+            self.profiles_files_handler_method = profiles_files_handler.add_file
+        else:
+            self.profiles_files_handler_method = lambda x: x  # do nothing, just return filepath back
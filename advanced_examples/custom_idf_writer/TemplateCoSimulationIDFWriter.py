@@ -0,0 +1,161 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import platform
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from eppy.modeleditor import IDF
+from six import StringIO
+
+from cesarp.model.BuildingModel import BuildingModel
+from cesarp.model.SiteGroundTemperatures import SiteGroundTemperatures
+from cesarp.eplus_adapter.ConstructionIDFWritingHandler import ConstructionIDFWritingHandler
+
+from CoSimulationIDFWriter import CoSimulationIDFWriter
+from IDFSkeleton import SkeletonCesarIDFWriter
+
+# per process, key is the name of the block and the values it depends on (including the configuration entries it reads), value is the IDF text per object type
+_static_block_templates: Dict[Tuple[str, Hashable], Dict[str, List[str]]] = dict()
+
+
+def render_static_block(add_block: Callable[[IDF], None]) -> Dict[str, List[str]]:
+    """
+    :param add_block: function adding the objects of the block to the passed IDF
+    :return: per object type the IDF text of the objects as written by eppy, in the order they were added
+    """
+    scratch_idf = IDF(StringIO(""))
+    add_block(scratch_idf)
+    return {obj_type: [obj.__repr__() for obj in scratch_idf.idfobjects[obj_type]] for obj_type in scratch_idf.model.dtls if scratch_idf.idfobjects[obj_type]}
+
+
+def freeze_config(config_entry: Any) -> Hashable:
+    """
+    :param config_entry: configuration entry, e.g. a section of the eplus_adapter configuration
+    :return: hashable value equal for equal configuration entries, to be used as part of a template key
+    """
+    if isinstance(config_entry, dict):
+        return tuple(sorted((str(key), freeze_config(value)) for (key, value) in config_entry.items()))
+    if isinstance(config_entry, (list, tuple, set)):
+        return tuple(freeze_config(value) for value in config_entry)
+    return str(config_entry)
+
+
+def save_with_static_objects(idf: IDF, static_objects: Dict[str, List[Tuple[int, str]]], file_path) -> None:
+    """
+    Save the IDF with the static objects inserted, giving the same file as eppy's IDF.save() would give if the static
+    objects were added to the IDF.
+
+    :param idf: IDF with all objects except the static ones
+    :param static_objects: per object type the IDF text of the static objects and the number of objects of that type in idf before it
+    :param file_path: file to write
+    """
+    idf_text_parts = [f"!- {platform.system()} Line endings \n"]
+    for obj_type in idf.model.dtls:  # same order as in IDF.idfstr()
+        static_objs_of_type = static_objects.get(obj_type, [])
+        static_obj_idx = 0
+        for (obj_idx, obj) in enumerate(idf.idfobjects[obj_type]):
+            while static_obj_idx < len(static_objs_of_type) and static_objs_of_type[static_obj_idx][0] <= obj_idx:
+                idf_text_parts.append(static_objs_of_type[static_obj_idx][1])
+                static_obj_idx += 1
+            idf_text_parts.append(obj.__repr__())
+        idf_text_parts.extend(obj_text for (_, obj_text) in static_objs_of_type[static_obj_idx:])
+    # same line ending and encoding handling as IDF.save()
+    with open(file_path, "wb") as idf_file:
+        idf_file.write(os.linesep.join("".join(idf_text_parts).splitlines()).encode("latin-1"))
+
+
+class TemplateCoSimulationIDFWriter(CoSimulationIDFWriter):
+    """
+    Writes the same IDF file as CoSimulationIDFWriter, but the blocks not depending on the building model (simulation settings,
+    sizing periods, plant loop, compact schedules, output settings) or only on few of its properties (site ground temperatures,
+    floor heating) are created with eppy only once per process. The text of their objects is kept and inserted when saving the
+    IDF, instead of creating the eppy objects for each building.
+
+    The static objects are not part of the eppy IDF of the building, thus they are not found when looking up objects in it.
+    The IDD is parsed once per process and the IDF of the building is started in memory, see IDFSkeleton.
+
+    To use it, set EPLUS_ADAPTER - IDF_WRITER_CLASS to TemplateCoSimulationIDFWriter.TemplateCoSimulationIDFWriter
+    """
+
+    _basewriter_class = SkeletonCesarIDFWriter
+
+    def write_bldg_model(self, bldg_model: BuildingModel) -> None:
+        """
+        :param bldg_model: Building model to write to IDF
+        :type bldg_model: BuildingModel
+        """
+        idf = self.basewriter.skeleton.new_idf()
+        static_objects: Dict[str, List[Tuple[int, str]]] = dict()
+        site_ground_temps = bldg_model.site.site_ground_temperatures
+        self._add_static_block(
+            idf,
+            static_objects,
+            "basic_simulation_settings",
+            (self._get_site_ground_temps_key(site_ground_temps), self._get_config_key("SIMULATION_SETTINGS")),
+            lambda scratch_idf: self.basewriter.add_basic_simulation_settings(scratch_idf, site_ground_temps),
+        )
+        self._add_static_block(idf, static_objects, "cosimulation_control_settings", None, self.add_cosimulation_control_settings)
+        constr_handler = ConstructionIDFWritingHandler(bldg_model.bldg_construction, bldg_model.neighbours_construction_props, self.basewriter.unit_registry)
+        self.basewriter.add_building_geometry(idf, bldg_model.bldg_shape, constr_handler)
+        self._add_static_block(idf, static_objects, "plant_sizing_settings", None, self.add_plant_sizing_settings)
+        self._add_static_block(idf, static_objects, "plnt_size", None, self.add_plnt_size)
+        zone_names_per_floor = tuple((floor_nr, zone_name) for (floor_nr, (zone_name, _)) in self.basewriter.zone_data.items())
+        self._add_static_block(idf, static_objects, "plnt_loop", zone_names_per_floor, self.add_plnt_loop)
+        self._add_static_block(idf, static_objects, "sch_compact", None, self.add_sch_compact)
+        self.basewriter.add_neighbours(idf, bldg_model.neighbours, constr_handler)
+        self.add_cosim_building_properties(
+            idf,
+            bldg_model.bldg_operation_mapping,
+            bldg_model.bldg_construction.installation_characteristics,
+            bldg_model.bldg_construction.infiltration_rate,
+            self._handle_profile_file(bldg_model.bldg_construction.infiltration_profile),
+            bldg_model.bldg_construction.window_constr.shade,
+        )
+        bldg_construction = bldg_model.bldg_construction
+        floor_constr_names = (bldg_construction.groundfloor_constr.name, bldg_construction.internal_ceiling_constr.name)
+        self._add_static_block(idf, static_objects, "floor_heating", floor_constr_names, lambda scratch_idf: self.add_floor_heating(scratch_idf, bldg_construction))
+        self._add_static_block(idf, static_objects, "output_settings", self._get_config_key("OUTPUT_METER", "OUTPUT_VARS"), self.basewriter.add_output_settings)
+        save_with_static_objects(idf, static_objects, str(self.basewriter.idf_file_path))
+
+    def _get_config_key(self, *section_names: str) -> Hashable:
+        # the worker processes are reused for writers with different configurations, e.g. for the scenarios of a project
+        return tuple(freeze_config(self.basewriter._cfg[section_name]) for section_name in section_names)
+
+    def _get_site_ground_temps_key(self, site_ground_temps: SiteGroundTemperatures) -> Tuple[float, ...]:
+        temps = [site_ground_temps.building_surface, site_ground_temps.shallow, site_ground_temps.deep] + list(site_ground_temps.ground_temp_per_month)
+        return tuple(temp.to(self.basewriter.unit_registry.degreeC).m for temp in temps)
+
+    @staticmethod
+    def _add_static_block(idf: IDF, static_objects: Dict[str, List[Tuple[int, str]]], block_name: str, block_params: Hashable, add_block: Callable[[IDF], None]) -> None:
+        """
+        :param idf: IDF of the building, the position of the static objects is taken from it
+        :param static_objects: static objects of the building, the objects of the block are added
+        :param block_name: name of the block, e.g. the method adding it
+        :param block_params: all values the objects of the block depend on, including the configuration entries read when adding the block
+        :param add_block: function adding the objects of the block to the passed IDF
+        """
+        template_key = (block_name, block_params)
+        if template_key not in _static_block_templates:
+            _static_block_templates[template_key] = render_static_block(add_block)
+        for (obj_type, obj_texts) in _static_block_templates[template_key].items():
+            nr_of_objs_before = len(idf.idfobjects[obj_type])
+            static_objects.setdefault(obj_type, []).extend((nr_of_objs_before, obj_text) for obj_text in obj_texts)
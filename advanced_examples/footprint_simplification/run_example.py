@@ -0,0 +1,83 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to simplify the building footprints before creating the building models, to keep the number of vertices per
+footprint within the 250 vertices cesar-p supports and to reduce the number of surfaces EnergyPlus has to simulate.
+
+The footprints are simplified with the Visvalingam-Whyatt algorithm, see :py:meth:`FootprintArray.simplify`, and saved as a new
+site vertices file, which is then used for the simulation. Check the deviation of area and perimeter per building in
+footprint_simplification_report.csv. As the buildings of the example site are simple, their footprints are not changed, use your own site.
+"""
+
+import logging.config
+import logging
+import os
+import shutil
+import sys
+
+import cesarp.common
+import cesarp.common.config_loader
+import cesarp.manager
+from cesarp.geometry.csv_input_parser import read_sitevertices_from_csv
+from cesarp.manager.SimulationManager import SimulationManager
+
+MAX_NR_OF_VERTICES = 100  # vertex budget per footprint
+MIN_TRIANGLE_AREA = 0.5  # m2, vertices adding less area are removed also from footprints within the vertex budget
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    # make sure the shared FootprintArray can be found
+    sys.path.append(__abs_path(".."))
+    from FootprintArray import FootprintArray
+
+    main_config = cesarp.common.config_loader.load_config_full(__abs_path("../main_config.yml"))
+    output_dir = __abs_path("../results/footprint_simplification")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+
+    site_vertices_cfg = cesarp.common.load_config_for_package(cesarp.manager._default_config_file, "cesarp.manager", main_config)["SITE_VERTICES_FILE"]
+    footprints = FootprintArray.from_flat_site_vertices(read_sitevertices_from_csv(site_vertices_cfg["PATH"], site_vertices_cfg["LABELS"], site_vertices_cfg["SEPARATOR"]))
+    simplified_footprints = footprints.simplify(MAX_NR_OF_VERTICES, MIN_TRIANGLE_AREA)
+    report = footprints.get_simplification_report(simplified_footprints)
+    report.to_csv(os.path.join(output_dir, "footprint_simplification_report.csv"))
+    simplified = report[report["nr_of_vertices_simplified"] < report["nr_of_vertices"]]
+    logging.getLogger(__name__).info(f"{len(simplified)} of {len(report)} footprints simplified, max area deviation {report['area_deviation'].abs().max():.2%}")
+
+    # save with the labels of the original file, thus the other configuration entries of the site vertices file stay valid
+    simplified_site_vertices_path = os.path.join(output_dir, "SiteVertices_simplified.csv")
+    simplified_footprints.to_flat_site_vertices().rename(columns=site_vertices_cfg["LABELS"]).to_csv(simplified_site_vertices_path, sep=site_vertices_cfg["SEPARATOR"], index=False)
+    config = cesarp.common.config_loader.merge_config_recursive(main_config, {"MANAGER": {"SITE_VERTICES_FILE": {"PATH": simplified_site_vertices_path}}})
+
+    sim_manager = SimulationManager(output_dir, config, cesarp.common.init_unit_registry())
+    sim_manager.run_all_steps()
+
+    print("====================")
+    print(f"check out results in {output_dir}")
+    if sim_manager.failed_fids:
+        logging.warning(f"Something went wrong for following FID's {sim_manager.failed_fids}")
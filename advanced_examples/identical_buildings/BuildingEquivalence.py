@@ -0,0 +1,112 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Canonical form of building models, to find buildings which give the same simulation results.
+
+Two buildings are equivalent if they only differ by their position and their fid: the geometry of the building and its neighbours
+relative to the building's origin, construction, operation, building type and site (weather, ground temperatures) are compared.
+Coordinates are rounded to the given tolerance, thus coordinates closer than the tolerance are usually, but not always,
+treated as equal (two values on different sides of a rounding boundary are not).
+Objects which can not be converted to a canonical form, e.g. having no attributes to compare, make the building unique,
+thus in doubt a building is simulated on its own.
+"""
+import hashlib
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+import pint
+
+from cesarp.model.BuildingModel import BuildingModel
+
+DEFAULT_TOLERANCE = 0.01  # in meter
+_VALUE_DECIMALS = 6
+_VERTEX_COLUMNS = ["x", "y", "z"]
+# attributes of the BuildingModel which are not compared, the neighbours are compared separately as they are keyed by their fid
+_IGNORED_BLDG_MODEL_ATTRIBUTES = ["_class_version", "fid", "year_of_construction", "neighbours"]
+
+
+def get_equivalence_key(bldg_model: BuildingModel, tolerance: float = DEFAULT_TOLERANCE) -> str:
+    """
+    :param bldg_model: building model to get the key for
+    :param tolerance: coordinates are rounded to multiples of tolerance, in meter
+    :return: hash of the canonical building model, equal for equivalent buildings
+    """
+    footprint = bldg_model.bldg_shape.groundfloor
+    origin = (footprint["x"].min(), footprint["y"].min(), footprint["z"].min())
+    bldg_attributes = {name: value for (name, value) in vars(bldg_model).items() if name not in _IGNORED_BLDG_MODEL_ATTRIBUTES}
+    canonical_neighbours = sorted(repr(_to_canonical(neighbour, origin, tolerance)) for neighbour in bldg_model.neighbours.values())
+    canonical_bldg = (_to_canonical(bldg_attributes, origin, tolerance), tuple(canonical_neighbours))
+    return hashlib.sha256(repr(canonical_bldg).encode("utf-8")).hexdigest()
+
+
+def group_equivalent_buildings(bldg_models: Mapping[int, BuildingModel], tolerance: float = DEFAULT_TOLERANCE) -> Dict[int, List[int]]:
+    """
+    :param bldg_models: building models per fid
+    :param tolerance: coordinates are rounded to multiples of tolerance, in meter
+    :return: per representative fid the fid's of all equivalent buildings, including the representative; the representative is the lowest fid of the group
+    """
+    fids_per_key: Dict[str, List[int]] = dict()
+    for fid in sorted(bldg_models.keys()):
+        fids_per_key.setdefault(get_equivalence_key(bldg_models[fid], tolerance), []).append(fid)
+    return {fids[0]: fids for fids in fids_per_key.values()}
+
+
+def _to_canonical(obj: Any, origin: Tuple[float, float, float], tolerance: float) -> Any:
+    if obj is None or isinstance(obj, (bool, int, str)):
+        return obj
+    if isinstance(obj, float):
+        return round(obj, _VALUE_DECIMALS) + 0.0  # + 0.0 to get 0.0 for -0.0
+    if isinstance(obj, Enum):
+        return f"{type(obj).__name__}.{obj.name}"
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, pint.Quantity):
+        return (_to_canonical(obj.m, origin, tolerance), str(obj.u))
+    if isinstance(obj, pd.DataFrame):
+        if list(obj.columns) == _VERTEX_COLUMNS:
+            return tuple(_vertex_to_canonical(vertex, origin, tolerance) for vertex in obj.itertuples(index=False))
+        return (tuple(obj.columns), tuple(_iter_to_canonical(row, origin, tolerance) for row in obj.itertuples(index=False)))
+    if isinstance(obj, pd.Series):
+        return _iter_to_canonical(obj.items(), origin, tolerance)
+    if isinstance(obj, Mapping):
+        return tuple(sorted(((_to_canonical(key, origin, tolerance), _to_canonical(value, origin, tolerance)) for (key, value) in obj.items()), key=repr))
+    if isinstance(obj, (list, tuple)):
+        return _iter_to_canonical(obj, origin, tolerance)
+    if isinstance(obj, np.generic):
+        return _to_canonical(obj.item(), origin, tolerance)
+    if isinstance(obj, np.ndarray):
+        return _to_canonical(obj.tolist(), origin, tolerance)
+    if hasattr(obj, "__dict__"):
+        return (type(obj).__name__, _to_canonical(vars(obj), origin, tolerance))
+    # default repr contains the memory address, thus the building is not equivalent to any other one
+    return repr(obj)
+
+
+def _iter_to_canonical(values: Iterable, origin: Tuple[float, float, float], tolerance: float) -> Tuple:
+    return tuple(_to_canonical(value, origin, tolerance) for value in values)
+
+
+def _vertex_to_canonical(vertex: Iterable[float], origin: Tuple[float, float, float], tolerance: float) -> Tuple[int, ...]:
+    return tuple(int(round((coord - coord_origin) / tolerance)) for (coord, coord_origin) in zip(vertex, origin))
@@ -0,0 +1,213 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+import pint
+
+import cesarp.common
+from cesarp.manager import processing_steps
+from cesarp.manager.SimulationManager import SimulationManager
+
+from BuildingEquivalence import DEFAULT_TOLERANCE, group_equivalent_buildings
+
+# representative fid per building, saved to the building containers folder, thus the groups are known when reloading a project
+EQUIVALENT_FIDS_FILE_NAME = "equivalent_fids.csvy"
+
+
+class DedupSimulationManager(SimulationManager):
+    """
+    SimulationManager which simulates only one representative building of each group of equivalent buildings, e.g. identical
+    row houses. See :py:mod:`BuildingEquivalence` for what makes two buildings equivalent.
+
+    Use it exactly as the SimulationManager, e.g. call run_all_steps(). Building models are created for all buildings, IDF files
+    are written and simulated only for the representatives. The results of the representative are then assigned to all buildings of
+    its group, the EnergyPlus output folder of the representative is used for all of them (e.g. for collect_custom_results()).
+    Call get_dedup_report() to see the groups.
+    The groups are saved next to the building containers, thus they are restored when the project is reloaded with load_from_disk=True.
+    """
+
+    def __init__(
+        self,
+        base_output_path: Union[str, Path],
+        main_config: Union[str, Path, Dict[str, Any]],
+        unit_reg: pint.UnitRegistry,
+        tolerance: float = DEFAULT_TOLERANCE,
+        load_from_disk: bool = False,
+        fids_to_use: List[int] = None,
+        delete_old_logs=True,
+    ):
+        """
+        :param tolerance: coordinates of the building and its neighbours relative to the building origin are compared rounded to multiples of tolerance, in meter
+        :type tolerance: float
+
+        for all other parameters see :py:class:`cesarp.manager.SimulationManager.SimulationManager`
+        """
+        super().__init__(base_output_path, main_config, unit_reg, load_from_disk=load_from_disk, fids_to_use=fids_to_use, delete_old_logs=delete_old_logs)
+        self.tolerance = tolerance
+        self.equivalent_fids: Dict[int, List[int]] = dict()  # per representative fid all fids of its group
+        if load_from_disk:
+            self.equivalent_fids = self._load_equivalent_fids()
+            self._assign_representative_output_folders()
+
+    def group_equivalent_buildings(self) -> Dict[int, List[int]]:
+        """
+        Group the buildings having a model by equivalence, called by create_IDFs().
+
+        :return: per representative fid all fids of its group
+        """
+        bldg_models = {fid: self.bldg_containers[fid].get_bldg_model() for fid in self._get_fids_having_bldg_model()}
+        self.equivalent_fids = group_equivalent_buildings(bldg_models, self.tolerance)
+        self._save_equivalent_fids()
+        self.logger.info(f"{len(bldg_models)} buildings are simulated with {len(self.equivalent_fids)} representatives, dedup ratio {self.get_dedup_ratio():.2f}")
+        return self.equivalent_fids
+
+    def get_dedup_ratio(self) -> float:
+        """
+        :return: number of buildings per simulated building
+        """
+        nr_of_simulated_bldgs = len(self.equivalent_fids)
+        return sum(len(fids) for fids in self.equivalent_fids.values()) / nr_of_simulated_bldgs if nr_of_simulated_bldgs else 1.0
+
+    def get_dedup_report(self) -> pd.DataFrame:
+        """
+        :return: one row per representative fid, with the number of buildings in its group and their fids
+        """
+        report = pd.DataFrame(
+            {
+                "nr_of_bldgs": [len(fids) for fids in self.equivalent_fids.values()],
+                "fids": [" ".join(str(fid) for fid in fids) for fids in self.equivalent_fids.values()],
+            },
+            index=pd.Index(list(self.equivalent_fids.keys()), name="representative_fid"),
+        )
+        return report.sort_values("nr_of_bldgs", ascending=False)
+
+    def create_IDFs(self) -> Sequence[int]:
+        """
+        Create IDF input files for the representative of each group of equivalent buildings.
+
+        :return: fid's for which IDF creation failed, including the other buildings of the group
+        """
+        self.group_equivalent_buildings()
+        aux_fh = self._get_managed_aux_fh()
+
+        idf_pathes_to_write = self._storage.create_idf_output_pathes(list(self.equivalent_fids.keys()))
+        assert idf_pathes_to_write, "No of the buildings has a model assigned. call create_bldg_models() first."
+
+        job_res_dict = {
+            fid: self._get_worker_pool().apply_async(
+                processing_steps.bldg_model_to_idf_no_exception,
+                (self.bldg_containers[fid].get_bldg_model(), idf_path_for_fid, aux_fh, self._custom_config),
+                error_callback=processing_steps.log_error,
+            )
+            for fid, idf_path_for_fid in idf_pathes_to_write.items()
+        }
+        res_tuples_dict = {fid: res.get() for fid, res in job_res_dict.items()}
+
+        idf_write_failed = []
+        for fid, (successful, idf_path, weather_file) in res_tuples_dict.items():
+            if successful:
+                self.weather_files[fid] = weather_file
+                self.idf_pathes[fid] = idf_path
+            else:
+                idf_write_failed.extend(self.equivalent_fids[fid])
+
+        self._set_failed(idf_write_failed, "writing idf failed")
+        self._storage.save_weather_file_mapping(self.weather_files)
+        return idf_write_failed
+
+    def run_simulations(self) -> List[int]:
+        """
+        Run EnergyPlus simulation for the representatives, the other buildings of a group get the output folder of their representative.
+
+        :return: fid's for which EnergyPlus simulation failed, including the other buildings of the group
+        """
+        fids_sim_failed = super().run_simulations()
+        fids_sim_failed_members = [fid for rep_fid in fids_sim_failed for fid in self.equivalent_fids[rep_fid] if fid != rep_fid]
+        self._set_failed(fids_sim_failed_members, "simulation of representative failed")
+        self._assign_representative_output_folders()
+        return fids_sim_failed + fids_sim_failed_members
+
+    def process_results(self, bldg_fids_to_use: Optional[Iterable[Any]] = None) -> None:
+        """
+        Process EnergyPlus outputs of the representatives and assign the results to all buildings of their group.
+
+        :param bldg_fids_to_use: gis fids of buildings which to integrate in the summary; if None results for all simulated buildings are collected
+        """
+        if not bldg_fids_to_use:
+            bldg_fids_to_use = self.output_folders.keys()
+        fids_to_use = set(bldg_fids_to_use)
+        rep_fids_to_process = [rep_fid for (rep_fid, fids) in self.equivalent_fids.items() if rep_fid in self.output_folders and fids_to_use.intersection(fids)]
+        if not rep_fids_to_process:
+            return None
+        super().process_results(rep_fids_to_process)
+        for rep_fid in rep_fids_to_process:
+            rep_container = self.bldg_containers[rep_fid]
+            for fid in fids_to_use.intersection(self.equivalent_fids[rep_fid]):
+                if fid == rep_fid:
+                    continue
+                container = self.bldg_containers[fid]
+                container.set_eplus_error_level(rep_container.get_eplus_error_level())
+                if rep_container.has_demand_result():
+                    container.set_energy_demand_sim_res(rep_container.get_energy_demand_sim_res())
+                if rep_container.has_op_cost_and_emission_result():
+                    container.set_op_cost_and_emission(rep_container.get_op_cost_and_emission())
+        return None
+
+    def _assign_representative_output_folders(self) -> None:
+        for (rep_fid, fids) in self.equivalent_fids.items():
+            if rep_fid in self.output_folders:
+                self.output_folders.update({fid: self.output_folders[rep_fid] for fid in fids})
+
+    def _get_equivalent_fids_file_path(self) -> Path:
+        return self._storage.container_save_path / Path(EQUIVALENT_FIDS_FILE_NAME)
+
+    def _save_equivalent_fids(self) -> None:
+        cesarp.common.csv_writer.write_csv_with_header(
+            {"DESCRIPTION": "Representative fid per building, buildings with the same representative are simulated once. Intermediate storage, not intended for reporting"},
+            pd.DataFrame(
+                {"representative_fid": [rep_fid for (rep_fid, fids) in self.equivalent_fids.items() for _ in fids]},
+                index=pd.Index([fid for fids in self.equivalent_fids.values() for fid in fids], name="fid"),
+            ),
+            self._get_equivalent_fids_file_path(),
+        )
+
+    def _load_equivalent_fids(self) -> Dict[int, List[int]]:
+        file_path = self._get_equivalent_fids_file_path()
+        if not os.path.exists(file_path):
+            self.logger.warning(f"{file_path} not found, each building of the loaded project is handled as its own representative")
+            return {fid: [fid] for fid in self.output_folders.keys()}
+        mapping = cesarp.common.csv_reader.read_csvy(file_path, ["fid", "representative_fid"], {"fid": "fid", "representative_fid": "representative_fid"})
+        equivalent_fids: Dict[int, List[int]] = dict()
+        for (fid, rep_fid) in zip(mapping["fid"], mapping["representative_fid"]):
+            equivalent_fids.setdefault(int(rep_fid), []).append(int(fid))
+        self.logger.info(f"loaded {len(equivalent_fids)} groups of equivalent buildings from {file_path}")
+        return equivalent_fids
+
+    def _set_failed(self, fids: List[int], reason: str) -> None:
+        for fid in fids:
+            self.bldg_containers[fid].set_error()
+        if fids:
+            self.logger.error(f"{reason} for bldg fids {fids}")
+            self.failed_fids.update(fids)
@@ -0,0 +1,66 @@
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to simulate geometrically identical buildings, e.g. row houses or repeated blocks, only once.
+Buildings which differ only by their position are grouped, one representative per group is simulated and its results are
+assigned to all buildings of the group.
+
+A report with the groups is saved to dedup_report.csv in the output folder.
+For details see :py:class:`DedupSimulationManager` and :py:mod:`BuildingEquivalence`.
+"""
+
+import logging.config
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import cesarp.common
+import cesarp.common.config_loader
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    # make sure the DedupSimulationManager can be found
+    sys.path.append(os.path.dirname(__file__))
+    from DedupSimulationManager import DedupSimulationManager
+
+    main_config_path = __abs_path("../main_config.yml")
+    output_dir = __abs_path("../results/identical_buildings")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    # coordinates relative to the building origin closer than 1cm are treated as equal
+    sim_manager = DedupSimulationManager(output_dir, main_config_path, cesarp.common.init_unit_registry(), tolerance=0.01)
+    sim_manager.run_all_steps()
+    sim_manager.get_dedup_report().to_csv(output_dir / Path("dedup_report.csv"))
+
+    print("====================")
+    print(f"check out results in {output_dir}")
+    print(f"simulated {len(sim_manager.equivalent_fids)} representatives for {len(sim_manager.bldg_containers)} buildings, dedup ratio {sim_manager.get_dedup_ratio():.2f}")
+    if sim_manager.failed_fids:
+        logging.warning(f"Something went wrong for following FID's {sim_manager.failed_fids}")
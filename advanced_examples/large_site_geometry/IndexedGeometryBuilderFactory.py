@@ -0,0 +1,86 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pint
+
+import cesarp.geometry
+from cesarp.common import config_loader
+from cesarp.geometry.GeometryBuilder import GeometryBuilder
+from cesarp.manager.manager_protocols import GeometryBuilderProtocol
+from cesarp.model.BldgType import BldgType
+
+from CustomFactorySimulationManager import CustomBldgModelFactory
+from SiteSpatialIndex import SiteSpatialIndex
+
+
+class IndexedGeometryBuilder(GeometryBuilder):
+    """
+    GeometryBuilder searching the neighbours with the SiteSpatialIndex instead of checking all buildings of the site.
+    """
+
+    def __init__(self, main_bldg_fid, site_index: SiteSpatialIndex, glazing_ratio: float, bldg_type: BldgType, custom_config: Optional[Dict[str, Any]] = None):
+        """
+        :param main_bldg_fid: gis_fid of main building which will be simulated, must be contained in the site index
+        :param site_index: index of the site buildings
+        for all other parameters see :py:class:`cesarp.geometry.GeometryBuilder.GeometryBuilder`
+        """
+        super().__init__(main_bldg_fid, site_index.site_bldgs, glazing_ratio, bldg_type, custom_config)
+        self._site_index = site_index
+
+    def _init_neighbours(self):
+        self._neighbours = self._site_index.search_neighbouring_buildings_for(self.bldg_main, radius=self._cfg["NEIGHBOURHOOD"]["RADIUS"])
+
+
+class IndexedGeometryBuilderFactory:
+    """
+    Replacement for cesarp.geometry.GeometryBuilderFactory.GeometryBuilderFactory, creating IndexedGeometryBuilder instances.
+    """
+
+    def __init__(self, site_index: SiteSpatialIndex, ureg: pint.UnitRegistry, custom_config: Optional[Dict[str, Any]] = None):
+        self._site_index = site_index
+        self._custom_config = custom_config
+        self.ureg = ureg
+
+    def get_geometry_builder(self, bldg_fid, glazing_ratio, bldg_type) -> GeometryBuilderProtocol:
+        if isinstance(glazing_ratio, pint.Quantity):
+            glazing_ratio = glazing_ratio.to(self.ureg.dimensionless).m
+        return IndexedGeometryBuilder(bldg_fid, self._site_index, glazing_ratio, bldg_type, self._custom_config)
+
+
+class IndexedBldgModelFactory(CustomBldgModelFactory):
+    """
+    BldgModelFactory using the IndexedGeometryBuilderFactory for site vertices from a CSV file, the site vertices are read and indexed
+    only once per process. For shp files the default GeometryBuilderFactory is used.
+    Pass it as bldg_model_factory_class to the CustomFactorySimulationManager.
+    """
+
+    def create_geometry_builder_factory(self):
+        site_vertices_cfg = self._mgr_config["SITE_VERTICES_FILE"]
+        if Path(site_vertices_cfg["PATH"]).suffix == ".shp":
+            return super().create_geometry_builder_factory()
+        geometry_cfg = config_loader.load_config_for_package(cesarp.geometry._default_config_file, "cesarp.geometry", self._custom_config)
+        site_index = SiteSpatialIndex.for_site_vertices_file(
+            site_vertices_cfg["PATH"], site_vertices_cfg["LABELS"], site_vertices_cfg["SEPARATOR"], cell_size=geometry_cfg["NEIGHBOURHOOD"]["RADIUS"]
+        )
+        return IndexedGeometryBuilderFactory(site_index, ureg=self._unit_reg, custom_config=self._custom_config)
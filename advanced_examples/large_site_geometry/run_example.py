@@ -0,0 +1,62 @@
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to speed up the building model creation for large sites.
+The neighbours of each building are searched with a grid index over the site instead of checking all buildings of the site,
+and the site vertices are read and indexed only once per worker process.
+For details see :py:class:`IndexedBldgModelFactory` and :py:class:`SiteSpatialIndex`.
+"""
+
+import logging.config
+import logging
+import os
+import shutil
+import sys
+
+import cesarp.common
+import cesarp.common.config_loader
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    # make sure the IndexedGeometryBuilderFactory and the shared CustomFactorySimulationManager and SiteSpatialIndex can be found
+    sys.path.append(os.path.dirname(__file__))
+    sys.path.append(__abs_path(".."))
+    from CustomFactorySimulationManager import CustomFactorySimulationManager
+    from IndexedGeometryBuilderFactory import IndexedBldgModelFactory
+
+    main_config_path = __abs_path("../main_config.yml")
+    output_dir = __abs_path("../results/large_site_geometry")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    sim_manager = CustomFactorySimulationManager(output_dir, main_config_path, cesarp.common.init_unit_registry(), bldg_model_factory_class=IndexedBldgModelFactory)
+    sim_manager.run_all_steps()
+
+    print("====================")
+    print(f"check out results in {output_dir}")
+    if sim_manager.failed_fids:
+        logging.warning(f"Something went wrong for following FID's {sim_manager.failed_fids}")
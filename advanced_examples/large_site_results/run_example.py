@@ -0,0 +1,70 @@
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to collect hourly results for sites with many buildings.
+Instead of one big DataFrame the results are streamed batch by batch to a Parquet file.
+
+Run basic_cesar_usage.py prior to running this script or adapt the pathes to your project.
+
+NOTE: You need to have pyarrow installed to use this example
+"""
+
+import logging.config
+import logging
+import os
+import sys
+from pathlib import Path
+
+import cesarp.common
+import cesarp.common.config_loader
+from cesarp.manager.SimulationManager import SimulationManager
+from cesarp.eplus_adapter.eplus_eso_results_handling import RES_KEY_DHW_DEMAND, RES_KEY_HEATING_DEMAND
+from cesarp.eplus_adapter.idf_strings import ResultsFrequency
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    # make sure the streaming_result_collection and the selective_eso_reader modules can be found
+    sys.path.append(os.path.dirname(__file__))
+    sys.path.append(__abs_path(".."))
+    import streaming_result_collection
+
+    main_config_path = __abs_path("../main_config.yml")
+    project_dir = __abs_path("../results/basic_cesar_usage")
+    sim_manager = SimulationManager(project_dir, main_config_path, cesarp.common.init_unit_registry(), load_from_disk=True)
+
+    hourly_res_file = streaming_result_collection.collect_custom_results_to_parquet(
+        sim_manager, result_keys=[RES_KEY_HEATING_DEMAND, RES_KEY_DHW_DEMAND], results_frequency=ResultsFrequency.HOURLY, parquet_file_path=project_dir / Path("hourly_results.parquet")
+    )
+
+    # read back only the part you need, e.g. heating demand of the first building
+    first_fid = sorted(sim_manager.output_folders.keys())[0]
+    heating_first_bldg = streaming_result_collection.read_results_from_parquet(hourly_res_file, fids=[first_fid], result_keys=[RES_KEY_HEATING_DEMAND])
+    print(heating_first_bldg.head())
+
+    print("====================")
+    print(f"hourly results written to {hourly_res_file}")
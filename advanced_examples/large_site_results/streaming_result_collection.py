@@ -0,0 +1,160 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Collect custom (e.g. hourly) results of many buildings into a Parquet file without holding the results of the whole site in memory.
+
+SimulationManager.collect_custom_results() returns one DataFrame with the results of all buildings. For big sites this
+frame does not fit into memory anymore. The functions here parse the ESO files of a batch of buildings in a worker
+and append the batch as one row group to a Parquet file. At most MAX_BATCHES_IN_FLIGHT batches are parsed or waiting to be
+written at the same time, thus peak memory is bounded by the batch size and not by the number of buildings.
+
+The ESO files are parsed with :py:mod:`selective_eso_reader`, which reads only the requested variables.
+The Parquet file has a flat, long table layout (one row per building, variable and timestep) with columns
+fid, var, unit, timing, value - the same columns as returned by cesarp.eplus_adapter.eplus_eso_results_handling.collect_multi_params_for_site.
+
+NOTE: You need to have pyarrow installed to use this module (pip install pyarrow)
+"""
+import logging
+import collections
+from pathlib import Path
+from typing import Mapping, Sequence, Union, Optional, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cesarp.eplus_adapter.idf_strings import ResultsFrequency
+from cesarp.manager.SimulationManager import SimulationManager
+from cesarp.manager import processing_steps
+
+import selective_eso_reader
+
+BLDGS_PER_ROW_GROUP = 50
+MAX_BATCHES_IN_FLIGHT = 4
+
+RESULT_SCHEMA = pa.schema(
+    [
+        pa.field("fid", pa.int64()),
+        pa.field("var", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("unit", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("timing", pa.int32()),
+        pa.field("value", pa.float64()),
+    ]
+)
+
+
+def collect_results_batch(result_folders: Mapping[int, str], result_keys: Sequence[str], results_frequency: ResultsFrequency) -> pd.DataFrame:
+    """
+    Module level method to be able to run it in the worker pool.
+    Parses the results of one batch of buildings and returns them in the column layout of RESULT_SCHEMA.
+
+    :param result_folders: EnergyPlus output folder per building fid
+    :param result_keys: names of the result parameters to collect
+    :param results_frequency: frequency of the result parameters
+    :return: flat table with columns fid, var, unit, timing, value
+    """
+    batch_res = selective_eso_reader.collect_multi_params_for_site(result_folders, result_keys, results_frequency)
+    batch_res = batch_res.reset_index().rename(columns={"index": "timing"})
+    return batch_res[RESULT_SCHEMA.names]
+
+
+def collect_results_to_parquet(
+    worker_pool,
+    result_folders: Mapping[int, str],
+    result_keys: Sequence[str],
+    results_frequency: ResultsFrequency,
+    parquet_file_path: Union[str, Path],
+    bldgs_per_row_group: int = BLDGS_PER_ROW_GROUP,
+) -> Path:
+    """
+    Parse results of all buildings on the worker pool and stream them to a Parquet file, one row group per batch of buildings.
+    Row groups are written in the order of the fid's passed in result_folders.
+
+    :param worker_pool: multiprocessing pool used to parse the ESO files
+    :param result_folders: EnergyPlus output folder per building fid
+    :param result_keys: names of the result parameters to collect, make sure EnergyPlus reports them in the requested frequency
+    :param results_frequency: frequency of the result parameters
+    :param parquet_file_path: Parquet file to write, an existing file is overwritten
+    :param bldgs_per_row_group: number of buildings parsed as one batch and stored as one row group
+    :return: path of the written Parquet file
+    """
+    all_fids = list(result_folders.keys())
+    fid_batches = [all_fids[start : start + bldgs_per_row_group] for start in range(0, len(all_fids), bldgs_per_row_group)]
+    pending_jobs: collections.deque = collections.deque()
+    nr_of_rows = 0
+    with pq.ParquetWriter(str(parquet_file_path), RESULT_SCHEMA) as writer:
+        for fid_batch in fid_batches:
+            pending_jobs.append(
+                worker_pool.apply_async(
+                    collect_results_batch,
+                    ({fid: result_folders[fid] for fid in fid_batch}, result_keys, results_frequency),
+                    error_callback=processing_steps.log_error,
+                )
+            )
+            if len(pending_jobs) >= MAX_BATCHES_IN_FLIGHT:
+                nr_of_rows += _write_row_group(writer, pending_jobs.popleft().get())
+        while pending_jobs:
+            nr_of_rows += _write_row_group(writer, pending_jobs.popleft().get())
+
+    logging.getLogger(__name__).info(f"{nr_of_rows} result rows of {len(all_fids)} buildings written to {parquet_file_path}")
+    return Path(parquet_file_path)
+
+
+def collect_custom_results_to_parquet(
+    sim_manager: SimulationManager,
+    result_keys: Sequence[str],
+    results_frequency: ResultsFrequency,
+    parquet_file_path: Union[str, Path],
+    bldgs_per_row_group: int = BLDGS_PER_ROW_GROUP,
+) -> Path:
+    """
+    Streaming replacement for sim_manager.collect_custom_results(...).to_csv(...), using the worker pool of the SimulationManager.
+    For parameter description see :py:func:`collect_results_to_parquet`
+    """
+    return collect_results_to_parquet(sim_manager._get_worker_pool(), sim_manager.output_folders, result_keys, results_frequency, parquet_file_path, bldgs_per_row_group)
+
+
+def read_results_from_parquet(parquet_file_path: Union[str, Path], fids: Optional[List[int]] = None, result_keys: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load (part of) the results written with :py:func:`collect_results_to_parquet`.
+    Only the row groups and rows matching the filter are loaded.
+
+    :param parquet_file_path: Parquet file to read
+    :param fids: only load results for those buildings, if None all buildings are loaded
+    :param result_keys: only load those result parameters, if None all parameters are loaded
+    :return: flat table with columns fid, var, unit, timing, value
+    """
+    filters = []
+    if fids is not None:
+        filters.append(("fid", "in", list(fids)))
+    if result_keys is not None:
+        filters.append(("var", "in", list(result_keys)))
+    table = pq.read_table(str(parquet_file_path), filters=filters if filters else None)
+    return table.to_pandas()
+
+
+def _write_row_group(writer: pq.ParquetWriter, batch_res: Optional[pd.DataFrame]) -> int:
+    if batch_res is None or batch_res.empty:
+        return 0
+    batch_res = batch_res.astype({"fid": "int64", "timing": "int32", "value": "float64"})
+    writer.write_table(pa.Table.from_pandas(batch_res, schema=RESULT_SCHEMA, preserve_index=False))
+    return len(batch_res.index)
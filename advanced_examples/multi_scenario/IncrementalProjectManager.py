@@ -0,0 +1,139 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+from pathlib import Path
+from typing import Callable, Any, Dict, Optional, Tuple
+
+from cesarp.manager import processing_steps
+from cesarp.manager.SimulationManager import SimulationManager
+from cesarp.model.BuildingModel import BuildingModel
+
+from SharedPoolProjectManager import SharedPoolProjectManager
+from idf_patching import IdfPatch, get_idf_patch, copy_idf_with_patch_no_exception
+
+
+class IncrementalProjectManager(SharedPoolProjectManager):
+    """
+    ProjectManager which derives scenarios by patching the IDF's of the base scenario instead of writing them from scratch.
+
+    derive_scenario() compares each modified building model with its base model. If only the window frame construction
+    and/or the power demand of the electric appliances changed, the IDF of the base scenario is copied and only the
+    affected IDF objects (WindowProperty:FrameAndDivider, ElectricEquipment) are updated. Buildings the modifier did not
+    change get a plain copy of the base IDF. Only buildings with any other change get their IDF written from scratch.
+    For details and limitations see :py:mod:`idf_patching`.
+
+    All other methods behave as for :py:class:`SharedPoolProjectManager`.
+    """
+
+    def derive_scenario(self, base_scenario_name, new_scenario_name, change_bldg_model_method_ref: Callable[[BuildingModel], Any]) -> None:
+        """
+        For parameter description see :py:meth:`cesarp.manager.ProjectManager.ProjectManager.derive_scenario`
+        """
+        sc_path = self.project_path / Path(str(new_scenario_name))
+        assert not os.path.exists(sc_path), f"cannot derive new scenario named {new_scenario_name}, folder {sc_path} exists"
+        try:
+            base = self._scenarios[base_scenario_name]
+        except KeyError:
+            raise KeyError(f"No existing scenario named {base_scenario_name} found in project manager")
+
+        new_mgr: SimulationManager = SimulationManager.new_manager_from_template(base, sc_path)
+        self._use_shared_pool(new_mgr)
+
+        idf_patches: Dict[int, IdfPatch] = {}
+        for fid, bldg_container in new_mgr.bldg_containers.items():
+            bldg_container.clear_results()
+            if bldg_container.has_bldg_model():
+                change_bldg_model_method_ref(bldg_container.get_bldg_model())
+                if fid in base.idf_pathes and not base.bldg_containers[fid].has_error():
+                    idf_patch = get_idf_patch(base.bldg_containers[fid].get_bldg_model(), bldg_container.get_bldg_model())
+                    if idf_patch is not None:
+                        idf_patches[fid] = idf_patch
+
+        new_mgr.save_bldg_containers()
+        self._collect_idf_jobs(new_mgr, self._submit_idf_jobs(base, new_mgr, idf_patches))
+        self._scenarios[new_scenario_name] = new_mgr
+
+    def _submit_idf_jobs(self, base: SimulationManager, new_mgr: SimulationManager, idf_patches: Dict[int, IdfPatch]) -> Dict[int, Tuple[Any, Optional[str]]]:
+        """
+        Same as the first part of SimulationManager.create_IDFs(), but buildings having an IdfPatch get a patched copy of the IDF of the base scenario.
+
+        :return: per fid the pending job and the weather file of the base scenario for patched buildings, None for buildings written from scratch
+        """
+        idf_pathes_to_write = new_mgr._storage.create_idf_output_pathes(new_mgr._get_fids_having_bldg_model())
+        assert idf_pathes_to_write, "No of the buildings has a model assigned."
+        fids_to_write_from_scratch = [fid for fid in idf_pathes_to_write.keys() if fid not in idf_patches]
+        self.logger.info(
+            f"deriving IDFs for {new_mgr.base_output_path}: {sum(patch.is_empty() for patch in idf_patches.values())} unchanged, "
+            f"{sum(not patch.is_empty() for patch in idf_patches.values())} patched, {len(fids_to_write_from_scratch)} written from scratch"
+        )
+
+        aux_fh = new_mgr._get_managed_aux_fh() if fids_to_write_from_scratch else None
+        jobs = {
+            fid: (
+                self._get_worker_pool().apply_async(
+                    processing_steps.bldg_model_to_idf_no_exception,
+                    (new_mgr.bldg_containers[fid].get_bldg_model(), idf_pathes_to_write[fid], aux_fh, new_mgr._custom_config),
+                    error_callback=processing_steps.log_error,
+                ),
+                None,
+            )
+            for fid in fids_to_write_from_scratch
+        }
+        # site and thus weather file of patched buildings is the same as in the base scenario
+        jobs.update(
+            {
+                fid: (
+                    self._get_worker_pool().apply_async(
+                        copy_idf_with_patch_no_exception,
+                        (base.idf_pathes[fid], idf_pathes_to_write[fid], idf_patch, new_mgr._custom_config),
+                        error_callback=processing_steps.log_error,
+                    ),
+                    base.weather_files[fid],
+                )
+                for fid, idf_patch in idf_patches.items()
+            }
+        )
+        return jobs
+
+    def _collect_idf_jobs(self, new_mgr: SimulationManager, jobs: Dict[int, Tuple[Any, Optional[str]]]) -> None:
+        """
+        Same as the second part of SimulationManager.create_IDFs(), waits for the jobs returned by _submit_idf_jobs().
+        """
+        idf_write_failed = []
+        for fid, (job, base_weather_file) in jobs.items():
+            if base_weather_file is None:
+                (successful, idf_path, weather_file) = job.get()
+            else:
+                (successful, idf_path) = job.get()
+                weather_file = base_weather_file
+            if successful:
+                new_mgr.weather_files[fid] = weather_file
+                new_mgr.idf_pathes[fid] = idf_path
+            else:
+                idf_write_failed.append(fid)
+                new_mgr.bldg_containers[fid].set_error()
+
+        if idf_write_failed:
+            self.logger.error(f"writing idf failed for bldg fids {idf_write_failed}")
+            new_mgr.failed_fids.update(idf_write_failed)
+
+        new_mgr._storage.save_weather_file_mapping(new_mgr.weather_files)
@@ -0,0 +1,128 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import atexit
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Callable, Any
+
+from cesarp.manager.ProjectManager import ProjectManager
+from cesarp.manager.SimulationManager import SimulationManager, init_worker, delete_old_logs
+from cesarp.model.BuildingModel import BuildingModel
+
+
+class SharedPoolProjectManager(ProjectManager):
+    """
+    ProjectManager which owns one worker pool, shared by the SimulationManager's of all scenarios.
+
+    With the ProjectManager each scenario creates its own worker pool, thus for each scenario new worker processes are
+    started, cesarp is imported and the unit registry is initialized again. Here the pool is created once, with the
+    number of workers set in the project configuration (NR_OF_PARALLEL_WORKERS), and passed on to every scenario
+    created, derived or loaded. Anything a worker keeps in memory between jobs (unit registry, module level caches)
+    is thus reused by all scenarios.
+
+    Use it exactly as the ProjectManager. Call close() when you are done to stop the workers, otherwise they are
+    closed when the python process exits.
+    """
+
+    def __init__(self, *args, delete_old_logs: bool = True, **kwargs):
+        """
+        :param delete_old_logs: if true old \\*-cesarp-logs folder are deleted when the worker pool is created
+
+        for all other parameters see :py:class:`cesarp.manager.ProjectManager.ProjectManager`
+        """
+        super().__init__(*args, **kwargs)
+        self._delete_old_logs = delete_old_logs
+        self._worker_pool = None
+
+    def create_scenario(self, name, specific_config_path=None) -> None:
+        """
+        For parameter description see :py:meth:`cesarp.manager.ProjectManager.ProjectManager.create_scenario`
+        """
+        sc_config = self._merge_config(specific_config_path)
+        sc_path = self.project_path / Path(str(name))
+        assert not os.path.exists(sc_path), f"cannot create new scenario named {name}, folder {sc_path} exists"
+        simMgr = SimulationManager(sc_path, sc_config, self.ureg, fids_to_use=self._fids_to_use)
+        self._use_shared_pool(simMgr)
+        simMgr.create_bldg_models()
+        simMgr.save_bldg_containers()
+        simMgr.create_IDFs()
+        self._scenarios[name] = simMgr
+
+    def derive_scenario(self, base_scenario_name, new_scenario_name, change_bldg_model_method_ref: Callable[[BuildingModel], Any]) -> None:
+        """
+        For parameter description see :py:meth:`cesarp.manager.ProjectManager.ProjectManager.derive_scenario`
+        """
+        sc_path = self.project_path / Path(str(new_scenario_name))
+        assert not os.path.exists(sc_path), f"cannot derive new scenario named {new_scenario_name}, folder {sc_path} exists"
+        try:
+            base = self._scenarios[base_scenario_name]
+        except KeyError:
+            raise KeyError(f"No existing scenario named {base_scenario_name} found in project manager")
+
+        new_mgr: SimulationManager = SimulationManager.new_manager_from_template(base, sc_path)
+        self._use_shared_pool(new_mgr)
+
+        for bldg_container in new_mgr.bldg_containers.values():
+            bldg_container.clear_results()
+            if bldg_container.has_bldg_model():
+                change_bldg_model_method_ref(bldg_container.get_bldg_model())
+
+        new_mgr.save_bldg_containers()
+        new_mgr.create_IDFs()
+        self._scenarios[new_scenario_name] = new_mgr
+
+    def load_saved_scenario(self, name, specific_config_path=None) -> bool:
+        """
+        For parameter description see :py:meth:`cesarp.manager.ProjectManager.ProjectManager.load_saved_scenario`
+        """
+        is_loaded = super().load_saved_scenario(name, specific_config_path)
+        if is_loaded:
+            self._use_shared_pool(self._scenarios[name])
+        return is_loaded
+
+    def close(self) -> None:
+        """
+        Stop the worker processes. Scenarios can not be created, derived or simulated afterwards.
+        """
+        if self._worker_pool is not None:
+            self._worker_pool.close()
+            self._worker_pool.join()
+            self._worker_pool = None
+
+    def _use_shared_pool(self, sim_mgr: SimulationManager) -> None:
+        sim_mgr._worker_pool = self._get_worker_pool()
+
+    def _get_worker_pool(self):
+        if self._worker_pool is None:
+            if self._delete_old_logs:
+                delete_old_logs()
+            mplogger = multiprocessing.log_to_stderr()
+            mplogger.setLevel(logging.WARNING)
+            processors = self._mgr_config["NR_OF_PARALLEL_WORKERS"]
+            if processors == -1:
+                processors = max(1, round(multiprocessing.cpu_count() / 2))
+            self.logger.info(f"creating worker pool with {processors} processors, shared by all scenarios")
+            self._worker_pool = multiprocessing.Pool(processors, initializer=init_worker)
+            atexit.register(self.close)
+        return self._worker_pool
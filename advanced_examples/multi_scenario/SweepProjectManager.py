@@ -0,0 +1,223 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import copy
+import dataclasses
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import pandas as pd
+
+import cesarp.eplus_adapter.eplus_sim_runner
+from cesarp.manager import processing_steps
+from cesarp.manager.BuildingContainer import BuildingContainer
+from cesarp.manager.SimulationManager import SimulationManager
+from cesarp.model.BuildingModel import BuildingModel
+from cesarp.model.BuildingOperation import InstallationOperation
+from cesarp.model.BuildingOperationMapping import BuildingOperationMapping
+from cesarp.eplus_adapter.eplus_error_file_handling import EPLUS_ERROR_FILE_NAME
+
+from IncrementalProjectManager import IncrementalProjectManager
+from idf_patching import IdfPatch, get_idf_patch
+
+SCENARIO_COL = "scenario"
+FID_COL = "fid"
+
+
+def scale_el_app_power_demand(bldg_model: BuildingModel, factor: float) -> BuildingModel:
+    """
+    :return: copy of bldg_model with the power demand of the electric appliances multiplied by factor, all other parts are shared with bldg_model
+    """
+    new_bldg_model = copy.copy(bldg_model)
+    new_bldg_model.bldg_operation_mapping = BuildingOperationMapping()
+    for (floor_nrs, bldg_op) in bldg_model.bldg_operation_mapping.get_operation_assignments():
+        new_bldg_op = copy.copy(bldg_op)
+        new_bldg_op.electric_appliances = InstallationOperation(bldg_op.electric_appliances.fraction_schedule, bldg_op.electric_appliances.power_demand_per_area * factor)
+        new_bldg_model.bldg_operation_mapping.add_operation_assignment(floor_nrs, new_bldg_op)
+    return new_bldg_model
+
+
+def scale_win_frame_conductance(bldg_model: BuildingModel, factor: float) -> BuildingModel:
+    """
+    :return: copy of bldg_model with the conductance of the window frame multiplied by factor, all other parts are shared with bldg_model
+    """
+    frame = bldg_model.bldg_construction.window_constr.frame
+    new_bldg_model = copy.copy(bldg_model)
+    new_bldg_model.bldg_construction = copy.copy(bldg_model.bldg_construction)
+    new_bldg_model.bldg_construction.window_constr = copy.copy(bldg_model.bldg_construction.window_constr)
+    new_bldg_model.bldg_construction.window_constr.frame = dataclasses.replace(
+        frame, name=f"{frame.name}_x{factor}", short_name=f"{frame.short_name}_x{factor}", frame_conductance=frame.frame_conductance * factor
+    )
+    return new_bldg_model
+
+
+# parameters which can be used as columns in the variants table of SweepProjectManager.derive_scenarios_sweep()
+SWEEP_PARAMETERS: Dict[str, Callable[[BuildingModel, Any], BuildingModel]] = {
+    "el_app_power_factor": scale_el_app_power_demand,
+    "win_frame_conductance_factor": scale_win_frame_conductance,
+}
+
+
+class SweepProjectManager(IncrementalProjectManager):
+    """
+    ProjectManager to derive and simulate many variants of a base scenario at once.
+
+    The variants are defined in a table instead of a modifier function per scenario, see derive_scenarios_sweep().
+    Building models of the variants share all unchanged parts (geometry, constructions, profiles, ...) with the models of the
+    base scenario, only the changed parts are copied. IDF's of all variants are written or patched (see
+    :py:class:`IncrementalProjectManager`) in one go on the worker pool, and run_not_simulated_scenarios() submits the
+    simulations of all scenarios at once, thus the workers do not wait for the slowest building of each scenario.
+
+    Note that building models of the variants must not be changed in place, as the changes would apply to the base scenario too.
+    """
+
+    def derive_scenarios_sweep(self, base_scenario_name, variants: pd.DataFrame, parameter_modifiers: Optional[Mapping[str, Callable[[BuildingModel, Any], BuildingModel]]] = None) -> List[Any]:
+        """
+        :param base_scenario_name: name of the scenario to be used as a base
+        :param variants: one row per scenario (and optionally per building), columns:
+                         - "scenario": name of the scenario to derive
+                         - "fid": optional, if set the row applies to that building only, otherwise to all buildings of the scenario;
+                                  values of building specific rows overwrite the values set for all buildings
+                         - one column per parameter, see SWEEP_PARAMETERS; empty cells leave the parameter unchanged
+        :param parameter_modifiers: custom parameters, mapping column name to a function returning a modified copy of the building model,
+                                    the function must not change the passed building model
+        :return: names of the derived scenarios
+        """
+        modifiers = dict(SWEEP_PARAMETERS)
+        if parameter_modifiers:
+            modifiers.update(parameter_modifiers)
+        param_cols = [col for col in variants.columns if col not in [SCENARIO_COL, FID_COL]]
+        unknown_params = set(param_cols) - set(modifiers.keys())
+        assert not unknown_params, f"no modifier defined for parameters {unknown_params}"
+        try:
+            base = self._scenarios[base_scenario_name]
+        except KeyError:
+            raise KeyError(f"No existing scenario named {base_scenario_name} found in project manager")
+
+        pending_idf_jobs = {}
+        for scenario_name, scenario_variants in variants.groupby(SCENARIO_COL, sort=False):
+            params_per_fid = self._get_params_per_fid(scenario_variants, param_cols, base.bldg_containers.keys())
+            new_mgr = self._new_manager_sharing_models(base, scenario_name, params_per_fid, modifiers)
+            idf_patches: Dict[int, IdfPatch] = {}
+            for fid, bldg_container in new_mgr.bldg_containers.items():
+                if fid in base.idf_pathes and not base.bldg_containers[fid].has_error():
+                    idf_patch = get_idf_patch(base.bldg_containers[fid].get_bldg_model(), bldg_container.get_bldg_model())
+                    if idf_patch is not None:
+                        idf_patches[fid] = idf_patch
+            new_mgr.save_bldg_containers()
+            pending_idf_jobs[scenario_name] = (new_mgr, self._submit_idf_jobs(base, new_mgr, idf_patches))
+
+        for scenario_name, (new_mgr, idf_jobs) in pending_idf_jobs.items():
+            self._collect_idf_jobs(new_mgr, idf_jobs)
+            self._scenarios[scenario_name] = new_mgr
+        return list(pending_idf_jobs.keys())
+
+    def run_not_simulated_scenarios(self) -> None:
+        """
+        For all defined scenarios, run the E+ simulation if no results folder is present for the scenario.
+        The simulations of all scenarios are submitted to the worker pool at once.
+        """
+        pending_sim_jobs = {name: self._submit_simulations(scenario) for name, scenario in self._scenarios.items() if not scenario.output_folders}
+        for name, sim_jobs in pending_sim_jobs.items():
+            scenario = self._scenarios[name]
+            self._collect_simulations(scenario, sim_jobs)
+            scenario.process_results()
+            scenario.save_bldg_containers()
+            scenario.save_summary_result()
+
+    def _new_manager_sharing_models(self, base: SimulationManager, scenario_name, params_per_fid: Dict[int, Dict[str, Any]], modifiers) -> SimulationManager:
+        sc_path = self.project_path / Path(str(scenario_name))
+        assert not os.path.exists(sc_path), f"cannot derive new scenario named {scenario_name}, folder {sc_path} exists"
+        # same as SimulationManager.new_manager_from_template(), but without deep copying the building models
+        new_mgr = SimulationManager(sc_path, base._custom_config, base._unit_reg, fids_to_use=base._fids_to_use)
+        self._use_shared_pool(new_mgr)
+        new_mgr.bldg_containers = {}
+        for fid, base_container in base.bldg_containers.items():
+            container = BuildingContainer()
+            if base_container.has_bldg_model():
+                bldg_model = base_container.get_bldg_model()
+                for (param, value) in params_per_fid.get(fid, {}).items():
+                    bldg_model = modifiers[param](bldg_model, value)
+                container.set_bldg_model(bldg_model)
+            if base_container.has_retrofit_log():
+                container.set_retrofit_log(base_container.get_retrofit_log())
+            new_mgr.bldg_containers[fid] = container
+        return new_mgr
+
+    @staticmethod
+    def _get_params_per_fid(scenario_variants: pd.DataFrame, param_cols: List[str], all_fids) -> Dict[int, Dict[str, Any]]:
+        if FID_COL in scenario_variants.columns:
+            rows_all_bldgs = scenario_variants[scenario_variants[FID_COL].isna()]
+            rows_per_bldg = scenario_variants[scenario_variants[FID_COL].notna()]
+        else:
+            rows_all_bldgs = scenario_variants
+            rows_per_bldg = scenario_variants.iloc[0:0]
+        params_all_bldgs = {param: value for (_, row) in rows_all_bldgs.iterrows() for (param, value) in row[param_cols].dropna().items()}
+        params_per_fid = {fid: dict(params_all_bldgs) for fid in all_fids}
+        for (_, row) in rows_per_bldg.iterrows():
+            params_per_fid.setdefault(int(row[FID_COL]), dict(params_all_bldgs)).update(row[param_cols].dropna().to_dict())
+        return params_per_fid
+
+    def _submit_simulations(self, sim_mgr: SimulationManager) -> Dict[int, Any]:
+        """
+        Same as the first part of SimulationManager.run_simulations()
+        """
+        assert sim_mgr.is_ready_to_run_sim(), "please run create_IDFs before calling run_simulation"
+        for container in sim_mgr.bldg_containers.values():
+            container.clear_results()
+        expected_output_folders = sim_mgr._storage.get_eplus_output_pathes(list(sim_mgr.idf_pathes.keys()))
+        config_eplus = cesarp.eplus_adapter.eplus_sim_runner.get_config(sim_mgr._custom_config)
+        return {
+            fid: (
+                self._get_worker_pool().apply_async(
+                    processing_steps.run_simulation_no_exception,
+                    (sim_mgr.idf_pathes[fid], sim_mgr.weather_files[fid], expected_output_folders[fid], config_eplus),
+                ),
+                expected_output_folders[fid],
+            )
+            for fid in sim_mgr.idf_pathes.keys()
+        }
+
+    def _collect_simulations(self, sim_mgr: SimulationManager, sim_jobs: Dict[int, Any]) -> List[int]:
+        """
+        Same as the second part of SimulationManager.run_simulations(), waits for the jobs returned by _submit_simulations()
+        """
+        eplus_run_timelog = {}
+        fids_sim_failed = []
+        fids_sim_successful = []
+        for fid, (job, output_folder) in sim_jobs.items():
+            (successful, sim_time) = job.get()
+            eplus_run_timelog[fid] = sim_time
+            if successful:
+                fids_sim_successful.append(fid)
+                sim_mgr.output_folders[fid] = output_folder
+            else:
+                fids_sim_failed.append(fid)
+                sim_mgr.bldg_containers[fid].set_error()
+
+        if fids_sim_failed:
+            self.logger.error(f"simulation failed for fids {fids_sim_failed} in {sim_mgr.base_output_path}")
+            sim_mgr.failed_fids.update(fids_sim_failed)
+
+        sim_mgr._storage.save_eplus_sim_time_log(eplus_run_timelog)
+        sim_mgr._storage.combine_eplus_error_files(fids_sim_failed, fids_sim_successful, EPLUS_ERROR_FILE_NAME)
+        return fids_sim_failed
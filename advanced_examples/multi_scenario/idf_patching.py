@@ -0,0 +1,154 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Derive the IDF of a building from the IDF of the same building in another scenario, instead of writing it from scratch.
+
+:py:func:`get_idf_patch` compares a modified building model with the model it was copied from. If only the window frame
+construction and/or the power demand of the electric appliances changed, the changes are returned as an IdfPatch, which
+:py:func:`copy_idf_with_patch_no_exception` applies to a copy of the existing IDF. For any other change None is returned
+and the IDF has to be written from scratch.
+
+Schedule:File pathes in the copied IDF are set to the absolute pathes of the profiles of the source IDF, thus the
+derived IDF's depend on the profile files of the source scenario.
+"""
+import os
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+import pint
+from eppy.modeleditor import IDF
+
+from cesarp.eplus_adapter import idf_strings
+from cesarp.eplus_adapter.eplus_sim_runner import get_idd_path
+from cesarp.model.BuildingModel import BuildingModel
+from cesarp.model.WindowConstruction import WindowFrameConstruction
+
+
+class IdfPatch(NamedTuple):
+    win_frame_constr: Optional[WindowFrameConstruction]
+    el_app_power_demand_per_floor: Dict[int, pint.Quantity]
+
+    def is_empty(self) -> bool:
+        return self.win_frame_constr is None and not self.el_app_power_demand_per_floor
+
+
+def get_idf_patch(base_bldg_model: BuildingModel, new_bldg_model: BuildingModel) -> Optional[IdfPatch]:
+    """
+    :param base_bldg_model: building model the existing IDF was written for
+    :param new_bldg_model: modified copy of base_bldg_model
+    :return: changes to apply to the existing IDF, an empty patch if the models are equal; None if the IDF has to be written from scratch
+    """
+    base_frame = base_bldg_model.bldg_construction.window_constr.frame
+    new_frame = new_bldg_model.bldg_construction.window_constr.frame
+    frame_changed = pickle.dumps(base_frame) != pickle.dumps(new_frame)
+    if frame_changed and not isinstance(new_frame, WindowFrameConstruction):
+        return None
+
+    base_op_assignments = base_bldg_model.bldg_operation_mapping.get_operation_assignments()
+    new_op_assignments = new_bldg_model.bldg_operation_mapping.get_operation_assignments()
+    if [floor_nrs for (floor_nrs, _) in base_op_assignments] != [floor_nrs for (floor_nrs, _) in new_op_assignments]:
+        return None
+    changed_el_app_ops = [
+        (floor_nrs, base_op.electric_appliances, new_op.electric_appliances)
+        for ((floor_nrs, base_op), (_, new_op)) in zip(base_op_assignments, new_op_assignments)
+        if pickle.dumps(base_op.electric_appliances.power_demand_per_area) != pickle.dumps(new_op.electric_appliances.power_demand_per_area)
+    ]
+    el_app_power_demand_per_floor = {floor_nr: new_el_app_op.power_demand_per_area for (floor_nrs, _, new_el_app_op) in changed_el_app_ops for floor_nr in floor_nrs}
+
+    # temporarily reset the attributes which can be patched, then the rest of the models must be equal
+    new_values = [(new_el_app_op, new_el_app_op.power_demand_per_area) for (_, _, new_el_app_op) in changed_el_app_ops]
+    for (_, base_el_app_op, new_el_app_op) in changed_el_app_ops:
+        new_el_app_op.power_demand_per_area = base_el_app_op.power_demand_per_area
+    new_bldg_model.bldg_construction.window_constr.frame = base_frame
+    try:
+        is_other_attr_changed = pickle.dumps(base_bldg_model) != pickle.dumps(new_bldg_model)
+    finally:
+        new_bldg_model.bldg_construction.window_constr.frame = new_frame
+        for (new_el_app_op, power_demand_per_area) in new_values:
+            new_el_app_op.power_demand_per_area = power_demand_per_area
+    if is_other_attr_changed:
+        return None
+
+    return IdfPatch(new_frame if frame_changed else None, el_app_power_demand_per_floor)
+
+
+def copy_idf_with_patch_no_exception(
+    base_idf_path: Union[str, Path], idf_file_path: Union[str, Path], idf_patch: IdfPatch, custom_config
+) -> Tuple[bool, Optional[Union[str, Path]]]:
+    """
+    Module level method to be able to run it in the worker pool.
+
+    :param base_idf_path: existing IDF file to copy
+    :param idf_file_path: full filepath of the IDF file to be created
+    :param idf_patch: changes to apply to the copy of the IDF
+    :param custom_config: custom configuration entries
+    :return: tuple(True, idf_file_path) when successful, tuple(False, None) otherwise
+    """
+    unit_reg = pint.get_application_registry()
+    logger = logging.getLogger(__name__)
+    try:
+        logger.info(f"create idf {idf_file_path} by patching {base_idf_path}")
+        IDF.setiddname(get_idd_path(custom_config=custom_config))
+        idf = IDF(str(base_idf_path))
+        _set_absolute_schedule_file_pathes(idf, Path(base_idf_path).parent)
+        if idf_patch.win_frame_constr is not None:
+            _patch_win_frame_construction(idf, idf_patch.win_frame_constr, unit_reg)
+        if idf_patch.el_app_power_demand_per_floor:
+            _patch_el_app_power_demand(idf, idf_patch.el_app_power_demand_per_floor, unit_reg)
+        idf.saveas(str(idf_file_path))
+        return (True, idf_file_path)
+    except Exception as ex:
+        if os.path.isfile(idf_file_path):
+            os.remove(idf_file_path)
+        logger.error(f"Could not patch IDF {base_idf_path}")
+        logger.exception(ex)
+        return (False, None)
+
+
+def _set_absolute_schedule_file_pathes(idf, base_idf_folder: Path) -> None:
+    for schedule_idf_obj in idf.idfobjects[idf_strings.IDFObjects.schedule_file]:
+        if not os.path.isabs(schedule_idf_obj.File_Name):
+            schedule_idf_obj.File_Name = str((base_idf_folder / Path(schedule_idf_obj.File_Name)).resolve())
+
+
+def _patch_win_frame_construction(idf, frame_constr: WindowFrameConstruction, ureg: pint.UnitRegistry) -> None:
+    # same properties as set in cesarp.eplus_adapter.idf_writer_construction.add_win_frame_construction, frame geometry is kept
+    (f_and_d_idf_obj,) = idf.idfobjects[idf_strings.IDFObjects.window_property_frame_and_divider]
+    old_name = f_and_d_idf_obj.Name
+    f_and_d_idf_obj.Name = frame_constr.name
+    f_and_d_idf_obj.Frame_Conductance = frame_constr.frame_conductance.to(ureg.W / ureg.m**2 / ureg.K).m
+    f_and_d_idf_obj.Frame_Solar_Absorptance = frame_constr.frame_solar_absorptance.to(ureg.dimensionless).m
+    f_and_d_idf_obj.Frame_Visible_Absorptance = frame_constr.frame_visible_absorptance.to(ureg.dimensionless).m
+    f_and_d_idf_obj.Outside_Reveal_Solar_Absorptance = frame_constr.outside_reveal_solar_absorptance.to(ureg.dimensionless).m
+    for win_idf_obj in idf.idfobjects[idf_strings.IDFObjects.fenestration_surface_detailed]:
+        if win_idf_obj.Frame_and_Divider_Name == old_name:
+            win_idf_obj.Frame_and_Divider_Name = frame_constr.name
+
+
+def _patch_el_app_power_demand(idf, power_demand_per_floor: Dict[int, pint.Quantity], ureg: pint.UnitRegistry) -> None:
+    zone_name_to_floor = {idf_strings.CustomObjNames.bldg_zone_name.format(floor_nr): floor_nr for floor_nr in power_demand_per_floor.keys()}
+    for el_equ_idf_obj in idf.idfobjects[idf_strings.IDFObjects.electric_equipment]:
+        floor_nr = zone_name_to_floor.get(el_equ_idf_obj.Zone_or_ZoneList_Name)
+        if floor_nr is not None:
+            el_equ_idf_obj.Watts_per_Zone_Floor_Area = power_demand_per_floor[floor_nr].to(ureg.W / ureg.m**2).m
@@ -39,10 +39,10 @@ Limitations of this approach:
 
 """
 import os
+import sys
 from enum import Enum
 import pint
 import cesarp.common
-from cesarp.manager.ProjectManager import ProjectManager
 import logging
 import logging.config
 from cesarp.model.BuildingModel import BuildingModel
@@ -96,7 +96,13 @@ def improvement_scenarios(fids_to_use=None):
     ureg = cesarp.common.init_unit_registry()
     # use the set/get unit registry approach as we do not get passed a unit reg instance in the modify methods above...
     pint.set_application_registry(ureg)
-    myProj = ProjectManager(__abs_path("../main_config.yml"), __abs_path("../results/scenario_comparison"), fids_to_use=fids_to_use, unit_reg=ureg)
+    # make sure IncrementalProjectManager can be found
+    sys.path.append(os.path.dirname(__file__))
+    from IncrementalProjectManager import IncrementalProjectManager
+
+    # same as cesarp.manager.ProjectManager, but all scenarios use the same worker processes instead of starting new ones for each scenario
+    # and derived scenarios patch the IDF's of the base scenario where possible instead of writing them from scratch
+    myProj = IncrementalProjectManager(__abs_path("../main_config.yml"), __abs_path("../results/scenario_comparison"), fids_to_use=fids_to_use, unit_reg=ureg)
 
     logging.info(f"trying to load scenario {MyScenarios.BASE}")
     if not myProj.load_saved_scenario(MyScenarios.BASE):
@@ -124,6 +130,7 @@ def improvement_scenarios(fids_to_use=None):
     myProj.collect_all_scenario_summaries(summary_res_columns=["Heating Annual", "DHW Annual"], do_overwrite=True)
 
     [logging.warning(f"In {name} something went wrong for following FID's {sz.failed_fids}") for name, sz in myProj._scenarios.items() if sz.failed_fids]
+    myProj.close()
 
 
 if __name__ == "__main__":
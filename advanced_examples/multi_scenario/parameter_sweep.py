@@ -0,0 +1,80 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+This example shows how to derive many variants of a base scenario from a table of parameter values, instead of writing
+a modifier function per scenario as in multi_scenarios.py.
+Each row of the variants table defines parameter values for one scenario, either for all buildings or for one building
+(column fid). For available parameters see SWEEP_PARAMETERS in SweepProjectManager.py.
+"""
+import os
+import sys
+import logging
+import logging.config
+
+import pandas as pd
+import pint
+
+import cesarp.common
+
+
+def __abs_path(path):
+    return cesarp.common.config_loader.abs_path(path, os.path.abspath(__file__))
+
+
+def appliance_and_frame_sweep(fids_to_use=None):
+    ureg = cesarp.common.init_unit_registry()
+    pint.set_application_registry(ureg)
+
+    # make sure SweepProjectManager can be found
+    sys.path.append(os.path.dirname(__file__))
+    from SweepProjectManager import SweepProjectManager
+
+    myProj = SweepProjectManager(__abs_path("../main_config.yml"), __abs_path("../results/parameter_sweep"), fids_to_use=fids_to_use, unit_reg=ureg)
+    if not myProj.load_saved_scenario("BASE"):
+        myProj.create_scenario("BASE")
+
+    variants = pd.DataFrame(
+        [
+            {"scenario": f"EL_APP_{el_factor}_FRAME_{frame_factor}", "el_app_power_factor": el_factor, "win_frame_conductance_factor": frame_factor}
+            for el_factor in [0.5, 0.75, 1.0]
+            for frame_factor in [0.5, 1.0]
+            if (el_factor, frame_factor) != (1.0, 1.0)
+        ]
+    )
+    # building specific value, overwrites the value for all buildings of that scenario
+    variants = pd.concat([variants, pd.DataFrame([{"scenario": "EL_APP_0.5_FRAME_0.5", "fid": 1, "el_app_power_factor": 0.25}])], ignore_index=True)
+
+    scenarios_to_derive = [name for name in variants["scenario"].unique() if not myProj.load_saved_scenario(name)]
+    if scenarios_to_derive:
+        myProj.derive_scenarios_sweep("BASE", variants[variants["scenario"].isin(scenarios_to_derive)])
+
+    myProj.run_not_simulated_scenarios()
+    myProj.collect_all_scenario_summaries(summary_res_columns=["Heating Annual", "Electricity Annual"], do_overwrite=True)
+    [logging.warning(f"In {name} something went wrong for following FID's {sz.failed_fids}") for name, sz in myProj._scenarios.items() if sz.failed_fids]
+    myProj.close()
+
+
+if __name__ == "__main__":
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+    logging.getLogger("rdflib").setLevel(logging.ERROR)
+
+    appliance_and_frame_sweep([1, 2])
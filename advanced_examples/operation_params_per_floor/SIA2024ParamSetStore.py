@@ -0,0 +1,96 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+import pint
+
+import cesarp.common
+from cesarp.SIA2024 import _default_config_file
+from cesarp.SIA2024.NullParametersFactory import NullParameterFactory
+from cesarp.SIA2024.SIA2024Parameters import SIA2024Parameters
+from cesarp.SIA2024.SIA2024ParamsManager import SIA2024ParamsManager
+from cesarp.model.BuildingOperation import BuildingOperation, Occupancy, InstallationOperation, HVACOperation, NightVent, WindowShadingControl
+
+# per process, key is the unit registry and the nominal profile files configuration
+_stores: Dict[Tuple, "SIA2024ParamSetStore"] = dict()
+
+
+class SIA2024ParamSetStore:
+    """
+    Nominal SIA2024 parameter sets, loaded per building type when first requested, and the building operations created from them.
+
+    Use get_for() to get the store shared by all operation factories of the process.
+    Building operations having the same building type, night ventilation and window shading control are created only once
+    and shared between the buildings, thus they must not be changed.
+    """
+
+    def __init__(self, ureg: pint.UnitRegistry, custom_config: Optional[Dict[str, Any]] = None):
+        """
+        :param ureg: application unit registry instance
+        :param custom_config: custom configuration entries, the nominal profiles are loaded from the path configured for cesarp.SIA2024
+        """
+        # we use the pre-generated sia profiles included in cesar-p-core, thus no need to link create new parameter sets
+        # (SIA data which would be needed for this is not included in cesar-p-core open source package)
+        self._params_manager = SIA2024ParamsManager(NullParameterFactory(), ureg, custom_config)
+        self._bldg_ops: Dict[Enum, List[BuildingOperation]] = dict()
+
+    @classmethod
+    def get_for(cls, ureg: pint.UnitRegistry, custom_config: Optional[Dict[str, Any]] = None) -> "SIA2024ParamSetStore":
+        """
+        :return: store for the given unit registry and configured nominal profiles, created on the first call per process
+        """
+        cfg = cesarp.common.config_loader.load_config_for_package(_default_config_file, "cesarp.SIA2024", custom_config)
+        key = (id(ureg), str(cfg["PARAMSETS_NOMINAL_SAVE_FOLDER"]), cfg["PROFILE_NOMINAL_FILENAME_PATTERN_REL"], cfg["CSV_SEPARATOR"])
+        if key not in _stores:
+            _stores[key] = cls(ureg, custom_config)
+        return _stores[key]
+
+    def get_param_set(self, bldg_type: Enum) -> SIA2024Parameters:
+        """
+        :raises: KeyError if there is no nominal profile for bldg_type
+        """
+        if bldg_type not in self._params_manager.params_cache:
+            self._params_manager.load_param_sets_nominal([bldg_type])
+        return self._params_manager.get_param_set(bldg_type)
+
+    def get_building_operation(self, bldg_type: Enum, night_vent: NightVent, win_shading_ctrl: WindowShadingControl) -> BuildingOperation:
+        """
+        :return: building operation with the nominal profiles of bldg_type, shared with all other buildings having the same parameters
+        """
+        bldg_ops_of_type = self._bldg_ops.setdefault(bldg_type, [])
+        for bldg_op in bldg_ops_of_type:
+            if bldg_op.night_vent == night_vent and bldg_op.win_shading_ctrl == win_shading_ctrl:
+                return bldg_op
+        params = self.get_param_set(bldg_type)
+        bldg_op = BuildingOperation(
+            params.name,
+            Occupancy(params.floor_area_per_person, params.occupancy_fraction_schedule, params.activity_schedule),
+            InstallationOperation(params.electric_appliances_fraction_schedule, params.electric_appliances_power_demand),
+            InstallationOperation(params.lighting_fraction_schedule, params.lighting_power_demand),
+            InstallationOperation(params.dhw_fraction_schedule, params.dhw_power_demand),
+            HVACOperation(params.heating_setpoint_schedule, params.cooling_setpoint_schedule, params.ventilation_fraction_schedule, params.ventilation_outdoor_air_flow),
+            night_vent,
+            win_shading_ctrl,
+        )
+        bldg_ops_of_type.append(bldg_op)
+        return bldg_op
@@ -22,12 +22,12 @@ import pint
 from typing import Dict, Any
 from enum import Enum
 from cesarp.SIA2024.SIA2024BuildingType import SIA2024BldgTypeKeys
-from cesarp.SIA2024.NullParametersFactory import NullParameterFactory
-from cesarp.SIA2024.SIA2024ParamsManager import SIA2024ParamsManager
 from cesarp.model.BuildingOperationMapping import BuildingOperationMapping
-from cesarp.model.BuildingOperation import BuildingOperation, Occupancy, InstallationOperation, HVACOperation
+from cesarp.model.BuildingOperation import BuildingOperation
 from cesarp.operation.protocols import PassiveCoolingOperationFactoryProtocol
 
+from SIA2024ParamSetStore import SIA2024ParamSetStore
+
 
 class SIABasedMixedOperationFactory:
     """
@@ -40,6 +40,9 @@ class SIABasedMixedOperationFactory:
     The operational factory has to implement cesarp.manager.manager_protocols.BuildingOperationFactoryProtocol
     The __init__ method needs to have the same attributes as src.cesarp.operation.fixed.FixedBuildingOperationFactory.FixedBuildingOperationFactory.__init__
     The factory is instantiated in cesarp.manager.BldgModelFactory.BldgModelFactory.__create_bldg_operation_factory depending on config.
+
+    The SIA2024 profiles are loaded only for the building types used and shared by all factory instances of a process, see SIA2024ParamSetStore.
+    Buildings get the same BuildingOperation instances as long as their night ventilation and window shading control are the same.
     """
 
     def __init__(self, passive_cooling_op_fact: PassiveCoolingOperationFactoryProtocol, ureg: pint.UnitRegistry, custom_config: Dict[str, Any] = {}):
@@ -51,11 +54,8 @@ class SIABasedMixedOperationFactory:
         :param custom_config: custom configuration entries, defaults to {}
         :type custom_config: Dict[str, Any], optional
         """
-        # we use the pre-generated sia profiles included in cesar-p-core, thus no need to link create new parameter sets
-        # (SIA data which would be needed for this is not included in cesar-p-core open source package)
-        params_factory = NullParameterFactory()
-        self.params_manager = SIA2024ParamsManager(params_factory, ureg, custom_config)
-        self.params_manager.load_param_sets_nominal(list(SIA2024BldgTypeKeys))  # load profiles for all building types, path to load from is configurable, see cesarp.SIA2024 config
+        # profiles are loaded when first used, path to load from is configurable, see cesarp.SIA2024 config
+        self._param_set_store = SIA2024ParamSetStore.get_for(ureg, custom_config)
         self._passive_cooling_op_fact = passive_cooling_op_fact
 
     def get_building_operation(self, bldg_fid: int, nr_of_floors: int) -> BuildingOperationMapping:
@@ -81,15 +81,10 @@ class SIABasedMixedOperationFactory:
             bldg_op_mapping.add_operation_assignment(range(1, nr_of_floors), bldg_op_mfh)
         return bldg_op_mapping
 
-    def __init_bldg_op(self, bldg_fid: int, bldg_type: Enum):
-        params = self.params_manager.get_param_set(bldg_type)
-        return BuildingOperation(
-            params.name,
-            Occupancy(params.floor_area_per_person, params.occupancy_fraction_schedule, params.activity_schedule),
-            InstallationOperation(params.electric_appliances_fraction_schedule, params.electric_appliances_power_demand),
-            InstallationOperation(params.lighting_fraction_schedule, params.lighting_power_demand),
-            InstallationOperation(params.dhw_fraction_schedule, params.dhw_power_demand),
-            HVACOperation(params.heating_setpoint_schedule, params.cooling_setpoint_schedule, params.ventilation_fraction_schedule, params.ventilation_outdoor_air_flow),
+    def __init_bldg_op(self, bldg_fid: int, bldg_type: Enum) -> BuildingOperation:
+        params = self._param_set_store.get_param_set(bldg_type)
+        return self._param_set_store.get_building_operation(
+            bldg_type,
             self._passive_cooling_op_fact.create_night_vent(bldg_fid, params.cooling_setpoint_schedule),
             self._passive_cooling_op_fact.create_win_shading_ctrl(bldg_fid),
         )
@@ -0,0 +1,126 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Run EnergyPlus for existing IDF files and collect the annual result summary in parallel.
+
+cesarp.eplus_adapter.eplus_sim_runner.run_batch() only returns after all simulations are finished, the result summaries
+then have to be parsed one after the other in the main process. The functions here run the simulation and the parsing
+of the results of one building as one job on the worker pool, thus a building is summarised as soon as its simulation
+is finished and the parsing of the outputs runs in parallel to the simulations of the other buildings.
+The ESO files are parsed with :py:mod:`selective_eso_reader`, which reads only the annual variables of the summary.
+
+Before calling any of the functions, initialize the unit registry in the main process with cesarp.common.init_unit_registry(),
+the results returned from the workers are unpickled with that registry.
+"""
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+import pint
+
+import cesarp.eplus_adapter.eplus_sim_runner
+from cesarp.manager import processing_steps
+from cesarp.manager.SimulationManager import init_worker
+from cesarp.results.EnergyDemandSimulationResults import EnergyDemandSimulationResults
+
+import selective_eso_reader
+
+
+def simulate_and_collect_summary(job: Tuple[int, Union[str, Path], Union[str, Path], Union[str, Path], Dict[str, Any]]) -> Tuple[int, Optional[EnergyDemandSimulationResults]]:
+    """
+    Module level method to be able to run it in the worker pool.
+    Runs the EnergyPlus simulation of one building and directly parses the result summary.
+
+    :param job: tuple (fid, idf path, weather file path, output folder, full eplus_adapter configuration)
+    :return: tuple (fid, result summary), summary is None if simulation or parsing of the results failed
+    """
+    (fid, idf_path, weather_file, output_folder, ep_config) = job
+    (successful, _) = processing_steps.run_simulation_no_exception(idf_path, weather_file, output_folder, ep_config)
+    if not successful:
+        return (fid, None)
+    return collect_summary((fid, output_folder))
+
+
+def collect_summary(job: Tuple[int, Union[str, Path]]) -> Tuple[int, Optional[EnergyDemandSimulationResults]]:
+    """
+    Module level method to be able to run it in the worker pool.
+
+    :param job: tuple (fid, EnergyPlus output folder)
+    :return: tuple (fid, result summary), summary is None if parsing of the results failed
+    """
+    (fid, output_folder) = job
+    try:
+        return (fid, selective_eso_reader.collect_cesar_simulation_summary(Path(output_folder), pint.get_application_registry()))
+    except Exception as ex:
+        logger = logging.getLogger(__name__)
+        logger.error(f"could not collect result summary for fid {fid} from {output_folder}")
+        logger.exception(ex)
+        return (fid, None)
+
+
+def run_batch_with_summary(
+    idf_files: Mapping[int, Union[str, Path]],
+    epw_files: Mapping[int, Union[str, Path]],
+    output_folders: Mapping[int, Union[str, Path]],
+    nr_of_parallel_workers: int,
+    custom_config: Optional[Dict[str, Any]] = None,
+) -> Dict[int, Optional[EnergyDemandSimulationResults]]:
+    """
+    Replacement for cesarp.eplus_adapter.eplus_sim_runner.run_batch() followed by collect_cesar_simulation_summary() for each building.
+
+    :param idf_files: IDF file per building fid
+    :param epw_files: weather file per building fid
+    :param output_folders: EnergyPlus output folder per building fid, folders must not exist
+    :param nr_of_parallel_workers: number of worker processes, 0 means all CPUs, -1 one less than all CPUs, etc.
+    :param custom_config: custom configuration entries
+    :return: result summary per building fid, summary is None for buildings where the simulation or parsing of the results failed
+    """
+    ep_config = cesarp.eplus_adapter.eplus_sim_runner.get_config(custom_config)
+    jobs = [(fid, str(idf_file), str(epw_files[fid]), str(output_folders[fid]), ep_config) for fid, idf_file in idf_files.items() if idf_file is not None]
+    return _run_on_pool(simulate_and_collect_summary, jobs, nr_of_parallel_workers)
+
+
+def collect_summaries(result_folders: Mapping[int, Union[str, Path]], nr_of_parallel_workers: int) -> Dict[int, Optional[EnergyDemandSimulationResults]]:
+    """
+    Parallel replacement for calling collect_cesar_simulation_summary() for each building of already simulated outputs.
+
+    :param result_folders: EnergyPlus output folder per building fid
+    :param nr_of_parallel_workers: number of worker processes, 0 means all CPUs, -1 one less than all CPUs, etc.
+    :return: result summary per building fid, summary is None for buildings where parsing of the results failed
+    """
+    return _run_on_pool(collect_summary, [(fid, str(folder)) for fid, folder in result_folders.items()], nr_of_parallel_workers)
+
+
+def _run_on_pool(job_function, jobs, nr_of_parallel_workers: int) -> Dict[int, Optional[EnergyDemandSimulationResults]]:
+    if nr_of_parallel_workers <= 0:
+        nr_of_parallel_workers = max(1, multiprocessing.cpu_count() + nr_of_parallel_workers)
+    summaries = {}
+    with multiprocessing.Pool(nr_of_parallel_workers, initializer=init_worker) as pool:
+        # chunksize 1 and unordered results, so each building is summarised and returned as soon as its own job is finished
+        for (fid, summary) in pool.imap_unordered(job_function, jobs, chunksize=1):
+            summaries[fid] = summary
+    failed_fids = [fid for fid, summary in summaries.items() if summary is None]
+    if failed_fids:
+        logging.getLogger(__name__).error(f"no result summary for fids {failed_fids}")
+    # keep the order of the fid's as passed in
+    return {job[0]: summaries[job[0]] for job in jobs}
@@ -20,7 +20,9 @@
 # Contact: https://www.empa.ch/web/s313
 #
 import os
-from typing import Dict, Any
+import functools
+from typing import Dict, Any, NamedTuple, Optional
+import pandas as pd
 import pint
 import logging
 import yaml
@@ -31,11 +33,33 @@ from cesarp.construction.ConstructionBasics import ConstructionBasics
 from cesarp.model.Construction import Construction, BuildingElement
 from cesarp.model.EnergySource import EnergySource
 
-from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader, GraphReaderProtocol, BuildingElementConstrcutionsArchetype
+from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader, GraphReaderProtocol
 from cesarp.graphdb_access.ArchetypicalConstructionGraphDBBased import ArchetypicalConstructionGraphDBBased
 from cesarp.graphdb_access import _default_config_file
 from cesarp.model.WindowConstruction import WindowGlassConstruction
 
+from AgeClassIndex import AgeClassIndex
+from ArchetypeConstructionStore import ArchetypeConstructionStore, ArchetypeGraphData, read_archetype_graph_data
+from BatchedGraphReader import BatchedGraphReader
+from BuildingInformationTable import BuildingInformationTable
+
+# maximum number of entries kept per factory instance
+RETROFITTED_ARCHETYPE_CACHE_SIZE = 1024
+RETROFITTED_CONSTRUCTION_CACHE_SIZE = 256
+
+
+class PastRetrofitAgeClasses(NamedTuple):
+    """
+    Age class (as number, see GraphDBCustomArchetypicalConstructionFactory._year_to_ageclass_lookup) of the past retrofit
+    per building element, None if the element was not retrofitted after the construction of the building.
+    """
+
+    wall: Optional[int]
+    roof: Optional[int]
+    groundfloor: Optional[int]
+    window: Optional[int]
+    window_shading: int  # window shading is taken from the archetype of that age class, also if the window was not retrofitted
+
 
 class GraphDBCustomArchetypicalConstructionFactory:
     """
@@ -43,6 +67,15 @@ class GraphDBCustomArchetypicalConstructionFactory:
     In the initialization you have to pass the information per building needed to get the appropriate archetype.
     After initialization, you call get_archetype_for(bldg_fid) for each of your buildings.
     Note that archetypes are cached, if several buildings use the same archetype they are not re-constructed.
+    Buildings having the same archetype, past retrofits and energy carriers share the same archetype instance, thus it
+    must not be changed. Retrofitted constructions are shared as well.
+    If an archetype store was created in the main process (see ArchetypeConstructionStore.create_shared_archetype_store),
+    the archetypes are taken from there instead of querying them from the graph. The graph is then only queried for the
+    constructions of past retrofits, with a LazyGraphReader (see ArchetypeStoreBldgModelFactory) it is not even read if no
+    building has a past retrofit.
+    The graph data needed for the archetypes and past retrofits of all buildings is queried in bulk during initialization,
+    see BatchedGraphReader.
+    The archetypes of all buildings are looked up at once from their year of construction during initialization, see AgeClassIndex.
     """
 
     def __init__(
@@ -59,55 +92,143 @@ class GraphDBCustomArchetypicalConstructionFactory:
         self._bldg_fid_to_year_of_constr_lookup = bldg_fid_to_year_of_constr_lookup
         self._bldg_fid_to_dhw_ecarrier_lookup = bldg_fid_to_dhw_ecarrier_lookup
         self._bldg_fid_to_heating_ecarrier_lookup = bldg_fid_to_heating_ecarrier_lookup
-        self._constr_reader = BldgElementConstructionReader(graph_data_reader, ureg, custom_config)
+        self._graph_reader = BatchedGraphReader(graph_data_reader)
+        self._constr_reader = BldgElementConstructionReader(self._graph_reader, ureg, custom_config)
         self._construction_basics = ConstructionBasics(self._ureg, custom_config)
+        self._shared_store = ArchetypeConstructionStore.from_environment()
+        archetype_uris = [archetype_cfg["URI"] for archetype_cfg in self._cfg["ARCHETYPES"].values()]
+        if self._shared_store is None or not all(self._shared_store.contains(archetype_uri) for archetype_uri in archetype_uris):
+            self._graph_reader.prefetch_archetypes(archetype_uris)
         self._ageclass_archetype = self._init_age_class_lookup()
-        self._construction_cache: Dict[str, BuildingElementConstrcutionsArchetype] = dict()  # key is archetype URI
-        self._bldg_fid_to_year_of_retrofit_per_constr_lookup = self._init_year_of_retrofit_per_constr_lookup()
+        self._ageclass_index = AgeClassIndex(self._ageclass_archetype.keys())
+        self._bldg_fid_to_archetype_uri_lookup = self._init_archetype_uri_lookup()
+        self._construction_cache: Dict[str, ArchetypeGraphData] = dict()  # key is archetype URI
+        self._year_of_retrofit_per_constr = self._init_year_of_retrofit_per_constr_lookup()
+        self._get_retrofitted_archetype = functools.lru_cache(maxsize=RETROFITTED_ARCHETYPE_CACHE_SIZE)(self._create_retrofitted_archetype)
+        self._get_retrofitted_construction = functools.lru_cache(maxsize=RETROFITTED_CONSTRUCTION_CACHE_SIZE)(self._create_retrofitted_construction)
+        self._get_retrofitted_window_glass = functools.lru_cache(maxsize=RETROFITTED_CONSTRUCTION_CACHE_SIZE)(self._create_retrofitted_window_glass)
+        self._prefetch_graph_data()
 
     def _init_age_class_lookup(self) -> Dict[AgeClass, str]:
         ageclass_archetype = {}
         for archetype_shortname, archetype_cfg in self._cfg["ARCHETYPES"].items():
             arch_uri = archetype_cfg["URI"]
-            age_class = self._constr_reader.get_age_class_of_archetype(arch_uri)
+            stored_graph_data = self._shared_store.get(arch_uri) if self._shared_store else None
+            age_class = stored_graph_data.age_class if stored_graph_data else self._constr_reader.get_age_class_of_archetype(arch_uri)
             ageclass_archetype[age_class] = arch_uri
 
         if not AgeClass.are_age_classes_consecutive(list(ageclass_archetype.keys())):
             logging.error("age classes retrieved from database are not consecutive. check min/max age of the used age classes so that there are neighter gaps nor overlaps.")
         return ageclass_archetype
 
-    def _init_year_of_retrofit_per_constr_lookup(self) -> Dict[int, Dict[str, int]]:
+    def _init_archetype_uri_lookup(self) -> Dict[int, Optional[str]]:
+        """
+        :return: archetype URI per building, None if no archetype matches the year of construction
+        """
+        bldg_fids = list(self._bldg_fid_to_year_of_constr_lookup.keys())
+        archetype_uris = self._ageclass_index.map_years([self._bldg_fid_to_year_of_constr_lookup[fid] for fid in bldg_fids], self._ageclass_archetype)
+        return dict(zip(bldg_fids, archetype_uris))
+
+    def _init_year_of_retrofit_per_constr_lookup(self) -> pd.DataFrame:
+        """
+        :return: year of retrofit per building element (columns year_of_wall_retrofit, ...) indexed by building fid
+        """
         config_file = os.path.dirname(os.path.abspath(__file__)) + "/graph_db_custom_archetypical_config.yml"
         with open(config_file, "r", encoding="utf-8") as ymlfile:
             config = yaml.load(ymlfile, Loader=yaml.SafeLoader)
             config["BLDG_PAST_RETROFIT_PER_BLDG_FILE"]["PATH"] = cesarp.common.abs_path(config["BLDG_PAST_RETROFIT_PER_BLDG_FILE"]["PATH"], __file__)
-        all_bldgs_year_of_retrofit = cesarp.common.csv_reader.read_csvy(
-            config["BLDG_PAST_RETROFIT_PER_BLDG_FILE"]["PATH"],
-            ["gis_fid", "year_of_wall_retrofit", "year_of_roof_retrofit", "year_of_groundfloor_retrofit", "year_of_window_retrofit"],
-            config["BLDG_PAST_RETROFIT_PER_BLDG_FILE"]["LABELS"],
-            config["BLDG_PAST_RETROFIT_PER_BLDG_FILE"]["SEPARATOR"],
-            "gis_fid",
+        retrofit_file_cfg = config["BLDG_PAST_RETROFIT_PER_BLDG_FILE"]
+        labels = retrofit_file_cfg["LABELS"]
+        bldg_info_table = BuildingInformationTable.for_file(retrofit_file_cfg["PATH"], retrofit_file_cfg["SEPARATOR"], fid_label=labels["gis_fid"])
+        return bldg_info_table.get_columns({name: labels[name] for name in ["year_of_wall_retrofit", "year_of_roof_retrofit", "year_of_groundfloor_retrofit", "year_of_window_retrofit"]})
+
+    def _prefetch_graph_data(self) -> None:
+        archetype_uris = set(self._ageclass_archetype.values())
+        if self._shared_store is None:
+            self._graph_reader.prefetch("get_constructions_from_graph", archetype_uris)
+            surface_uris = {surface for uri in archetype_uris for surface in self._graph_reader.get_constructions_from_graph(uri)["surface"]}
+            self._graph_reader.prefetch_layers(surface_uris)
+            self._graph_reader.prefetch("get_construction_emission_from_graph", surface_uris)
+            self._graph_reader.prefetch("get_u_value_from_graph", surface_uris)
+
+        retrofit_constr_uris = set()
+        for bldg_fid, archetype_uri in self._bldg_fid_to_archetype_uri_lookup.items():
+            if archetype_uri is None:
+                continue  # error is reported when creating the archetype for that building
+            try:
+                retrofit_age_classes = self._get_past_retrofit_age_classes(bldg_fid)
+                retrofit_constr_uris.update(self._get_past_retrofit_construction_uris(archetype_uri, retrofit_age_classes).values())
+            except Exception:
+                pass  # errors are reported when creating the archetype for that building
+        self._graph_reader.prefetch_layers(retrofit_constr_uris)
+
+    def _get_past_retrofit_age_classes(self, bldg_fid: int) -> PastRetrofitAgeClasses:
+        year_of_construction = self._bldg_fid_to_year_of_constr_lookup[bldg_fid]
+        construction_age_class = self._year_to_ageclass_lookup(year_of_construction)
+
+        def age_class_if_retrofitted(year_of_retrofit_key: str) -> Optional[int]:
+            ret_year_age_class_num = self._year_to_ageclass_lookup(self._year_of_retrofit_per_constr.at[bldg_fid, year_of_retrofit_key])
+            return ret_year_age_class_num if ret_year_age_class_num > construction_age_class else None
+
+        return PastRetrofitAgeClasses(
+            wall=age_class_if_retrofitted("year_of_wall_retrofit"),
+            roof=age_class_if_retrofitted("year_of_roof_retrofit"),
+            groundfloor=age_class_if_retrofitted("year_of_groundfloor_retrofit"),
+            window=age_class_if_retrofitted("year_of_window_retrofit"),
+            window_shading=self._year_to_ageclass_lookup(self._year_of_retrofit_per_constr.at[bldg_fid, "year_of_window_retrofit"]),
         )
-        return all_bldgs_year_of_retrofit.to_dict(orient="index")
+
+    def _get_past_retrofit_construction_uris(self, archetype_uri: str, retrofit_age_classes: PastRetrofitAgeClasses) -> Dict[BuildingElement, str]:
+        """
+        :return: URI's of the retrofitted constructions, only for the retrofitted building elements
+        """
+        constr_from_graph_db = self._get_archetype_graph_data(archetype_uri).constructions
+        retrofit_constr_uris = {}
+        for (bldg_element, constr_options, ret_year_age_class_num) in [
+            (BuildingElement.WALL, constr_from_graph_db.walls, retrofit_age_classes.wall),
+            (BuildingElement.ROOF, constr_from_graph_db.roofs, retrofit_age_classes.roof),
+            (BuildingElement.GROUNDFLOOR, constr_from_graph_db.grounds, retrofit_age_classes.groundfloor),
+        ]:
+            if ret_year_age_class_num is not None:
+                constr_default = self._constr_reader.get_default_construction(constr_options, constr_from_graph_db.short_name)
+                retrofit_constr_uris[bldg_element] = constr_default.name + "_R_" + str(ret_year_age_class_num)
+        if retrofit_age_classes.window is not None:
+            retrofit_constr_uris[BuildingElement.WINDOW] = self._cfg["ARCHETYPES"][str(retrofit_age_classes.window) + "_SFH_ARCHETYPE"]["DEFAULT_CONSTRUCTION_SPECIFIC"]["WINDOW"]
+        return retrofit_constr_uris
+
+    def _get_archetype_graph_data(self, archetype_uri: str) -> ArchetypeGraphData:
+        if archetype_uri not in self._construction_cache.keys():
+            graph_data = self._shared_store.get(archetype_uri) if self._shared_store else None
+            if graph_data is None:
+                graph_data = read_archetype_graph_data(self._constr_reader, archetype_uri)
+            self._construction_cache[archetype_uri] = graph_data
+        return self._construction_cache[archetype_uri]
 
     def get_archetype_for(self, bldg_fid: int) -> ArchetypicalBuildingConstruction:
-        year_of_construction = self._bldg_fid_to_year_of_constr_lookup[bldg_fid]
-        try:
-            archetype_uri = self._get_archetype_uri_for(year_of_construction)
-        except Exception:
+        archetype_uri = self._bldg_fid_to_archetype_uri_lookup[bldg_fid]
+        if archetype_uri is None:
+            year_of_construction = self._bldg_fid_to_year_of_constr_lookup[bldg_fid]
             logging.error(f"no archetype found for building with fid {bldg_fid} and year of construction {year_of_construction}")
+            raise Exception(f"no archetype found for building with fid {bldg_fid} and year of construction {year_of_construction}")
 
-        if archetype_uri in self._construction_cache.keys():
-            constr_from_graph_db = self._construction_cache[archetype_uri]
-        else:
-            constr_from_graph_db = self._constr_reader.get_bldg_elem_construction_archetype(archetype_uri)
-            self._construction_cache[archetype_uri] = constr_from_graph_db
+        return self._get_retrofitted_archetype(
+            archetype_uri,
+            self._get_past_retrofit_age_classes(bldg_fid),
+            self._bldg_fid_to_dhw_ecarrier_lookup[bldg_fid],
+            self._bldg_fid_to_heating_ecarrier_lookup[bldg_fid],
+        )
+
+    def _create_retrofitted_archetype(
+        self, archetype_uri: str, retrofit_age_classes: PastRetrofitAgeClasses, dhw_ecarrier: EnergySource, heating_ecarrier: EnergySource
+    ) -> ArchetypicalConstructionGraphDBBased:
+        graph_data = self._get_archetype_graph_data(archetype_uri)
+        constr_from_graph_db = graph_data.constructions
 
         archetype = ArchetypicalConstructionGraphDBBased(
             window_glass_constr_options=constr_from_graph_db.windows,
             window_glass_constr_default=self._constr_reader.get_default_construction(constr_from_graph_db.windows, constr_from_graph_db.short_name),
             window_frame_construction=self._construction_basics.get_fixed_window_frame_construction(),
-            window_shade_constr=self._constr_reader.get_window_shading_constr(archetype_uri),
+            window_shade_constr=graph_data.window_shade_constr,
             roof_constr_options=constr_from_graph_db.roofs,
             roof_constr_default=self._constr_reader.get_default_construction(constr_from_graph_db.roofs, constr_from_graph_db.short_name),
             groundfloor_constr_options=constr_from_graph_db.grounds,
@@ -116,22 +237,16 @@ class GraphDBCustomArchetypicalConstructionFactory:
             wall_constr_default=self._constr_reader.get_default_construction(constr_from_graph_db.walls, constr_from_graph_db.short_name),
             internal_ceiling_options=constr_from_graph_db.internal_ceilings,
             internal_ceiling_default=self._constr_reader.get_default_construction(constr_from_graph_db.internal_ceilings, constr_from_graph_db.short_name),
-            glazing_ratio=self._constr_reader.get_glazing_ratio(constr_from_graph_db.name),
-            infiltration_rate=self._constr_reader.get_infiltration_rate(constr_from_graph_db.name),
+            glazing_ratio=graph_data.glazing_ratio,
+            infiltration_rate=graph_data.infiltration_rate,
             infiltration_fraction_profile_value=self._cfg["FIXED_INFILTRATION_PROFILE_VALUE"] * self._ureg.dimensionless,
-            installations_characteristics=self._construction_basics.get_inst_characteristics(
-                self._bldg_fid_to_dhw_ecarrier_lookup[bldg_fid],
-                self._bldg_fid_to_heating_ecarrier_lookup[bldg_fid],
-            ),
+            installations_characteristics=self._construction_basics.get_inst_characteristics(dhw_ecarrier, heating_ecarrier),
         )
 
-        retr_archetype = self.create_modified_archetype_constructions(archetype, bldg_fid)
-
-        return retr_archetype
+        return self.create_modified_archetype_constructions(archetype, archetype_uri, retrofit_age_classes)
 
-    def create_modified_archetype_constructions(self, archetype: ArchetypicalConstructionGraphDBBased, bldg_fid: int):
-        year_of_construction = self._bldg_fid_to_year_of_constr_lookup[bldg_fid]
-        construction_age_class = self._year_to_ageclass_lookup(year_of_construction)
+    def create_modified_archetype_constructions(self, archetype: ArchetypicalConstructionGraphDBBased, archetype_uri: str, retrofit_age_classes: PastRetrofitAgeClasses):
+        retrofit_constr_uris = self._get_past_retrofit_construction_uris(archetype_uri, retrofit_age_classes)
         infiltration_rate = archetype.infiltration_rate
         wall_constr_default = archetype.wall_constr._default
         roof_constr_default = archetype.roof_constr._default
@@ -142,40 +257,28 @@ class GraphDBCustomArchetypicalConstructionFactory:
         grounds = archetype.groundfloor_constr._all_options
         windows = archetype.window_glass_constr._all_options
 
-        wall_ret_year = self._bldg_fid_to_year_of_retrofit_per_constr_lookup[bldg_fid]["year_of_wall_retrofit"]
-        wall_ret_year_age_class_num = self._year_to_ageclass_lookup(wall_ret_year)
-        if wall_ret_year_age_class_num > construction_age_class:
-            new_wall_uri = archetype.wall_constr._default.name + "_R_" + str(wall_ret_year_age_class_num)
-            wall_constr_default = Construction(name=new_wall_uri, layers=self._constr_reader.get_layers(new_wall_uri), bldg_element=BuildingElement.WALL)
+        if BuildingElement.WALL in retrofit_constr_uris:
+            wall_constr_default = self._get_retrofitted_construction(retrofit_constr_uris[BuildingElement.WALL], BuildingElement.WALL)
             walls = [wall_constr_default]
 
-        roof_ret_year = self._bldg_fid_to_year_of_retrofit_per_constr_lookup[bldg_fid]["year_of_roof_retrofit"]
-        roof_ret_year_age_class_num = self._year_to_ageclass_lookup(roof_ret_year)
-        if roof_ret_year_age_class_num > construction_age_class:
-            new_roof_uri = archetype.roof_constr._default.name + "_R_" + str(roof_ret_year_age_class_num)
-            roof_constr_default = Construction(name=new_roof_uri, layers=self._constr_reader.get_layers(new_roof_uri), bldg_element=BuildingElement.ROOF)
+        if BuildingElement.ROOF in retrofit_constr_uris:
+            roof_constr_default = self._get_retrofitted_construction(retrofit_constr_uris[BuildingElement.ROOF], BuildingElement.ROOF)
             roofs = [roof_constr_default]
 
-        ground_ret_year = self._bldg_fid_to_year_of_retrofit_per_constr_lookup[bldg_fid]["year_of_groundfloor_retrofit"]
-        ground_ret_year_age_class_num = self._year_to_ageclass_lookup(ground_ret_year)
-        if ground_ret_year_age_class_num > construction_age_class:
-            new_ground_uri = archetype.groundfloor_constr._default.name + "_R_" + str(ground_ret_year_age_class_num)
-            ground_constr_default = Construction(name=new_ground_uri, layers=self._constr_reader.get_layers(new_ground_uri), bldg_element=BuildingElement.GROUNDFLOOR)
+        if BuildingElement.GROUNDFLOOR in retrofit_constr_uris:
+            ground_constr_default = self._get_retrofitted_construction(retrofit_constr_uris[BuildingElement.GROUNDFLOOR], BuildingElement.GROUNDFLOOR)
             grounds = [ground_constr_default]
 
-        window_ret_year = self._bldg_fid_to_year_of_retrofit_per_constr_lookup[bldg_fid]["year_of_window_retrofit"]
-        window_ret_year_age_class_num = self._year_to_ageclass_lookup(window_ret_year)
-        if window_ret_year_age_class_num > construction_age_class:
-            new_window_uri = self._cfg["ARCHETYPES"][str(window_ret_year_age_class_num) + "_SFH_ARCHETYPE"]["DEFAULT_CONSTRUCTION_SPECIFIC"]["WINDOW"]
-            window_glass_constr_default = WindowGlassConstruction(name=new_window_uri, layers=self._constr_reader.get_window_layers(new_window_uri))
-            infiltration_rate = self._constr_reader.get_infiltration_rate(self._get_archetype_uri_for(window_ret_year_age_class_num))
+        if BuildingElement.WINDOW in retrofit_constr_uris:
+            window_glass_constr_default = self._get_retrofitted_window_glass(retrofit_constr_uris[BuildingElement.WINDOW])
+            infiltration_rate = self._get_archetype_graph_data(self._get_archetype_uri_for(retrofit_age_classes.window)).infiltration_rate
             windows = [window_glass_constr_default]
 
         retr_archetype = ArchetypicalConstructionGraphDBBased(
             window_glass_constr_options=windows,
             window_glass_constr_default=window_glass_constr_default,
             window_frame_construction=self._construction_basics.get_fixed_window_frame_construction(),
-            window_shade_constr=self._constr_reader.get_window_shading_constr(self._get_archetype_uri_for(window_ret_year_age_class_num)),
+            window_shade_constr=self._get_archetype_graph_data(self._get_archetype_uri_for(retrofit_age_classes.window_shading)).window_shade_constr,
             roof_constr_options=roofs,
             roof_constr_default=roof_constr_default,
             groundfloor_constr_options=grounds,
@@ -187,14 +290,17 @@ class GraphDBCustomArchetypicalConstructionFactory:
             glazing_ratio=archetype.glazing_ratio,
             infiltration_rate=infiltration_rate,
             infiltration_fraction_profile_value=self._cfg["FIXED_INFILTRATION_PROFILE_VALUE"] * self._ureg.dimensionless,
-            installations_characteristics=self._construction_basics.get_inst_characteristics(
-                self._bldg_fid_to_dhw_ecarrier_lookup[bldg_fid],
-                self._bldg_fid_to_heating_ecarrier_lookup[bldg_fid],
-            ),
+            installations_characteristics=archetype.installations_characteristics,
         )
 
         return retr_archetype
 
+    def _create_retrofitted_construction(self, retrofit_constr_uri: str, bldg_element: BuildingElement) -> Construction:
+        return Construction(name=retrofit_constr_uri, layers=self._constr_reader.get_layers(retrofit_constr_uri), bldg_element=bldg_element)
+
+    def _create_retrofitted_window_glass(self, retrofit_constr_uri: str) -> WindowGlassConstruction:
+        return WindowGlassConstruction(name=retrofit_constr_uri, layers=self._constr_reader.get_window_layers(retrofit_constr_uri))
+
     def _get_archetype_uri_for(self, year_of_construction) -> str:
         """
         :param year_of_construction: [description]
@@ -203,11 +309,11 @@ class GraphDBCustomArchetypicalConstructionFactory:
         :rtype: [type]
         :raises: Exception if no archetype for given year_of_construction was found
         """
-        age_class = AgeClass.get_age_class_for(year_of_construction, self._ageclass_archetype.keys())
+        age_class = self._ageclass_index.get_age_class_for(year_of_construction)
         return self._ageclass_archetype[age_class]
 
     def _year_to_ageclass_lookup(self, year) -> int:
-        age_class = AgeClass.get_age_class_for(year, self._ageclass_archetype.keys())
+        age_class = self._ageclass_index.get_age_class_for(year)
         if age_class.max_age:
             return age_class.max_age
         elif age_class.min_age:
@@ -0,0 +1,70 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz, Aaron Bojarski, Ricardo Parreira da Silva, Sven Eggimann.
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Checks that the GraphDBCustomArchetypicalConstructionFactory does not read the graph if all archetypes are in the
+ArchetypeConstructionStore and the buildings have no past retrofit. Run with pytest, needs cesar-p installed.
+"""
+import os
+import sys
+
+import cesarp.common
+import cesarp.common.config_loader
+from cesarp.model.EnergySource import EnergySource
+
+_EXAMPLE_DIR = os.path.dirname(os.path.abspath(__file__))
+# make sure the GraphDBCustomArchetypicalConstructionFactory and the ArchetypeConstructionStore can be found
+sys.path.append(_EXAMPLE_DIR)
+sys.path.append(os.path.join(_EXAMPLE_DIR, ".."))
+import ArchetypeConstructionStore  # noqa: E402
+from ArchetypeConstructionStore import ARCHETYPE_STORE_DIR_ENV_VAR, LazyGraphReader, create_shared_archetype_store, get_configured_archetype_uris  # noqa: E402
+from GraphDBCustomArchetypicalConstructionFactory import GraphDBCustomArchetypicalConstructionFactory  # noqa: E402
+
+# buildings of BuildingInformation_withRetrofits.csv whose retrofit years equal the year of construction
+_YEAR_OF_CONSTR_NO_RETROFIT = {7: 2008, 8: 2012, 9: 2015}
+
+
+def test_graph_reader_not_created_with_complete_store(tmp_path, monkeypatch):
+    ureg = cesarp.common.init_unit_registry()
+    config = cesarp.common.config_loader.load_config_full(os.path.join(_EXAMPLE_DIR, "custom_constr_archetype_config.yml"))
+    monkeypatch.setenv(ARCHETYPE_STORE_DIR_ENV_VAR, "")  # restored after the test, create_shared_archetype_store() sets it
+    create_shared_archetype_store(tmp_path, get_configured_archetype_uris(config), ureg, config)
+
+    graph_reader_requests = []
+
+    def record_graph_reader_request(custom_config=None):
+        graph_reader_requests.append(custom_config)
+        raise AssertionError("graph reader created although all archetypes are in the store")
+
+    monkeypatch.setattr(ArchetypeConstructionStore, "create_graph_reader", record_graph_reader_request)
+
+    factory = GraphDBCustomArchetypicalConstructionFactory(
+        _YEAR_OF_CONSTR_NO_RETROFIT,
+        {fid: EnergySource.DHW_OTHER for fid in _YEAR_OF_CONSTR_NO_RETROFIT.keys()},
+        {fid: EnergySource.HEATING_OTHER for fid in _YEAR_OF_CONSTR_NO_RETROFIT.keys()},
+        LazyGraphReader(config),
+        ureg,
+        config,
+    )
+    for fid in _YEAR_OF_CONSTR_NO_RETROFIT.keys():
+        archetype = factory.get_archetype_for(fid)
+        assert archetype.window_shade_constr is not None
+    assert not graph_reader_requests
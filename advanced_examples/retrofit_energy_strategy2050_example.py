@@ -32,6 +32,8 @@ from pathlib import Path
 from cesarp.retrofit.energy_perspective_2050.EnergyPerspective2050RetrofitManager import EnergyPerspective2050RetrofitManager
 import cesarp.common
 
+from WeatherFileStore import WeatherFileStore
+
 
 def __abs_path(rel_path: str) -> Path:
     return cesarp.common.config_loader.abs_path(rel_path, os.path.abspath(__file__))
@@ -53,6 +55,9 @@ if __name__ == "__main__":
         2040: str(ressources_path / Path("Zurich_2040.epw")),
         2050: str(ressources_path / Path("Zurich_2050.epw")),
     }
+    # periods having the same weather (2030 to 2050 in the example project files) use the same staged weather file
+    weather_mapping = WeatherFileStore.for_folder(__abs_path("results/weather_files")).stage_mapping(weather_mapping)
+    logging.info(f"{len(set(weather_mapping.values()))} distinct weather files for {len(weather_mapping)} periods")
 
     retfit_mgr = EnergyPerspective2050RetrofitManager(
         ureg=ureg, base_config_path=cfg_path, project_base_path=output_path, weather_per_period=weather_mapping, fids_to_use=range(1, 3)
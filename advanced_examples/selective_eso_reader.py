@@ -0,0 +1,233 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Reading only the requested variables from EnergyPlus ESO files.
+
+cesar-p uses esoreader, which converts every value of every variable in the ESO file to float and keeps all of them in memory,
+even if only two or three variables are requested afterwards. The reader in this module scans the data dictionary at the
+top of the ESO file once, resolves the requested variables to their report codes and then extracts only the lines of those
+report codes in one pass over the data section, filling preallocated NumPy arrays.
+
+Variables are matched the same way as esoreader does (case insensitive substring of the variable name, exact reporting frequency),
+thus the functions here can be used as a drop-in replacement for the ones from cesarp.eplus_adapter.eplus_eso_results_handling
+with the same name.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pint
+
+import cesarp.eplus_adapter.eplus_eso_results_handling as eplus_eso_results_handling
+from cesarp.eplus_adapter.EPlusEioResultAnalyzer import EPlusEioResultAnalyzer
+from cesarp.eplus_adapter.idf_strings import ResultsFrequency
+from cesarp.results.EnergyDemandSimulationResults import EnergyDemandSimulationResults
+
+ESO_FILE_NAME = "eplusout.eso"
+_END_OF_DICTIONARY = "End of Data Dictionary"
+_END_OF_DATA = "End of Data"
+
+# initial array size per reporting frequency, arrays are enlarged if there are more values (e.g. when design days are reported too)
+_EXPECTED_NR_OF_VALUES = {"timestep": 8784 * 6, "hourly": 8784, "daily": 366, "monthly": 12, "runperiod": 1, "annual": 1}
+
+
+class EsoVariable(NamedTuple):
+    report_code: str
+    frequency: str
+    key: Optional[str]
+    name: str
+    unit: Optional[str]
+
+
+class EsoDataDictionary:
+    """
+    Variables declared in the data dictionary of an ESO file, indexed by report code.
+    """
+
+    def __init__(self, variables: Sequence[EsoVariable]):
+        self.variables: Dict[str, EsoVariable] = {var.report_code: var for var in variables}
+
+    def find_variables(self, search: str, frequency: str, key: Optional[str] = None) -> List[EsoVariable]:
+        """
+        :param search: variable name or part of it, case insensitive
+        :param frequency: reporting frequency, e.g. "Hourly"
+        :param key: key of the variable (e.g. zone or surface name), if None variables with any key match
+        :return: matching variables in the order they are declared in the ESO file
+        """
+        return [
+            var
+            for var in self.variables.values()
+            if search.lower() in var.name.lower() and var.frequency.lower() == frequency.lower() and (key is None or (var.key is not None and var.key.lower() == key.lower()))
+        ]
+
+
+def read_data_dictionary(eso_file) -> EsoDataDictionary:
+    """
+    Parse the data dictionary of an ESO file. The file object is advanced to the beginning of the data section.
+
+    :param eso_file: ESO file opened for reading text
+    :return: parsed data dictionary
+    """
+    eso_file.readline()  # program version line
+    variables = []
+    for line in eso_file:
+        line = line.strip()
+        if line == _END_OF_DICTIONARY:
+            break
+        line = line.split("! ", 1)[0]  # time stamp declarations have a trailing "! When ... Requested" comment
+        if " !" not in line:
+            continue  # not a report variable
+        (declaration, frequency_spec) = line.split(" !", 1)
+        fields = [field.strip() for field in declaration.split(",")]
+        if len(fields) >= 4:
+            (report_code, _, key, var_with_unit) = fields[:4]
+        else:
+            (report_code, _, var_with_unit) = fields[:3]
+            key = None
+        (var_name, unit) = _split_variable_unit(var_with_unit)
+        variables.append(EsoVariable(report_code, frequency_spec.split()[0], key, var_name, unit))
+    return EsoDataDictionary(variables)
+
+
+def read_variables(eso_file, variables_to_read: Sequence[EsoVariable]) -> Dict[str, np.ndarray]:
+    """
+    Read the values of the given variables in one pass over the data section of the ESO file.
+    Only the first value of each data line is extracted, which is the value for the reporting period (for Monthly/RunPeriod
+    variables the minimum/maximum values and their timestamps are skipped).
+
+    :param eso_file: ESO file opened for reading text, positioned at the beginning of the data section (e.g. after calling read_data_dictionary())
+    :param variables_to_read: variables as returned by EsoDataDictionary.find_variables()
+    :return: values per report code
+    """
+    values = {var.report_code: np.empty(_EXPECTED_NR_OF_VALUES.get(var.frequency.lower(), 8784), dtype=np.float64) for var in variables_to_read}
+    nr_of_values = {report_code: 0 for report_code in values.keys()}
+    if values:
+        for line in eso_file:
+            sep_pos = line.find(",")
+            report_code = line[:sep_pos]
+            if report_code not in values:
+                if line.startswith(_END_OF_DATA):
+                    break
+                continue
+            var_values = values[report_code]
+            pos = nr_of_values[report_code]
+            if pos == len(var_values):
+                var_values = np.resize(var_values, 2 * len(var_values))
+                values[report_code] = var_values
+            value_end_pos = line.find(",", sep_pos + 1)
+            var_values[pos] = float(line[sep_pos + 1 : value_end_pos if value_end_pos > 0 else None])
+            nr_of_values[report_code] = pos + 1
+    return {report_code: var_values[: nr_of_values[report_code]] for report_code, var_values in values.items()}
+
+
+def read_eso(eso_file_path: Union[str, Path], result_keys: Sequence[str], frequency: str, all_matches: bool = False) -> Dict[str, List[Tuple[EsoVariable, np.ndarray]]]:
+    """
+    Read the requested variables from an ESO file.
+
+    :param eso_file_path: full path to the ESO file
+    :param result_keys: names of the result parameters to read
+    :param frequency: reporting frequency, e.g. "Hourly"
+    :param all_matches: if False only the first variable matching a result key is read (as cesar-p does for custom results), otherwise all
+    :return: per result key list of (variable, values), list is empty if no variable matched
+    """
+    with open(eso_file_path, "r") as eso_file:
+        data_dict = read_data_dictionary(eso_file)
+        matches = {result_key: data_dict.find_variables(result_key, frequency) for result_key in result_keys}
+        if not all_matches:
+            matches = {result_key: variables[:1] for result_key, variables in matches.items()}
+        values = read_variables(eso_file, list({var.report_code: var for variables in matches.values() for var in variables}.values()))
+    return {result_key: [(var, values[var.report_code]) for var in variables] for result_key, variables in matches.items()}
+
+
+def collect_multi_params_for_site(result_folders: Mapping[int, str], result_keys: Sequence, results_frequency: ResultsFrequency) -> pd.DataFrame:
+    """
+    Same as cesarp.eplus_adapter.eplus_eso_results_handling.collect_multi_params_for_site, but reading only the requested variables.
+
+    :param result_folders: folders containing result files, one eso file named eplusout.eso is expected per folder
+    :param result_keys: List of names of the result parameters to get. Parameter name has to point to unique result, e.g. DistrictHeating:HVAC (not only DistrictHeating).
+    :param results_frequency: Time steps of results, e.g. RunPeriod, Hourly
+    :return: flat pandas.DataFrame with index timing and columns fid, var, value, unit
+    """
+    logger = logging.getLogger(__name__)
+    per_bldg_res = []
+    for fid, single_result_folder in result_folders.items():
+        eso_path = single_result_folder / Path(ESO_FILE_NAME)
+        try:
+            vars_per_key = read_eso(eso_path, result_keys, results_frequency.value)
+        except FileNotFoundError:
+            logger.warning(f"No {eso_path} not found. Skipping.")
+            continue
+        except Exception as msg:
+            logger.warning(f"Malformed eso {eso_path}. Skipping. Caused by: {msg}")
+            continue
+        for result_key, variables in vars_per_key.items():
+            if not variables:
+                logger.warning(f"{result_key} not found in {eso_path}. Skipping.")
+                continue
+            (var, values) = variables[0]
+            per_bldg_res.append(pd.DataFrame({"fid": fid, "var": result_key, "value": values, "unit": var.unit}, index=pd.RangeIndex(len(values), name="timing")))
+    if not per_bldg_res:
+        return pd.DataFrame(columns=["fid", "var", "value", "unit"])
+    return pd.concat(per_bldg_res, sort=False)
+
+
+def collect_cesar_simulation_summary(result_folder, ureg: pint.UnitRegistry) -> EnergyDemandSimulationResults:
+    """
+    Same as cesarp.eplus_adapter.eplus_eso_results_handling.collect_cesar_simulation_summary, but reading only the annual variables needed.
+
+    :param result_folder: folder with energy plus result files for one building (expected files: eplusout.eso and eplusout.eio)
+    :param ureg: reference to unit registry object
+    :return: annual demand results of the building
+    """
+    summary_keys = [
+        eplus_eso_results_handling.RES_KEY_HEATING_DEMAND,
+        eplus_eso_results_handling.RES_KEY_DHW_DEMAND,
+        eplus_eso_results_handling.RES_KEY_EL_DEMAND,
+        eplus_eso_results_handling.RES_KEY_COOLING_DEMAND,
+    ]
+    vars_per_key = read_eso(result_folder / Path(ESO_FILE_NAME), summary_keys, ResultsFrequency.ANNUAL.value, all_matches=True)
+    res_dict = {}
+    for variables in vars_per_key.values():
+        for (var, values) in variables:
+            data_w_unit = values[0] * ureg(var.unit) / ureg.year
+            try:
+                data_w_unit = data_w_unit.to(ureg.kWh / ureg.year)
+            except pint.errors.DimensionalityError:
+                pass
+            res_dict[var.name] = data_w_unit
+
+    return EnergyDemandSimulationResults(
+        tot_heating_demand=res_dict[eplus_eso_results_handling.RES_KEY_HEATING_DEMAND],
+        tot_dhw_demand=res_dict[eplus_eso_results_handling.RES_KEY_DHW_DEMAND],
+        tot_electricity_demand=res_dict[eplus_eso_results_handling.RES_KEY_EL_DEMAND],
+        tot_cooling_demand=res_dict[eplus_eso_results_handling.RES_KEY_COOLING_DEMAND],
+        total_floor_area=EPlusEioResultAnalyzer(result_folder, ureg).get_total_floor_area(),
+    )
+
+
+def _split_variable_unit(var_with_unit: str) -> Tuple[str, Optional[str]]:
+    if "[" not in var_with_unit:
+        return (var_with_unit, None)
+    (var_name, unit) = var_with_unit.split("[", 1)
+    return (var_name.strip(), unit.rstrip("]"))
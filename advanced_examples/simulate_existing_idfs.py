@@ -24,12 +24,11 @@ Does run simulations and collects results for a bunch of existing IDF files.
 Run a simulation with the basic_cesar_usage.py script to generate the IDF files expected or adapt the pathes below to your needs.
 """
 import os
+import sys
 from pathlib import Path
 
 import cesarp.common
 import cesarp.common.filehandling
-import cesarp.eplus_adapter.eplus_sim_runner
-import cesarp.eplus_adapter.eplus_eso_results_handling as eplus_eso_results_handling
 from cesarp.results.ResultProcessor import ResultProcessor
 
 
@@ -48,6 +47,10 @@ CONFIG = None
 
 
 if __name__ == "__main__":
+    # make sure parallel_simulation_summary can be found
+    sys.path.append(os.path.dirname(__file__))
+    import parallel_simulation_summary
+
     custom_config = {}
     if CONFIG:
         custom_config = cesarp.common.config_loader.load_config_full(CONFIG)
@@ -56,11 +59,12 @@ if __name__ == "__main__":
     idf_pathes = cesarp.common.filehandling.scan_directory(IDF_FOLDER, "fid_{}.idf")
     weather_files = {idx: WEATHER_FILE_PATH for idx in idf_pathes.keys()}
     result_folders = {idx: str(RESULT_FOLDER / Path("fid_{}".format(idx))) for idx in idf_pathes.keys()}
-    cesarp.eplus_adapter.eplus_sim_runner.run_batch(idf_pathes, weather_files, result_folders, -1, custom_config)
 
-    # get simulation results
+    # init unit registry before running the simulations, it is used to unpickle the results returned from the workers
     ureg = cesarp.common.init_unit_registry()
-    summary_res = {idx: eplus_eso_results_handling.collect_cesar_simulation_summary(res_folder, ureg) for idx, res_folder in result_folders.items()}
+    # each building is simulated and its result summary collected in the same worker job
+    summary_res = parallel_simulation_summary.run_batch_with_summary(idf_pathes, weather_files, result_folders, -1, custom_config)
+    summary_res = {idx: res for idx, res in summary_res.items() if res is not None}
     summary_res_as_df = ResultProcessor.convert_demand_results_to_df(summary_res, ureg)
     summary_res_file = RESULT_FOLDER / Path("summary.csv")
     summary_res_as_df.to_csv(summary_res_file, sep=";", float_format="%.4f")
@@ -0,0 +1,139 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Union, Tuple
+
+import pint
+
+import cesarp.eplus_adapter.eplus_sim_runner
+from cesarp.manager import processing_steps
+from cesarp.manager.SimulationManager import SimulationManager
+from cesarp.eplus_adapter.eplus_error_file_handling import EPLUS_ERROR_FILE_NAME
+
+from SimulationResultCache import SimulationResultCache
+
+
+def run_simulation_cached_no_exception(idf_path, weather_file, output_folder, config_eplus, cache_folder) -> Tuple[bool, float, bool]:
+    """
+    Module level method to be able to run it in the worker pool.
+    Same as cesarp.manager.processing_steps.run_simulation_no_exception, but first checks the cache for outputs of an identical simulation.
+
+    :return: tuple (successful, simulation time, True if outputs were restored from the cache)
+    """
+    start = time.time()
+    logger = logging.getLogger(__name__)
+    result_cache = SimulationResultCache(cache_folder)
+    try:
+        eplus_version_info = f"{cesarp.eplus_adapter.eplus_sim_runner.get_eplus_version(ep_config=config_eplus)}|{Path(cesarp.eplus_adapter.eplus_sim_runner.get_idd_path(ep_config=config_eplus)).name}"
+        cache_key = result_cache.get_cache_key(idf_path, weather_file, eplus_version_info)
+    except Exception as ex:
+        logger.warning(f"could not create cache key for {idf_path}, running simulation without cache. Caused by: {ex}")
+        (successful, sim_time) = processing_steps.run_simulation_no_exception(idf_path, weather_file, output_folder, config_eplus)
+        return (successful, sim_time, False)
+
+    if result_cache.restore(cache_key, output_folder):
+        return (True, time.time() - start, True)
+
+    (successful, sim_time) = processing_steps.run_simulation_no_exception(idf_path, weather_file, output_folder, config_eplus)
+    if successful:
+        result_cache.store(cache_key, output_folder)
+    return (successful, sim_time, False)
+
+
+class CachedSimulationManager(SimulationManager):
+    """
+    SimulationManager which skips the EnergyPlus run for a building if an identical simulation was run before.
+    See :py:class:`SimulationResultCache` for what makes two simulations identical.
+
+    Use it exactly as the SimulationManager, e.g. call run_all_steps(). Building models and IDF files are still created
+    for all buildings, only the simulation step is replaced by restoring the cached EnergyPlus outputs on a cache hit.
+    Results are then processed as usual from the restored outputs.
+    """
+
+    def __init__(
+        self,
+        base_output_path: Union[str, Path],
+        main_config: Union[str, Path, Dict[str, Any]],
+        unit_reg: pint.UnitRegistry,
+        cache_folder: Union[str, Path],
+        load_from_disk: bool = False,
+        fids_to_use: List[int] = None,
+        delete_old_logs=True,
+    ):
+        """
+        :param cache_folder: folder holding the cached EnergyPlus outputs, reuse the same folder for all runs which should profit from the cache
+        :type cache_folder: Union[str, Path]
+
+        for all other parameters see :py:class:`cesarp.manager.SimulationManager.SimulationManager`
+        """
+        super().__init__(base_output_path, main_config, unit_reg, load_from_disk=load_from_disk, fids_to_use=fids_to_use, delete_old_logs=delete_old_logs)
+        self._result_cache = SimulationResultCache(cache_folder)
+        self.cache_hit_fids: List[int] = []
+
+    def run_simulations(self) -> List[int]:
+        """
+        Run EnergyPlus simulation for all buildings having an IDF, restoring outputs from cache where possible.
+
+        :return: fid's for which EnergyPlus simulation failed
+        """
+        assert self.is_ready_to_run_sim(), "please run create_IDFs before calling run_simulation"
+
+        for container in self.bldg_containers.values():
+            container.clear_results()
+
+        bldg_gis_ids_to_simulate = list(self.idf_pathes.keys())
+        expected_output_folders = self._storage.get_eplus_output_pathes(bldg_gis_ids_to_simulate)
+
+        config_eplus = cesarp.eplus_adapter.eplus_sim_runner.get_config(self._custom_config)
+        job_res_dict = {
+            fid: self._get_worker_pool().apply_async(
+                run_simulation_cached_no_exception,
+                (self.idf_pathes[fid], self.weather_files[fid], expected_output_folders[fid], config_eplus, str(self._result_cache.cache_folder)),
+            )
+            for fid in bldg_gis_ids_to_simulate
+        }
+        res_tuples_dict = {fid: res.get() for fid, res in job_res_dict.items()}
+        eplus_run_timelog = {}
+        fids_sim_failed = []
+        fids_sim_successful = []
+        self.cache_hit_fids = []
+        for fid, (successful, sim_time, from_cache) in res_tuples_dict.items():
+            eplus_run_timelog[fid] = sim_time
+            if successful:
+                fids_sim_successful.append(fid)
+                self.output_folders[fid] = expected_output_folders[fid]
+                if from_cache:
+                    self.cache_hit_fids.append(fid)
+            else:
+                fids_sim_failed.append(fid)
+                self.bldg_containers[fid].set_error()
+
+        self.logger.info(f"restored EnergyPlus outputs from cache for {len(self.cache_hit_fids)} of {len(bldg_gis_ids_to_simulate)} buildings")
+        if fids_sim_failed:
+            self.logger.error(f"simulation failed for fids {fids_sim_failed}")
+            self.failed_fids.update(fids_sim_failed)
+
+        self._storage.save_eplus_sim_time_log(eplus_run_timelog)
+        self._storage.combine_eplus_error_files(fids_sim_failed, fids_sim_successful, EPLUS_ERROR_FILE_NAME)
+        return fids_sim_failed
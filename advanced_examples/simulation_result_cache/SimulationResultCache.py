@@ -0,0 +1,167 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+import os
+import shutil
+import hashlib
+import logging
+import uuid
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+_SCHEDULE_FILE_OBJ_NAME = "schedule:file"
+_SCHEDULE_FILE_NAME_FIELD_IDX = 3  # object type, name, schedule type limits name, file name
+
+
+class SimulationResultCache:
+    """
+    Persistent, content addressed cache for raw EnergyPlus outputs.
+
+    The cache key is a hash over the content of the IDF, the content of all profile files referenced by Schedule:File
+    objects of the IDF, the content of the weather file and the EnergyPlus version (plus IDD used). The IDF and weather file
+    name or location do not influence the key. In the IDF, comments and whitespace around the fields are ignored and the
+    file names of the Schedule:File objects are replaced by the hash of the profile file content. Thus an IDF re-generated
+    to another project folder, which differs only in the absolute pathes of its profile files, still results in a cache hit.
+    Any other difference of the IDF, e.g. another path in a field of another object, results in a new key.
+
+    Layout of the cache folder: one subfolder per key, named by the first two characters of the key and the key itself,
+    containing a copy of the full EnergyPlus output folder (eso, eio, err,...).
+    As cesar-p derives the result summary per building from the eso and eio files, restoring the output folder
+    restores the summary results as well.
+
+    The cache can be shared between several processes, entries are written to a temporary folder first and then
+    moved into place, thus a concurrent reader never sees a half written entry.
+    Note that nothing is ever evicted, clean up the cache folder manually if it gets too big.
+    """
+
+    # weather files are the same for many buildings, thus keep their hash per process, key is (path, size, modification time)
+    _weather_hash_memo: Dict[Tuple[str, int, float], str] = dict()
+
+    def __init__(self, cache_folder: Union[str, Path]):
+        """
+        :param cache_folder: folder where the cached outputs are stored, created if it does not exist
+        :type cache_folder: Union[str, Path]
+        """
+        self._cache_folder = Path(cache_folder)
+        os.makedirs(self._cache_folder, exist_ok=True)
+
+    @property
+    def cache_folder(self) -> Path:
+        return self._cache_folder
+
+    def get_cache_key(self, idf_path: Union[str, Path], weather_file_path: Union[str, Path], eplus_version_info: str) -> str:
+        """
+        :param idf_path: full path of the IDF file to simulate
+        :param weather_file_path: full path of the weather file used for the simulation
+        :param eplus_version_info: EnergyPlus version (and any other setting influencing the raw outputs, e.g. the IDD path)
+        :return: hex digest identifying that simulation
+        """
+        key_hash = hashlib.sha256()
+        key_hash.update(eplus_version_info.encode("utf-8"))
+        idf_text = Path(idf_path).read_text(encoding="utf-8", errors="replace")
+        key_hash.update(_normalise_idf_text(idf_text, os.path.dirname(os.path.abspath(idf_path))).encode("utf-8"))
+        key_hash.update(self._get_weather_file_hash(weather_file_path).encode("ascii"))
+        return key_hash.hexdigest()
+
+    def restore(self, cache_key: str, output_folder: Union[str, Path]) -> bool:
+        """
+        Copy cached EnergyPlus outputs for given key to output_folder.
+
+        :param cache_key: key as returned by get_cache_key()
+        :param output_folder: EnergyPlus output folder of the building, must not exist yet
+        :return: True if outputs were found in the cache and restored, False otherwise
+        """
+        entry_folder = self._get_entry_folder(cache_key)
+        if not os.path.isdir(entry_folder):
+            return False
+        try:
+            shutil.copytree(entry_folder, output_folder)
+        except Exception as ex:
+            logging.getLogger(__name__).warning(f"restoring cached results {entry_folder} to {output_folder} failed, simulation will be run. Caused by: {ex}")
+            shutil.rmtree(output_folder, ignore_errors=True)
+            return False
+        logging.getLogger(__name__).info(f"restored EnergyPlus outputs from cache {entry_folder} to {output_folder}")
+        return True
+
+    def store(self, cache_key: str, output_folder: Union[str, Path]) -> None:
+        """
+        Save EnergyPlus outputs of a successful simulation to the cache.
+        If an entry for the key already exists (e.g. stored by another process meanwhile) nothing is done.
+
+        :param cache_key: key as returned by get_cache_key()
+        :param output_folder: EnergyPlus output folder of the simulated building
+        """
+        entry_folder = self._get_entry_folder(cache_key)
+        if os.path.isdir(entry_folder):
+            return
+        os.makedirs(entry_folder.parent, exist_ok=True)
+        tmp_folder = entry_folder.parent / Path(f"{cache_key}.{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copytree(output_folder, tmp_folder)
+            os.replace(tmp_folder, entry_folder)
+        except OSError:
+            # another process stored the same entry in the meantime
+            logging.getLogger(__name__).debug(f"cache entry {entry_folder} was not stored, already present")
+        finally:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+    def _get_entry_folder(self, cache_key: str) -> Path:
+        return self._cache_folder / Path(cache_key[:2]) / Path(cache_key)
+
+    @classmethod
+    def _get_weather_file_hash(cls, weather_file_path: Union[str, Path]) -> str:
+        stat = os.stat(weather_file_path)
+        memo_key = (os.path.abspath(weather_file_path), stat.st_size, stat.st_mtime)
+        if memo_key not in cls._weather_hash_memo:
+            cls._weather_hash_memo[memo_key] = _hash_file(weather_file_path)
+        return cls._weather_hash_memo[memo_key]
+
+
+def _hash_file(file_path: Union[str, Path]) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def _normalise_idf_text(idf_text: str, idf_folder: str) -> str:
+    """
+    IDF objects without comments and whitespace around the fields, the file names of Schedule:File objects replaced by the hash
+    of the file content. Relative pathes are resolved against the IDF folder, as EnergyPlus does. File names of files not
+    existing are kept, EnergyPlus will fail on them anyway.
+    """
+    idf_text_no_comments = "\n".join(line.split("!", 1)[0] for line in idf_text.splitlines())
+    file_hashes: Dict[str, str] = dict()  # profile files are often referenced by several schedules
+    idf_objs = []
+    for idf_obj in idf_text_no_comments.split(";"):
+        fields = [field.strip() for field in idf_obj.split(",")]
+        if fields[0].lower() == _SCHEDULE_FILE_OBJ_NAME and len(fields) > _SCHEDULE_FILE_NAME_FIELD_IDX:
+            file_path = fields[_SCHEDULE_FILE_NAME_FIELD_IDX]
+            if not os.path.isabs(file_path):
+                file_path = os.path.join(idf_folder, file_path)
+            if os.path.isfile(file_path):
+                if file_path not in file_hashes:
+                    file_hashes[file_path] = _hash_file(file_path)
+                fields[_SCHEDULE_FILE_NAME_FIELD_IDX] = file_hashes[file_path]
+        idf_objs.append(",".join(fields))
+    return ";".join(idf_objs)
@@ -0,0 +1,72 @@
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to skip EnergyPlus simulations for buildings which did not change since a previous run.
+This is useful if you re-run the same site regularly and only a few buildings change between the runs.
+
+Run the script twice: in the first run all buildings are simulated and the outputs are stored in the cache folder,
+in the second run the outputs of all buildings are restored from the cache, as IDF and weather file did not change.
+For details see :py:class:`CachedSimulationManager` and :py:class:`SimulationResultCache`.
+"""
+
+import logging.config
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import cesarp.common
+import cesarp.common.config_loader
+from cesarp.eplus_adapter.eplus_eso_results_handling import RES_KEY_DHW_DEMAND, RES_KEY_HEATING_DEMAND
+from cesarp.eplus_adapter.idf_strings import ResultsFrequency
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    # make sure the CachedSimulationManager can be found
+    sys.path.append(os.path.dirname(__file__))
+    from CachedSimulationManager import CachedSimulationManager
+
+    main_config_path = __abs_path("../main_config.yml")
+    output_dir = __abs_path("../results/simulation_result_cache")
+    # keep the cache folder outside of the output folder, as the output folder is deleted before each run
+    cache_dir = __abs_path("../results/eplus_result_cache")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    fids_to_use = [1, 2, 3]  # set to None to simulate all buildings
+    sim_manager = CachedSimulationManager(output_dir, main_config_path, cesarp.common.init_unit_registry(), cache_folder=cache_dir, fids_to_use=fids_to_use)
+    sim_manager.run_all_steps()
+
+    result_series_frame = sim_manager.collect_custom_results(result_keys=[RES_KEY_HEATING_DEMAND, RES_KEY_DHW_DEMAND], results_frequency=ResultsFrequency.HOURLY)
+    result_series_frame.to_csv(output_dir / Path("hourly_results.csv"))
+
+    print("====================")
+    print(f"check out results in {output_dir}")
+    print(f"EnergyPlus outputs restored from cache {cache_dir} for fids {sim_manager.cache_hit_fids}, simulated {len(sim_manager.idf_pathes) - len(sim_manager.cache_hit_fids)} buildings.")
+    if sim_manager.failed_fids:
+        logging.warning(f"Something went wrong for following FID's {sim_manager.failed_fids}")
@@ -0,0 +1,177 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Assign each building the weather file of the nearest weather station, for all buildings of a site in one pass.
+
+The building centroids are calculated from the flat site vertices table for all buildings at once, the nearest station is then
+looked up with a KD-tree. The assignment is saved in the format of the MANAGER - WEATHER_FILE_PER_BUILDING configuration of cesar-p,
+thus the building models are created with the assigned weather file by cesar-p's SitePerBuildingSpecificWeatherFile.
+To keep a weather file in the file system cache while its buildings are simulated, pass the fid's grouped by weather file
+(get_fids_grouped_by_weather_file()) as fids_to_use to the SimulationManager, the simulations are then run in that order.
+
+The stations can be read from the LOCATION header of the weather files, e.g. the weather files of cesarp.weather.swiss_communities,
+whose latitude/longitude are converted to Swiss coordinates (LV95, EPSG:2056). The LOCATION header of some weather files is
+wrong (e.g. Geneva.epw and St-Bernhard.epw of cesarp.weather.swiss_communities), pass the correct coordinates of those stations
+as station_coordinates (e.g. station_coordinates.csv of this example). Stations outside of the valid extent, by default Switzerland,
+are dropped with a warning, thus a wrong header does not silently attract the buildings of a whole region.
+"""
+import os
+import re
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+WEATHER_FILE_PER_BLDG_LABELS = {"gis_fid": "ORIG_FID", "weather": "WEATHER"}  # as in the default config of cesarp.manager
+# (min east, min north, max east, max north) in LV95, Switzerland with a margin of some kilometers
+SWISS_EXTENT_LV95 = (2480000, 1070000, 2840000, 1300000)
+
+
+def get_bldg_centroids(flat_site_vertices: pd.DataFrame) -> pd.DataFrame:
+    """
+    :param flat_site_vertices: pd.DataFrame with columns "gis_fid", "x", "y", one row per footprint vertex in the order of the footprint,
+                               as returned by cesarp.geometry.csv_input_parser.read_sitevertices_from_csv()
+    :return: pd.DataFrame indexed by gis_fid with columns "x", "y" of the footprint centroid, for degenerated footprints (no area) the mean of the vertices
+    """
+    fid_codes, fids = pd.factorize(flat_site_vertices["gis_fid"])
+    order = np.argsort(fid_codes, kind="stable")
+    x = flat_site_vertices["x"].to_numpy(dtype=float)[order]
+    y = flat_site_vertices["y"].to_numpy(dtype=float)[order]
+    (_, starts, nr_of_vertices) = np.unique(fid_codes[order], return_index=True, return_counts=True)
+    # next vertex of the footprint, the last vertex is followed by the first one
+    next_pos = np.arange(1, len(x) + 1)
+    next_pos[starts + nr_of_vertices - 1] = starts
+    cross = x * y[next_pos] - x[next_pos] * y
+    area_twice = np.add.reduceat(cross, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centroid_x = np.add.reduceat((x + x[next_pos]) * cross, starts) / (3 * area_twice)
+        centroid_y = np.add.reduceat((y + y[next_pos]) * cross, starts) / (3 * area_twice)
+    degenerated = np.isclose(area_twice, 0)
+    centroid_x[degenerated] = (np.add.reduceat(x, starts) / nr_of_vertices)[degenerated]
+    centroid_y[degenerated] = (np.add.reduceat(y, starts) / nr_of_vertices)[degenerated]
+    return pd.DataFrame({"x": centroid_x, "y": centroid_y}, index=pd.Index(fids, name="gis_fid"))
+
+
+def wgs84_to_lv95(lat, lon):
+    """
+    Approximate conversion of WGS84 latitude/longitude to Swiss coordinates LV95 (accuracy about 1m), formulas by swisstopo.
+
+    :param lat: latitude in degree, scalar or array
+    :param lon: longitude in degree, scalar or array
+    :return: tuple (east, north) in meter
+    """
+    lat_aux = (np.asarray(lat, dtype=float) * 3600 - 169028.66) / 10000
+    lon_aux = (np.asarray(lon, dtype=float) * 3600 - 26782.5) / 10000
+    east = 2600072.37 + 211455.93 * lon_aux - 10938.51 * lon_aux * lat_aux - 0.36 * lon_aux * lat_aux ** 2 - 44.54 * lon_aux ** 3
+    north = 1200147.07 + 308807.95 * lat_aux + 3745.25 * lon_aux ** 2 + 76.63 * lat_aux ** 2 - 194.56 * lon_aux ** 2 * lat_aux + 119.79 * lat_aux ** 3
+    return (east, north)
+
+
+def read_stations_from_weather_files(
+    weather_files_folder: Union[str, Path],
+    extension: str = "epw",
+    station_coordinates: Optional[pd.DataFrame] = None,
+    valid_extent: Optional[Tuple[float, float, float, float]] = SWISS_EXTENT_LV95,
+) -> pd.DataFrame:
+    """
+    :param weather_files_folder: folder with one weather file per station
+    :param extension: extension of the weather files
+    :param station_coordinates: pd.DataFrame with columns "station" (weather file name without extension), "lat", "lon",
+                                overriding the LOCATION header of the weather file for those stations
+    :param valid_extent: (min x, min y, max x, max y) in LV95, stations outside are dropped with a warning, None to keep all stations
+    :return: pd.DataFrame with one row per station, columns "station", "weather_file" (file name), "lat", "lon", "x", "y" (LV95)
+    """
+    stations = []
+    for weather_file in sorted(Path(weather_files_folder).glob(f"*.{extension}")):
+        with open(weather_file, "r", encoding="latin-1") as f:
+            location = re.split(r"[,\t]", f.readline())  # some of the weather files are tab separated
+        stations.append({"station": weather_file.stem, "weather_file": weather_file.name, "lat": float(location[6]), "lon": float(location[7])})
+    stations_table = pd.DataFrame(stations, columns=["station", "weather_file", "lat", "lon"])
+    if station_coordinates is not None:
+        coordinates_per_station = station_coordinates.set_index("station")
+        is_overridden = stations_table["station"].isin(coordinates_per_station.index)
+        for col in ["lat", "lon"]:
+            stations_table.loc[is_overridden, col] = stations_table.loc[is_overridden, "station"].map(coordinates_per_station[col]).astype(float)
+    (stations_table["x"], stations_table["y"]) = wgs84_to_lv95(stations_table["lat"], stations_table["lon"])
+    if valid_extent is not None:
+        (min_x, min_y, max_x, max_y) = valid_extent
+        is_valid = stations_table["x"].between(min_x, max_x) & stations_table["y"].between(min_y, max_y)
+        for (_, station) in stations_table[~is_valid].iterrows():
+            logging.getLogger(__name__).warning(
+                f"station {station['station']} dropped, its coordinates lat {station['lat']}, lon {station['lon']} are outside of {valid_extent}. "
+                "Pass the correct coordinates as station_coordinates."
+            )
+        stations_table = stations_table[is_valid].reset_index(drop=True)
+    return stations_table
+
+
+class WeatherStationAssignment:
+    def __init__(self, stations: pd.DataFrame):
+        """
+        :param stations: one row per station, columns "station", "weather_file", "x", "y", coordinates in the same system as the site vertices,
+                         e.g. as returned by read_stations_from_weather_files()
+        """
+        self.stations = stations.reset_index(drop=True)
+        self._tree = cKDTree(self.stations[["x", "y"]].to_numpy(dtype=float))
+
+    def assign(self, bldg_centroids: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param bldg_centroids: pd.DataFrame indexed by gis_fid with columns "x", "y", e.g. as returned by get_bldg_centroids()
+        :return: pd.DataFrame indexed by gis_fid with the columns of the nearest station and the distance to it
+        """
+        (distances, positions) = self._tree.query(bldg_centroids[["x", "y"]].to_numpy(dtype=float))
+        assignment = self.stations.iloc[positions][["station", "weather_file"]].set_index(bldg_centroids.index)
+        assignment["distance"] = distances
+        return assignment
+
+    @staticmethod
+    def get_fids_grouped_by_weather_file(assignment: pd.DataFrame) -> List[int]:
+        """
+        :param assignment: assignment as returned by assign()
+        :return: all fid's of the assignment, the fid's with the same weather file following each other
+        """
+        return assignment.sort_values("weather_file", kind="stable").index.to_list()
+
+    @staticmethod
+    def save_weather_file_per_bldg(assignment: pd.DataFrame, file_path: Union[str, Path], weather_files_folder: Union[str, Path]) -> Dict[str, Any]:
+        """
+        :param assignment: assignment as returned by assign()
+        :param file_path: CSV file to write
+        :param weather_files_folder: folder with the weather files
+        :return: configuration entries to use the saved assignment, merge them into your main configuration
+        """
+        labels = WEATHER_FILE_PER_BLDG_LABELS
+        pd.DataFrame({labels["gis_fid"]: assignment.index, labels["weather"]: assignment["weather_file"].to_numpy()}).to_csv(file_path, index=False)
+        return {
+            "MANAGER": {
+                "SINGLE_SITE": {"ACTIVE": False},
+                "SITE_PER_CH_COMMUNITY": {"ACTIVE": False},
+                "WEATHER_FILE_PER_BUILDING": {
+                    "ACTIVE": True,
+                    "WEATHER_FILE_PER_BLDG_FILE": {"PATH": os.path.abspath(file_path), "SEPARATOR": ",", "LABELS": labels},
+                    "WEATHER_FILES_FOLDER": os.path.abspath(weather_files_folder),
+                },
+            }
+        }
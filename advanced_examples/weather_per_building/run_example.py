@@ -0,0 +1,92 @@
+# coding=utf-8
+#
+# Copyright (c) 2021, Empa, Leonie Fierz
+#
+# This file is part of CESAR-P - Combined Energy Simulation And Retrofit written in Python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact: https://www.empa.ch/web/s313
+#
+"""
+Example showing how to assign each building the weather file of the nearest weather station, for all buildings of the site in one pass.
+The weather stations are the ones used by cesarp.weather.swiss_communities, their coordinates are read from the weather files,
+for the stations whose weather file has a wrong LOCATION header they are taken from station_coordinates.csv.
+The buildings are simulated grouped by weather file. For details see :py:mod:`WeatherStationAssignment`.
+
+The example site vertices are in local coordinates, thus they are moved to a site origin in Swiss coordinates (LV95).
+For your own site in LV95 coordinates, set SITE_ORIGIN_LV95 to (0, 0).
+"""
+
+import logging.config
+import logging
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+import cesarp.common
+import cesarp.common.config_loader
+import cesarp.manager
+import cesarp.weather.swiss_communities
+from cesarp.geometry.csv_input_parser import read_sitevertices_from_csv
+from cesarp.manager.SimulationManager import SimulationManager
+
+SITE_ORIGIN_LV95 = (2683000, 1248000)  # Zurich
+
+
+def __abs_path(path):
+    return cesarp.common.abs_path(path, os.path.abspath(__file__))
+
+
+if __name__ == "__main__":
+    # this logging config is only for the main process, workers log to separate log files which go into a folder, configured in SimulationManager.
+    logging.config.fileConfig(__abs_path("../logging.conf"))
+
+    sys.path.append(os.path.dirname(__file__))
+    from WeatherStationAssignment import WeatherStationAssignment, get_bldg_centroids, read_stations_from_weather_files
+
+    main_config = cesarp.common.config_loader.load_config_full(__abs_path("../main_config.yml"))
+    output_dir = __abs_path("../results/weather_per_building")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+
+    mgr_cfg = cesarp.common.load_config_for_package(cesarp.manager._default_config_file, "cesarp.manager", main_config)
+    site_vertices_cfg = mgr_cfg["SITE_VERTICES_FILE"]
+    flat_site_vertices = read_sitevertices_from_csv(site_vertices_cfg["PATH"], site_vertices_cfg["LABELS"], site_vertices_cfg["SEPARATOR"])
+    bldg_centroids = get_bldg_centroids(flat_site_vertices)
+    bldg_centroids["x"] += SITE_ORIGIN_LV95[0]
+    bldg_centroids["y"] += SITE_ORIGIN_LV95[1]
+
+    weather_files_cfg = cesarp.common.load_config_for_package(cesarp.weather.swiss_communities._default_config_file, "cesarp.weather.swiss_communities", main_config)["WEATHER_FILES"]
+    weather_files_folder = weather_files_cfg["PATH"]
+    station_coordinates = pd.read_csv(__abs_path("station_coordinates.csv"))
+    stations = read_stations_from_weather_files(weather_files_folder, weather_files_cfg["EXTENSION"], station_coordinates)
+    assignment = WeatherStationAssignment(stations).assign(bldg_centroids)
+    weather_cfg = WeatherStationAssignment.save_weather_file_per_bldg(assignment, os.path.join(output_dir, "weather_file_per_bldg.csv"), weather_files_folder)
+    logging.getLogger(__name__).info(f"{len(assignment)} buildings assigned to {assignment['weather_file'].nunique()} weather files, max distance to station {assignment['distance'].max():.0f}m")
+
+    sim_manager = SimulationManager(
+        output_dir,
+        cesarp.common.config_loader.merge_config_recursive(main_config, weather_cfg),
+        cesarp.common.init_unit_registry(),
+        fids_to_use=WeatherStationAssignment.get_fids_grouped_by_weather_file(assignment),
+    )
+    sim_manager.run_all_steps()
+
+    print("====================")
+    print(f"check out results in {output_dir}")
+    if sim_manager.failed_fids:
+        logging.warning(f"Something went wrong for following FID's {sim_manager.failed_fids}")
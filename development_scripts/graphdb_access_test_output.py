@@ -27,15 +27,21 @@ if you want to test accessing new data.
 To get properties of the archetypes, there is also the pre_or_postprocessing_scripts/collect_archetype_infos.py
 which is actually a bit more tidy.
 """
+import os
+import sys
 
 from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader
 from cesarp.graphdb_access.GraphDBReader import GraphDBReader
 from cesarp.graphdb_access.GraphDBArchetypicalConstructionFactory import GraphDBArchetypicalConstructionFactory
-from cesarp.graphdb_access.LocalFileReader import LocalFileReader
+from cesarp.graphdb_access.LocalFileReader import LocalFileReader  # noqa: F401
 import cesarp.common
 from cesarp.model.EnergySource import EnergySource
 from cesarp.model.BuildingElement import BuildingElement
 
+# make sure GraphSnapshotReader can be found
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "advanced_examples"))
+from GraphSnapshotReader import GraphSnapshotReader  # noqa: E402
+
 
 def get_some_infos_on_archetype(reader: GraphDBReader, archetype_uri: str):
     myArchetype = reader.get_bldg_elem_construction_archetype(archetype_uri)
@@ -80,7 +86,8 @@ def check_archetype_construction_factory(graph_reader):
 
 if __name__ == "__main__":
     ureg = cesarp.common.init_unit_registry()
-    graph_reader = LocalFileReader()
+    graph_reader = GraphSnapshotReader()
+    # graph_reader = LocalFileReader()
     # graph_reader = GraphDBReader()
     custom_config = {"GRAPHDB_ACCESS": {"RETROFIT": {"target_requirement": True}}}
     reader = BldgElementConstructionReader(graph_reader, ureg, custom_config)
@@ -23,7 +23,11 @@
 Querying the information for the GraphDB was not performant.
 This script uses the python profiling to figure out which parts did make up most of the time.
 Based on this, the caching mechanism for materials was introduced in *cesarp.graphdb_access.BldgElementConstructionReader*
+Afterwards parsing the TTL file in the LocalFileReader made up most of the time, thus the GraphSnapshotReader from
+advanced_examples is used, which reads the query results from a precompiled snapshot of the TTL file.
 """
+import os
+import sys
 import logging
 import cProfile
 import pstats
@@ -31,12 +35,15 @@ import pstats
 import cesarp.common
 from cesarp.model.EnergySource import EnergySource
 from cesarp.graphdb_access.GraphDBArchetypicalConstructionFactory import GraphDBArchetypicalConstructionFactory
-from cesarp.graphdb_access.LocalFileReader import LocalFileReader
+
+# make sure GraphSnapshotReader can be found
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "advanced_examples"))
+from GraphSnapshotReader import GraphSnapshotReader  # noqa: E402
 
 
 def get_archetype():
     ureg = cesarp.common.init_unit_registry()
-    local_reader = LocalFileReader()
+    local_reader = GraphSnapshotReader()  # first run compiles the snapshot, use LocalFileReader() to profile parsing the TTL
     custom_config = {"GRAPHDB_ACCESS": {"ARCHETYPES": {"1948_SFH_ARCHETYPE": {"DEFAULT_CONSTRUCTION_SPECIFIC": {"ACTIVE": False}}}}}
 
     factory = GraphDBArchetypicalConstructionFactory(
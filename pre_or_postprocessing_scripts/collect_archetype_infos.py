@@ -36,6 +36,7 @@ Data is written to a csv table and printed as diagrams. This gives a view of tho
 This script is written in Jupyter-Style. The blocks marked with # %% can be run in a Jupyter mode in Visual Studio Code
 """
 # %%
+import sys
 import matplotlib.pyplot as plt
 import pandas as pd
 import cesarp.common
@@ -43,6 +44,10 @@ from cesarp.graphdb_access.GraphDBFacade import GraphDBFacade
 from cesarp.graphdb_access.BldgElementConstructionReader import BldgElementConstructionReader
 from cesarp.graphdb_access.ArchetypicalConstructionGraphDBBased import ArchetypicalConstructionGraphDBBased
 
+# relative to this folder, run the script from within pre_or_postprocessing_scripts
+sys.path.append("../advanced_examples")
+from AgeClassIndex import AgeClassIndex  # noqa: E402
+
 # %% initialize archetype factory and graph db access
 ureg = cesarp.common.init_unit_registry()
 
@@ -61,11 +66,14 @@ archetype_year_list = []
 for ac, uri in archetype_fact._ageclass_archetype.items():
     print(f"{ac.min_age}, {ac.max_age}, {uri}")
 
+# archetype URI of all years at once
+archetype_uri_per_year = dict(zip(years, AgeClassIndex(archetype_fact._ageclass_archetype.keys()).map_years(years, archetype_fact._ageclass_archetype, not_found_value="")))
+
 # %% assemble constructional parameters (defaults) depending on construction year (respectively for age classes/constructional archetype)
 per_archetype_infos = []
 for id, year in bldg_list.items():
     constr_archetype: ArchetypicalConstructionGraphDBBased = archetype_fact.get_archetype_for(id)
-    uri = ""  # archetype_fact._get_archetype_uri_for(year) # can be activated when using cesar-p-core > 1.3.1
+    uri = archetype_uri_per_year[year]
     u_wall = bldg_constr_reader.get_u_value(constr_archetype.wall_constr.get_value(False))
     u_roof = bldg_constr_reader.get_u_value(constr_archetype.roof_constr.get_value(False))
     u_groundfloor = bldg_constr_reader.get_u_value(constr_archetype.groundfloor_constr.get_value(False))
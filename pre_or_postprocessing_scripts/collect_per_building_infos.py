@@ -21,24 +21,29 @@
 """
 Does get some example properties of the building models from a existing project.
 
+The values are read from the sidecar of advanced_examples/LazyBldgContainerStore.py, thus each building container is loaded
+only on the first run (or after it changed) instead of loading all containers with their building models each time.
+For properties not in the sidecar, access the containers e.g. with container_store[fid].get_bldg_model(), which loads just that container.
+
 Run simple example prior to run this script or adapt pathes to your project.
 """
 
 import os
+import sys
 from pathlib import Path
-from cesarp.manager.SimulationManager import SimulationManager
-import cesarp.common
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "advanced_examples"))
+from LazyBldgContainerStore import LazyBldgContainerStore  # noqa: E402
 
 
 base_cesarp_output = os.path.dirname(__file__) / Path("..") / Path("simple_example") / Path("results") / Path("example")  # must contain folder named bldg_containers
 main_cfg_path = os.path.dirname(__file__) / Path("..") / Path("simple_example") / Path("simple_main_config.yml")
 
 
-sim_manager = SimulationManager(base_cesarp_output, main_cfg_path, cesarp.common.init_unit_registry(), load_from_disk=True)
+container_store = LazyBldgContainerStore(base_cesarp_output, main_cfg_path)
+bldg_infos = container_store.get_sidecar(["has_bldg_model", "roof_constr", "nr_of_neighbours"])
 
-roof_constructions = {
-    fid: ctr.get_bldg_model().bldg_construction.roof_constr.short_name if ctr.has_bldg_model() else "bldg model is missing" for fid, ctr in sim_manager.bldg_containers.items()
-}
+roof_constructions = {fid: row.roof_constr if row.has_bldg_model else "bldg model is missing" for fid, row in bldg_infos.iterrows()}
 print("Roof construction: " + str(roof_constructions))
-neighbours_per_bldg = {fid: len(ctr.get_bldg_model().neighbours) if ctr.has_bldg_model() else 0 for fid, ctr in sim_manager.bldg_containers.items()}
+neighbours_per_bldg = {fid: row.nr_of_neighbours if row.has_bldg_model else 0 for fid, row in bldg_infos.iterrows()}
 print("Number of neighbouring buildings: " + str(neighbours_per_bldg))
@@ -24,10 +24,16 @@ Might be useful to check your building geometries and to find building with many
 which will be slow to simulate. Their footprints might be made less complex without loosing
 much accuracy. Note that cesar-p support up to 250 vertices (limiting is the IDD respectively eppy)
 
+Besides the number of vertices, footprint area, perimeter, orientation (of the longest edge, degree from north) and the
+vertex order are listed, as well as the number of vertices left when removing collinear vertices. They are calculated for
+all buildings at once, see advanced_examples/FootprintArray.py. To simplify the footprints before the simulation, see
+advanced_examples/footprint_simplification.
+
 Run simple example prior to run this script or adapt pathes to your project.
 """
 
 import os
+import sys
 from pathlib import Path
 from cesarp.geometry.csv_input_parser import read_sitevertices_from_csv
 import cesarp.common
@@ -41,8 +47,14 @@ SITE_VERTICES_PATH = os.path.dirname(__file__) / Path("..") / Path("example_proj
 LABEL_MAPPING = {"gis_fid": "TARGET_FID", "height": "HEIGHT", "x": "POINT_X", "y": "POINT_Y"}  # labels in your SiteVertices.csv
 NR_ENTRIES_TO_PRINT = 30  # just how many buildings shall be shown (building are sorted by number of vertices)
 
+sys.path.append(__abs_path("../advanced_examples"))
+from FootprintArray import FootprintArray  # noqa: E402
+
 all_vertices = read_sitevertices_from_csv(__abs_path(SITE_VERTICES_PATH), LABEL_MAPPING, separator=",")
-nr_of_vertices_per_bldg = all_vertices[["gis_fid", "x"]].groupby("gis_fid").count().rename(columns={"x": "nr_of_vertices"}).sort_values(ascending=False, by="nr_of_vertices")
+footprints = FootprintArray.from_flat_site_vertices(all_vertices)
+nr_of_vertices_per_bldg = footprints.get_footprint_table()
+nr_of_vertices_per_bldg["nr_of_vertices_without_collinear"] = footprints.remove_collinear_vertices().get_nr_of_vertices()
+nr_of_vertices_per_bldg = nr_of_vertices_per_bldg.sort_values(ascending=False, by="nr_of_vertices")
 
 
 print(nr_of_vertices_per_bldg.head(NR_ENTRIES_TO_PRINT))
@@ -26,11 +26,15 @@ Options for postprocessing your results after a finished simulation.
 - B: Get some more results out of raw EnergyPlus results
 - C: Get results values from saved BuildingContainer objects
 
+The project is reloaded with the LazyReloadSimulationManager of advanced_examples, which does not read all building containers
+on creation. C reads the values from the sidecar of the building containers, see advanced_examples/LazyBldgContainerStore.py.
+
 Do run simple example prior to run this script. 
 To process the data of your own simulation, adapt the variables *base_cesarp_output* and *main_cfg_path*.
 
 """
 import os
+import sys
 import pandas as pd
 from pathlib import Path
 from cesarp.manager.SimulationManager import SimulationManager
@@ -39,6 +43,9 @@ from cesarp.eplus_adapter.EPlusEioResultAnalyzer import EPlusEioResultAnalyzer
 import cesarp.common
 from cesarp.common.csv_reader import read_csvy_raw
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "advanced_examples"))
+from LazyReloadSimulationManager import LazyReloadSimulationManager  # noqa: E402
+
 
 def aggreagte_from_summary(sim_manager: SimulationManager):
     """A - RELOAD AND AGGREGATE ANNUAL RESULTS BASED ON SUMMARY OUTPUT FILES"""
@@ -80,20 +87,18 @@ def extract_from_raw_eplus_res(sim_manager: SimulationManager):
     print({fid: EPlusEioResultAnalyzer(res_folder, sim_manager._unit_reg, custom_config={}).get_total_floor_area() for fid, res_folder in sim_manager.output_folders.items()})
 
 
-def results_from_bldg_container(sim_manager: SimulationManager):
+def results_from_bldg_container(sim_manager: LazyReloadSimulationManager):
     """C - QUERY RESULTS FROM Building Container FROM RAW ENERGY PLUS OUTPUT"""
 
     # make sure the results you query here are actually in the ESO result file
     # to get the names of the variables that can be queried check the rdd/mdd files after a first test-run
     # (more details: https://www.energyplus.net/sites/default/files/docs/site_v8.3.0/InputOutputReference/05-InputForOutput/index.html)
     # once you have those names, add them in the configuration of package cesarp.eplus_adapter OUTPUT_VARS / OUTPUT_METER
-    per_bldg_data_dict = {
-        fid: [ctr.get_energy_demand_sim_res().tot_heating_demand / ctr.get_energy_demand_sim_res().total_floor_area, ctr.get_bldg_model().bldg_construction.glazing_ratio]
-        if ctr.has_demand_result() and ctr.has_bldg_model()
-        else []
-        for fid, ctr in sim_manager.bldg_containers.items()
-    }
-    per_bldg_data = pd.DataFrame.from_dict(per_bldg_data_dict, columns=["heating demand", "glazing_ratio"], orient="index")
+    # the sidecar holds the demand results and some building model properties of all containers, for other values access the
+    # containers, e.g. sim_manager.bldg_containers[fid].get_bldg_model(), which loads only that container
+    sidecar = sim_manager.bldg_containers.get_sidecar(["has_bldg_model", "has_demand_result", "tot_heating_demand", "total_floor_area", "glazing_ratio"])
+    sidecar = sidecar[sidecar["has_bldg_model"] & sidecar["has_demand_result"]]
+    per_bldg_data = pd.DataFrame({"heating demand": sidecar["tot_heating_demand"] / sidecar["total_floor_area"], "glazing_ratio": sidecar["glazing_ratio"]})
     print("\n\n===== C: Get results from building containers - Heating demand along with glazing ratio =====\n")
     print(per_bldg_data.sort_values("glazing_ratio", ascending=False))
 
@@ -103,7 +108,7 @@ if __name__ == "__main__":
     base_cesarp_output = os.path.dirname(__file__) / Path("..") / Path("simple_example") / Path("results") / Path("example")  # must contain folder named bldg_containers
     main_cfg_path = os.path.dirname(__file__) / Path("..") / Path("simple_example") / Path("simple_main_config.yml")
 
-    sim_manager = SimulationManager(base_cesarp_output, main_cfg_path, cesarp.common.init_unit_registry(), load_from_disk=True)
+    sim_manager = LazyReloadSimulationManager(base_cesarp_output, main_cfg_path, cesarp.common.init_unit_registry())
 
     aggreagte_from_summary(sim_manager)
     extract_from_raw_eplus_res(sim_manager)
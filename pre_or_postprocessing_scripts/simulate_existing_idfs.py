@@ -20,12 +20,11 @@
 # Contact: https://www.empa.ch/web/s313
 #
 import os
+import sys
 from pathlib import Path
 
 import cesarp.common
 import cesarp.common.filehandling
-import cesarp.eplus_adapter.eplus_sim_runner
-import cesarp.eplus_adapter.eplus_eso_results_handling as eplus_eso_results_handling
 from cesarp.results.ResultProcessor import ResultProcessor
 
 
@@ -39,15 +38,21 @@ _CONFIG = __abs_path(Path("..") / Path("simple_example") / Path("simple_main_con
 
 
 if __name__ == "__main__":
+    # make sure parallel_simulation_summary can be found
+    sys.path.append(str(__abs_path(Path("..") / Path("advanced_examples"))))
+    import parallel_simulation_summary
+
     my_config = cesarp.common.config_loader.load_config_full(_CONFIG)
 
     idf_pathes = cesarp.common.filehandling.scan_directory(_IDF_FOLDER, "fid_{}.idf")
     weather_file_path = __abs_path(Path("..") / Path("example_project_files") / Path("Zurich_2020.epw"))
     weather_files = {idx: weather_file_path for idx in idf_pathes.keys()}
     result_folders = {idx: str(_RESULT_FOLDER / Path("fid_{}".format(idx))) for idx in idf_pathes.keys()}
-    cesarp.eplus_adapter.eplus_sim_runner.run_batch(idf_pathes, weather_files, result_folders, -1, my_config)
+    # init unit registry before running the simulations, it is used to unpickle the results returned from the workers
     ureg = cesarp.common.init_unit_registry()
-    summary_res = {idx: eplus_eso_results_handling.collect_cesar_simulation_summary(res_folder, ureg) for idx, res_folder in result_folders.items()}
+    # each building is simulated and its result summary collected in the same worker job
+    summary_res = parallel_simulation_summary.run_batch_with_summary(idf_pathes, weather_files, result_folders, -1, my_config)
+    summary_res = {idx: res for idx, res in summary_res.items() if res is not None}
     summary_res_as_df = ResultProcessor.convert_demand_results_to_df(summary_res, ureg)
     summary_res_file = _RESULT_FOLDER / Path("summary.csv")
     summary_res_as_df.to_csv(summary_res_file, sep=";", float_format="%.4f")